@@ -0,0 +1,369 @@
+"""Application detector: RFB keystroke/clipboard decoding and command patterns."""
+
+import base64
+import binascii
+import hashlib
+import logging
+import os
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Literal, Optional, Sequence, Tuple
+
+from detectors.plugin import DetectorPlugin, Result, detect_each
+from shared import contracts
+from shared.seq_reorder import SeqReorder
+
+try:
+    from rfb import ClientMessageParser, CutTextFragment, KeyText
+    from command_patterns import StreamScanner, build_default_automaton
+    from bloom import BloomFilter, length_prefix_digest
+except ImportError:
+    from .rfb import ClientMessageParser, CutTextFragment, KeyText
+    from .command_patterns import StreamScanner, build_default_automaton
+    from .bloom import BloomFilter, length_prefix_digest
+
+logger = logging.getLogger("app_detector")
+
+# Upper bound on sessions whose RFB parser/scanner state is kept in memory;
+# the least recently active session is dropped first.
+MAX_TRACKED_SESSIONS = int(os.getenv("APP_MAX_TRACKED_SESSIONS", "20000"))
+
+# Numbered chunks are parsed in ``seq`` order; a gap that this many later
+# chunks have not filled is given up on and the parser restarts after it.
+APP_REORDER_WINDOW = int(os.getenv("APP_REORDER_WINDOW", "32"))
+
+# Built once at startup and shared by every session.
+COMMAND_AUTOMATON = build_default_automaton()
+
+# Per-session clipboard dedup: a fixed-size Bloom filter remembers every
+# clipboard digest seen in the session, and a small map links the most
+# recent distinct digests back to the event that first reported them.
+CLIPBOARD_BLOOM_BITS = int(os.getenv("APP_CLIPBOARD_BLOOM_BITS", "16384"))
+CLIPBOARD_BLOOM_HASHES = int(os.getenv("APP_CLIPBOARD_BLOOM_HASHES", "7"))
+CLIPBOARD_RECENT_ORIGINALS = int(os.getenv("APP_CLIPBOARD_RECENT_ORIGINALS", "16"))
+CLIPBOARD_PREFIX_BYTES = 64
+
+
+class ProxyEvent(contracts.ProxyEvent):
+    stream: Literal["app_stream"]
+
+
+class DetectorEvent(contracts.DetectorEvent):
+    detector: Literal["app"]
+
+
+def _ensure_app_dir(session_id: str) -> Path:
+    """Ensure local directory for application/clipboard artifacts exists."""
+
+    base_dir = Path(__file__).resolve().parent
+    app_dir = base_dir / "data" / session_id
+    app_dir.mkdir(parents=True, exist_ok=True)
+    return app_dir
+
+
+def _append_clipboard_log(session_id: str, event: ProxyEvent) -> None:
+    """Append a simple line describing the event into clipboard.log.
+
+    For MVP we treat all client_to_server app_stream chunks as potential
+    clipboard/application activity and log metadata only.
+    """
+
+    if event.direction != "client_to_server" or event.length <= 0:
+        return
+
+    app_dir = _ensure_app_dir(session_id)
+    log_path = app_dir / "clipboard.log"
+    ts = event.ts
+    line = f"{ts} length={event.length} direction={event.direction}\n"
+    with log_path.open("a", encoding="utf-8") as f:
+        f.write(line)
+
+
+class _SessionState:
+    """Per-session RFB parser, scan positions and clipboard dedup state."""
+
+    __slots__ = (
+        "parser", "key_scanner", "cut_scanner", "cut_hasher", "clipboard_seen", "clipboard_originals",
+        "paste_event_id", "paste_spike", "order",
+    )
+
+    def __init__(self) -> None:
+        self.parser = ClientMessageParser()
+        self.order = SeqReorder()
+        self.key_scanner: StreamScanner = COMMAND_AUTOMATON.scanner()
+        self.cut_scanner: StreamScanner = COMMAND_AUTOMATON.scanner()
+        self.cut_hasher = None
+        self.clipboard_seen = BloomFilter(CLIPBOARD_BLOOM_BITS, CLIPBOARD_BLOOM_HASHES)
+        # digest -> [original event_id, repeat_count]
+        self.clipboard_originals: "OrderedDict[bytes, List[object]]" = OrderedDict()
+        # The event whose chunk started the ClientCutText still in progress,
+        # and the strongest spike confidence among its chunks so far.
+        self.paste_event_id: Optional[str] = None
+        self.paste_spike = 0.0
+
+
+SESSION_STATE: "OrderedDict[str, _SessionState]" = OrderedDict()
+
+
+def _get_session_state(session_id: str) -> _SessionState:
+    state = SESSION_STATE.get(session_id)
+    if state is None:
+        state = SESSION_STATE[session_id] = _SessionState()
+        while len(SESSION_STATE) > MAX_TRACKED_SESSIONS:
+            SESSION_STATE.popitem(last=False)
+    else:
+        SESSION_STATE.move_to_end(session_id)
+    return state
+
+
+def analyze_payload(event: ProxyEvent) -> Optional[Dict[str, object]]:
+    """Decode KeyEvent/ClientCutText text from the chunk and scan it.
+
+    Returns ``None`` when the chunk carries no usable RFB payload (not
+    forwarded by the proxy, server-to-client, or a stream the parser cannot
+    frame) so callers fall back to length-only heuristics.
+
+    Chunks numbered by the proxy are parsed in ``seq`` order: a chunk that
+    arrives ahead of a missing one is held (``"held": True``, nothing
+    decoded) and the event that fills the gap reports the text of every
+    chunk it releases. Repeated chunks are held too and never parsed twice.
+    """
+
+    if event.direction != "client_to_server" or not event.payload_b64:
+        return None
+    try:
+        data = base64.b64decode(event.payload_b64, validate=True)
+    except (binascii.Error, ValueError):
+        return None
+
+    state = _get_session_state(event.session_id)
+    if event.seq is None:
+        chunks = [data]
+    else:
+        chunks, lost = state.order.push(event.seq, data, APP_REORDER_WINDOW)
+        if lost:
+            # Clients write whole messages, so framing resumes at the next chunk.
+            state.parser = ClientMessageParser()
+            state.cut_scanner.reset()
+            state.cut_hasher = None
+        if not chunks:
+            return {
+                "keystrokes": 0,
+                "clipboard_bytes": 0,
+                "clipboard_digests": [],
+                "clipboard_pastes": [],
+                "clipboard_paste_open": False,
+                "matches": [],
+                "held": True,
+            }
+    messages = [msg for chunk in chunks for msg in state.parser.feed(chunk)]
+    if state.parser.desynced and not messages:
+        # Framing lost at the start of the chunk; the parser picks up again
+        # at the next one.
+        return None
+
+    keystrokes = 0
+    clipboard_bytes = 0
+    clipboard_digests: List[bytes] = []
+    # (digest, started in this chunk) per ClientCutText completed here.
+    clipboard_pastes: List[Tuple[bytes, bool]] = []
+    paste_started = paste_open = False
+    matches = []
+    for msg in messages:
+        if isinstance(msg, KeyText):
+            keystrokes += 1
+            matches.extend(state.key_scanner.feed(msg.text))
+        elif isinstance(msg, CutTextFragment):
+            if msg.first:
+                state.cut_scanner.reset()
+                state.cut_hasher = hashlib.blake2b(digest_size=16)
+                paste_started = True
+            clipboard_bytes += len(msg.data)
+            state.cut_hasher.update(msg.data)
+            paste_open = not msg.last
+            if msg.last:
+                clipboard_digests.append(state.cut_hasher.digest())
+                clipboard_pastes.append((clipboard_digests[-1], paste_started))
+                state.cut_hasher = None
+                paste_started = False
+            # ClientCutText is ISO 8859-1 per RFC 6143.
+            matches.extend(state.cut_scanner.feed(msg.data.decode("latin-1")))
+            if msg.last:
+                matches.extend(state.cut_scanner.flush())
+
+    return {
+        "keystrokes": keystrokes,
+        "clipboard_bytes": clipboard_bytes,
+        "clipboard_digests": clipboard_digests,
+        "clipboard_pastes": clipboard_pastes,
+        # A ClientCutText started in this chunk and continues in later ones.
+        "clipboard_paste_open": paste_open and paste_started,
+        "matches": matches,
+    }
+
+
+def _payload_prefix(event: ProxyEvent) -> bytes:
+    if not event.payload_b64:
+        return b""
+    # Decode only the base64 characters that cover the prefix.
+    chars = -(-CLIPBOARD_PREFIX_BYTES // 3) * 4
+    try:
+        return base64.b64decode(event.payload_b64[:chars])[:CLIPBOARD_PREFIX_BYTES]
+    except (binascii.Error, ValueError):
+        return b""
+
+
+def dedup_clipboard(event: ProxyEvent, detector_event: DetectorEvent, analysis: Optional[Dict[str, object]]) -> None:
+    """Link repeated clipboard payloads back to the first event that scored them.
+
+    The digest covers the full ``ClientCutText`` content when it was decoded,
+    and the chunk length plus its first bytes otherwise. A paste spanning
+    several chunks is scored once, when its last fragment arrives: earlier
+    spike-sized chunks of it go out as ``app_activity`` marked
+    ``clipboard_digest_source="pending"``, and the completing event becomes
+    the ``clipboard_spike_candidate`` (at the strongest confidence among the
+    paste's chunks), carrying the event that started the paste as
+    ``paste_event_id``. A repeat carries ``duplicate_of`` (the original
+    ``event_id``, when still remembered) and ``repeat_count`` so the risk
+    engine can fold it into the original event instead of scoring another
+    spike.
+    """
+
+    spike = detector_event.type == "clipboard_spike_candidate"
+    spike_confidence = detector_event.confidence if spike else 0.0
+    state = _get_session_state(event.session_id)
+    pastes = analysis.get("clipboard_pastes") if analysis else None
+
+    if pastes:
+        digest, started_here = pastes[-1]
+        paste_spike = 0.0 if started_here else state.paste_spike
+        if spike or paste_spike:
+            if paste_spike and detector_event.type != "suspicious_command_pattern":
+                # The paste's earlier chunks were held back; it is scored here.
+                detector_event.type = "clipboard_spike_candidate"
+                detector_event.confidence = max(spike_confidence, paste_spike)
+            detector_event.details["clipboard_digest_source"] = "content"
+            if not started_here and state.paste_event_id is not None:
+                detector_event.details["paste_event_id"] = state.paste_event_id
+            _link_clipboard(state, digest, detector_event.event_id, detector_event)
+    elif spike and analysis and analysis["clipboard_bytes"]:
+        # Inside a decoded paste: the event completing it carries the verdict.
+        detector_event.type = "app_activity"
+        detector_event.confidence = 0.05
+        detector_event.details["clipboard_digest_source"] = "pending"
+        state.paste_spike = max(state.paste_spike, spike_confidence)
+    elif spike:
+        detector_event.details["clipboard_digest_source"] = "length_prefix"
+        digest = length_prefix_digest(event.length, _payload_prefix(event))
+        _link_clipboard(state, digest, detector_event.event_id, detector_event)
+
+    if analysis and analysis.get("clipboard_paste_open"):
+        state.paste_event_id, state.paste_spike = detector_event.event_id, spike_confidence
+
+
+def _link_clipboard(state: _SessionState, digest: bytes, original_id: str, detector_event: DetectorEvent) -> None:
+    originals = state.clipboard_originals
+    if not state.clipboard_seen.add(digest):
+        originals[digest] = [original_id, 0]
+        while len(originals) > CLIPBOARD_RECENT_ORIGINALS:
+            originals.popitem(last=False)
+        return
+
+    entry = originals.get(digest)
+    if entry is None:
+        # Seen earlier in the session but the original has aged out of the
+        # recent map (or a Bloom false positive): flag without a link.
+        detector_event.details["duplicate_of"] = None
+        detector_event.details["repeat_count"] = 1
+        return
+    originals.move_to_end(digest)
+    entry[1] += 1
+    detector_event.details["duplicate_of"] = entry[0]
+    detector_event.details["repeat_count"] = entry[1]
+
+
+def build_detector_event(event: ProxyEvent, analysis: Optional[Dict[str, object]] = None) -> DetectorEvent:
+    matches = analysis["matches"] if analysis else []
+    details: Dict[str, object] = {
+        "length": event.length,
+        "direction": event.direction,
+    }
+    if analysis:
+        details["keystrokes"] = analysis["keystrokes"]
+        details["clipboard_bytes"] = analysis["clipboard_bytes"]
+        if analysis.get("held"):
+            # Decoded later, on behalf of the event that fills the gap.
+            details["chunk_order"] = "held"
+
+    if matches:
+        categories = sorted({m.category for m in matches})
+        event_type = "suspicious_command_pattern"
+        # Strongest category sets the base; each extra category adds a little.
+        confidence = min(1.0, max(m.severity for m in matches) + 0.05 * (len(categories) - 1))
+        details["command_categories"] = categories
+        details["command_patterns"] = sorted({m.pattern.strip() for m in matches})[:10]
+    elif event.direction == "client_to_server":
+        if event.length > 2500:  # Large clipboard operations
+            event_type = "clipboard_spike_candidate"
+            confidence = 0.6  # Higher confidence for large operations
+        elif event.length > 1500:
+            event_type = "clipboard_spike_candidate"
+            confidence = 0.5  # Medium-high confidence
+        elif 800 <= event.length <= 1500:
+            event_type = "file_transfer_metadata"
+            confidence = 0.4
+        elif 200 <= event.length < 800 and analysis is None:
+            # Length-only fallback when no decodable payload is available.
+            event_type = "suspicious_command_pattern"
+            confidence = 0.3
+        elif event.length > 0:
+            event_type = "app_activity"
+            confidence = 0.05
+        else:
+            event_type = "app_activity"
+            confidence = 0.01
+    else:
+        event_type = "server_response_activity"
+        confidence = 0.05
+
+    return DetectorEvent.trusted(
+        session_id=event.session_id,
+        timestamp=event.ts,
+        detector="app",
+        type=event_type,
+        confidence=confidence,
+        details=details,
+    )
+
+
+class AppPlugin(DetectorPlugin):
+    """Per-session RFB parser and scanners, kept in ``SESSION_STATE``."""
+
+    name = "app"
+    streams = ("app_stream",)
+
+    async def detect_batch(self, events: Sequence[contracts.ProxyEvent]) -> List[Result]:
+        return detect_each(events, self.detect)
+
+    def detect(self, event: ProxyEvent) -> DetectorEvent:
+        # Persist a simple clipboard/app artifact for this session.
+        try:
+            _append_clipboard_log(event.session_id, event)
+        except Exception as exc:
+            logger.warning("Failed to append clipboard log for session %s: %s", event.session_id, exc)
+
+        try:
+            analysis = analyze_payload(event)
+        except Exception as exc:
+            analysis = None
+            logger.warning("Failed to analyze app payload for session %s: %s", event.session_id, exc)
+
+        detector_event = build_detector_event(event, analysis)
+        dedup_clipboard(event, detector_event, analysis)
+        return detector_event
+
+    def session_ended(self, session_id: str) -> None:
+        SESSION_STATE.pop(session_id, None)
+
+    def status(self) -> Dict[str, object]:
+        return {"tracked_sessions": len(SESSION_STATE)}
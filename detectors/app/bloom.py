@@ -0,0 +1,59 @@
+"""Fixed-size Bloom filter for per-session clipboard deduplication."""
+
+from __future__ import annotations
+
+import hashlib
+
+
+def clipboard_digest(data: bytes) -> bytes:
+    return hashlib.blake2b(data, digest_size=16).digest()
+
+
+def length_prefix_digest(length: int, prefix: bytes) -> bytes:
+    """Digest used when the full clipboard content is not available."""
+
+    return clipboard_digest(length.to_bytes(8, "big") + prefix)
+
+
+class BloomFilter:
+    """Bit array of ``num_bits`` bits probed ``num_hashes`` times per item.
+
+    Items are 16-byte digests; the probe positions come from double hashing
+    over the two 64-bit halves of the digest, so no extra hashing is needed.
+    Memory is ``num_bits / 8`` bytes regardless of how many items are added.
+    """
+
+    __slots__ = ("_bits", "_num_bits", "_num_hashes")
+
+    def __init__(self, num_bits: int = 16384, num_hashes: int = 7) -> None:
+        if num_bits <= 0 or num_hashes <= 0:
+            raise ValueError("num_bits and num_hashes must be positive")
+        self._num_bits = num_bits
+        self._num_hashes = num_hashes
+        self._bits = bytearray((num_bits + 7) // 8)
+
+    def _positions(self, digest: bytes):
+        h1 = int.from_bytes(digest[:8], "big")
+        h2 = int.from_bytes(digest[8:16], "big") | 1
+        for i in range(self._num_hashes):
+            yield (h1 + i * h2) % self._num_bits
+
+    def add(self, digest: bytes) -> bool:
+        """Insert ``digest``; return True if it was (probably) present already."""
+
+        bits = self._bits
+        present = True
+        for pos in self._positions(digest):
+            byte, mask = pos >> 3, 1 << (pos & 7)
+            if not bits[byte] & mask:
+                present = False
+                bits[byte] |= mask
+        return present
+
+    def __contains__(self, digest: bytes) -> bool:
+        bits = self._bits
+        return all(bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(digest))
+
+    @property
+    def size_bytes(self) -> int:
+        return len(self._bits)
@@ -0,0 +1,290 @@
+"""Dangerous-command dictionary and a streaming Aho-Corasick matcher.
+
+The automaton is built once at import time from ``DEFAULT_COMMAND_PATTERNS``
+(plus an optional JSON file named by ``APP_COMMAND_PATTERNS_FILE``) and is
+shared read-only by every session. Each session only owns a
+``StreamScanner``, i.e. the current automaton state, so a command typed one
+keystroke per chunk is still matched and scanning stays linear in the input
+size no matter how many patterns are loaded.
+
+Text is normalised before matching: lower-cased and with whitespace runs
+collapsed to a single space, so ``curl  -s x |   sh`` matches ``| sh``.
+Dictionary patterns are anchored to token boundaries: a pattern that starts
+(ends) with a word character only matches when the character before (after)
+it is not one, so ``| sh`` does not fire on ``| shred`` nor ``telnet `` on
+``xtelnet ``. A match that still needs its end boundary is held until the
+next character arrives (or ``flush`` marks the end of the text).
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+from collections import deque
+from typing import Dict, Iterable, List, NamedTuple, Tuple
+
+
+logger = logging.getLogger("app_detector.command_patterns")
+
+
+# category -> (severity, patterns). Severity doubles as the detector
+# confidence when a pattern of that category is seen.
+DEFAULT_COMMAND_PATTERNS: Dict[str, Tuple[float, List[str]]] = {
+    "pipe_to_shell": (0.8, [
+        "| sh", "| bash", "| zsh", "| /bin/sh", "| /bin/bash", "| sudo sh", "| sudo bash",
+        "| python", "| python3", "| perl", "| iex", "| invoke-expression",
+    ]),
+    "remote_copy": (0.6, [
+        "scp ", "rsync ", "sftp ", "ftp -n", "ftp open", "smbclient ", "rclone copy", "rclone sync",
+        "aws s3 cp", "aws s3 sync", "gsutil cp", "azcopy copy", "curl -t ", "curl --upload-file",
+        "curl -f ", "curl --data-binary @", "curl -d @", "wget --post-file", "nc -w", "ncat --send-only",
+    ]),
+    "download_cradle": (0.6, [
+        "curl http", "curl -s http", "curl -fssl", "curl -o ", "wget http", "wget -q", "wget -o ",
+        "invoke-webrequest", "iwr ", "downloadstring(", "downloadfile(", "net.webclient",
+        "start-bitstransfer", "bitsadmin /transfer", "certutil -urlcache", "certutil.exe -urlcache",
+        "mshta http", "regsvr32 /s /n /u /i:", "msiexec /q /i http",
+    ]),
+    "encoding_pipeline": (0.5, [
+        "base64 -d", "base64 --decode", "base64 -w0", "base64 -w 0", "| base64", "| xxd", "xxd -p",
+        "xxd -r", "certutil -encode", "certutil -decode", "certutil.exe -encode", "certutil.exe -decode",
+        "openssl enc", "openssl base64", "gzip -c", "tar cz", "tar -cz", "zip -r", "7z a ", "uuencode",
+        "[convert]::tobase64string", "[convert]::frombase64string", "frombase64string(",
+    ]),
+    "encoded_execution": (0.8, [
+        "powershell -enc", "powershell -e ", "powershell.exe -enc", "pwsh -enc", "-encodedcommand",
+        "powershell -nop -w hidden", "powershell -windowstyle hidden", "python -c", "python3 -c",
+        "perl -e", "ruby -e", "php -r", "bash -c", "sh -c", "eval $(",
+    ]),
+    "reverse_shell": (0.9, [
+        "nc -e", "nc -c", "ncat -e", "ncat --exec", "/dev/tcp/", "/dev/udp/", "bash -i >&", "sh -i >&",
+        "mkfifo /tmp/", "socat exec:", "socat tcp", "telnet ", "0<&196",
+    ]),
+    "credential_access": (0.7, [
+        "/etc/shadow", "/etc/passwd", ".ssh/id_rsa", ".ssh/id_ed25519", ".aws/credentials",
+        ".docker/config.json", ".kube/config", "mimikatz", "sekurlsa::", "lsadump::", "procdump -ma lsass",
+        "reg save hklm\\sam", "reg save hklm\\system", "ntds.dit", "vssadmin create shadow",
+        "security find-generic-password", "security dump-keychain", "login.keychain", "cmdkey /list",
+    ]),
+    "dns_exfil": (0.6, [
+        "nslookup -type=txt", "nslookup -q=txt", "dig txt", "dig +short txt", "dnscat", "iodine ",
+        "dns2tcp",
+    ]),
+    "local_server": (0.5, [
+        "python -m http.server", "python3 -m http.server", "python -m simplehttpserver",
+        "php -s 0.0.0.0", "ngrok ", "cloudflared tunnel", "ssh -r ", "ssh -l ", "ssh -d ",
+    ]),
+    "anti_forensics": (0.6, [
+        "history -c", "unset histfile", "export histfile=/dev/null", "shred -u", "wevtutil cl",
+        "clear-eventlog", "rm -rf ~/.bash_history", "del /f /q",
+    ]),
+}
+
+
+class Match(NamedTuple):
+    pattern: str
+    category: str
+    severity: float
+
+
+def normalize(text: str) -> str:
+    return " ".join(text.lower().split())
+
+
+def _is_word(ch: str) -> bool:
+    return ch.isalnum() or ch == "_"
+
+
+def _load_extra_patterns(path: str) -> Dict[str, Tuple[float, List[str]]]:
+    """Load ``{"category": {"severity": 0.7, "patterns": [...]}}`` from JSON."""
+
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    extra: Dict[str, Tuple[float, List[str]]] = {}
+    for category, spec in data.items():
+        extra[str(category)] = (float(spec.get("severity", 0.5)), [str(p) for p in spec.get("patterns", [])])
+    return extra
+
+
+class AhoCorasick:
+    """Aho-Corasick automaton over normalised text.
+
+    Transitions are stored as one dict per state. ``_out`` holds only the
+    patterns ending exactly at a state; the remaining outputs are reached via
+    ``_dict_link`` (the nearest suffix state that is itself a match), so
+    reporting costs O(matches) rather than O(depth).
+
+    With ``word_boundaries`` the scanners only report matches that sit on
+    token boundaries (see the module docstring).
+    """
+
+    def __init__(self, patterns: Iterable[Tuple[str, str, float]], word_boundaries: bool = False) -> None:
+        self._goto: List[Dict[str, int]] = [{}]
+        self._out: List[List[Match]] = [[]]
+        self._fail: List[int] = [0]
+        self._dict_link: List[int] = [-1]
+        self.pattern_count = 0
+        self.word_boundaries = word_boundaries
+        # match -> (normalised length, needs start boundary, needs end boundary)
+        self._anchors: Dict[Match, Tuple[int, bool, bool]] = {}
+        self.max_length = 0
+
+        seen = set()
+        for raw, category, severity in patterns:
+            pattern = normalize(raw)
+            # Keep a leading/trailing space where the dictionary uses one to
+            # anchor a word ("scp ") - normalize() strips it.
+            if raw[:1].isspace():
+                pattern = " " + pattern
+            if raw[-1:].isspace():
+                pattern = pattern + " "
+            if not pattern.strip() or pattern in seen:
+                continue
+            seen.add(pattern)
+            match = Match(raw, category, severity)
+            self._anchors[match] = (len(pattern), _is_word(pattern[0]), _is_word(pattern[-1]))
+            self.max_length = max(self.max_length, len(pattern))
+            self._insert(pattern, match)
+        self._build_links()
+
+    def _insert(self, pattern: str, match: Match) -> None:
+        state = 0
+        for ch in pattern:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto.append({})
+                self._out.append([])
+                self._fail.append(0)
+                self._dict_link.append(-1)
+                self._goto[state][ch] = nxt
+            state = nxt
+        self._out[state].append(match)
+        self.pattern_count += 1
+
+    def _build_links(self) -> None:
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fail = self._fail[state]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                target = self._goto[fail].get(ch, 0)
+                self._fail[nxt] = target if target != nxt else 0
+                f = self._fail[nxt]
+                self._dict_link[nxt] = f if self._out[f] else self._dict_link[f]
+
+    def outputs(self, state: int) -> List[Match]:
+        found = list(self._out[state])
+        link = self._dict_link[state]
+        while link > 0:
+            found.extend(self._out[link])
+            link = self._dict_link[link]
+        return found
+
+    def scanner(self) -> "StreamScanner":
+        return StreamScanner(self)
+
+
+class StreamScanner:
+    """Per-session scan position inside a shared ``AhoCorasick`` automaton."""
+
+    __slots__ = ("_automaton", "_state", "_last_space", "_history", "_pending")
+
+    def __init__(self, automaton: AhoCorasick) -> None:
+        self._automaton = automaton
+        self._state = 0
+        self._last_space = False
+        # Boundary checks only: the last characters scanned, and matches
+        # waiting for the character after them.
+        self._history = ""
+        self._pending: List[Match] = []
+
+    def reset(self) -> None:
+        self._state = 0
+        self._last_space = False
+        self._history = ""
+        self._pending = []
+
+    def feed(self, text: str) -> List[Match]:
+        automaton = self._automaton
+        goto = automaton._goto
+        fail = automaton._fail
+        out = automaton._out
+        dict_link = automaton._dict_link
+        bounded = automaton.word_boundaries
+        state = self._state
+        last_space = self._last_space
+        history = self._history
+        matches: List[Match] = []
+
+        for ch in text.lower():
+            if ch.isspace():
+                if last_space:
+                    continue
+                ch = " "
+                last_space = True
+            else:
+                last_space = False
+            if bounded:
+                if self._pending:
+                    if not _is_word(ch):
+                        matches.extend(self._pending)
+                    self._pending = []
+                history = (history + ch)[-(automaton.max_length + 1):]
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if out[state] or dict_link[state] > 0:
+                found = automaton.outputs(state)
+                if bounded:
+                    found = self._anchored(found, history)
+                matches.extend(found)
+
+        self._state = state
+        self._last_space = last_space
+        self._history = history
+        return matches
+
+    def flush(self) -> List[Match]:
+        """End of text: report matches that were waiting for an end boundary."""
+
+        pending, self._pending = self._pending, []
+        return pending
+
+    def _anchored(self, found: List[Match], history: str) -> List[Match]:
+        anchors = self._automaton._anchors
+        accepted = []
+        for match in found:
+            length, needs_start, needs_end = anchors[match]
+            if needs_start and len(history) > length and _is_word(history[-length - 1]):
+                continue
+            if needs_end:
+                self._pending.append(match)
+            else:
+                accepted.append(match)
+        return accepted
+
+
+def build_default_automaton() -> AhoCorasick:
+    catalogue = dict(DEFAULT_COMMAND_PATTERNS)
+    extra_path = os.getenv("APP_COMMAND_PATTERNS_FILE")
+    if extra_path:
+        try:
+            for category, (severity, patterns) in _load_extra_patterns(extra_path).items():
+                base_severity, base_patterns = catalogue.get(category, (severity, []))
+                catalogue[category] = (max(base_severity, severity), base_patterns + patterns)
+        except Exception as exc:
+            logger.warning("Failed to load command patterns from %s: %s", extra_path, exc)
+
+    entries = (
+        (pattern, category, severity)
+        for category, (severity, patterns) in catalogue.items()
+        for pattern in patterns
+    )
+    automaton = AhoCorasick(entries, word_boundaries=True)
+    logger.info("Built command automaton with %d patterns", automaton.pattern_count)
+    return automaton
@@ -0,0 +1,281 @@
+"""Incremental parser for the client-to-server half of the RFB protocol.
+
+The proxy forwards raw TCP chunks, so RFB messages routinely straddle chunk
+boundaries. ``ClientMessageParser`` keeps just enough state per session to
+resume parsing where the previous chunk stopped and yields the message
+kinds the detectors care about:
+
+- ``KeyText``: printable text decoded from key-down ``KeyEvent`` messages.
+- ``CutTextFragment``: pieces of a ``ClientCutText`` (clipboard) payload.
+  Large clipboard transfers are streamed out fragment by fragment instead of
+  being buffered whole.
+- ``SetPixelFormat``: the 16-byte pixel format the client asked for, which
+  the visual detector's framebuffer reconstruction decodes updates with.
+
+Every other client message is skipped by length, including the common
+extensions (continuous updates, fences, xvp, SetDesktopSize, gii, QEMU; a
+QEMU extended key event is decoded like a ``KeyEvent``). A message type the
+parser does not know means framing is lost: the rest of that chunk is
+dropped (``desynced`` is set until the next chunk) and parsing resumes at
+the next chunk, since clients write whole messages per send.
+"""
+
+from __future__ import annotations
+
+import struct
+from typing import Iterator, List, NamedTuple, Union
+
+
+# Client-to-server message types (RFC 6143 section 7.5)
+MSG_SET_PIXEL_FORMAT = 0
+MSG_SET_ENCODINGS = 2
+MSG_FRAMEBUFFER_UPDATE_REQUEST = 3
+MSG_KEY_EVENT = 4
+MSG_POINTER_EVENT = 5
+MSG_CLIENT_CUT_TEXT = 6
+# Registered extensions (RFC 6143 section 7.5 / community RFB spec)
+MSG_ENABLE_CONTINUOUS_UPDATES = 150
+MSG_CLIENT_FENCE = 248
+MSG_XVP = 250
+MSG_SET_DESKTOP_SIZE = 251
+MSG_GII = 253
+MSG_QEMU = 255
+
+_QEMU_EXTENDED_KEY_EVENT = 0
+_QEMU_AUDIO = 1
+_QEMU_AUDIO_SET_FORMAT = 2
+
+_FIXED_LENGTHS = {
+    MSG_SET_PIXEL_FORMAT: 20,
+    MSG_FRAMEBUFFER_UPDATE_REQUEST: 10,
+    MSG_KEY_EVENT: 8,
+    MSG_POINTER_EVENT: 6,
+    MSG_ENABLE_CONTINUOUS_UPDATES: 10,
+    MSG_XVP: 4,
+}
+
+# Keysyms that map onto whitespace in a typed command line.
+_KEYSYM_TEXT = {
+    0xFF09: "\t",  # Tab
+    0xFF0D: "\n",  # Return
+    0xFF8D: "\n",  # KP_Enter
+    0xFF80: " ",  # KP_Space
+}
+
+
+def _gii_length(buf: bytearray, pos: int) -> int:
+    # Bit 7 of the endian-and-sub-type byte selects big-endian lengths.
+    return struct.unpack_from(">H" if buf[pos + 1] & 0x80 else "<H", buf, pos + 2)[0]
+
+
+# message type -> (header length, payload length read from the header)
+_VARIABLE_LENGTHS = {
+    MSG_CLIENT_FENCE: (9, lambda buf, pos: buf[pos + 8]),
+    MSG_SET_DESKTOP_SIZE: (8, lambda buf, pos: 16 * buf[pos + 6]),
+    MSG_GII: (4, _gii_length),
+}
+
+_VERSION_PREFIX = b"RFB "
+_VERSION_LENGTH = 12
+# RFB 3.3: the server picks the security type, the client sends none.
+_VERSION_3_3 = b"RFB 003.003\n"
+_SECURITY_VNC_AUTH = 2
+_VNC_AUTH_RESPONSE_LENGTH = 16
+
+
+class KeyText(NamedTuple):
+    text: str
+
+
+class CutTextFragment(NamedTuple):
+    data: bytes
+    total_length: int
+    first: bool
+    last: bool
+
+
+class SetPixelFormat(NamedTuple):
+    pixel_format: bytes
+
+
+ClientMessage = Union[KeyText, CutTextFragment, SetPixelFormat]
+
+
+def keysym_to_text(keysym: int) -> str:
+    """Translate an X11 keysym into the text it would type, or ``""``."""
+
+    if 0x20 <= keysym <= 0x7E or 0xA0 <= keysym <= 0xFF:
+        return chr(keysym)
+    if 0xFFB0 <= keysym <= 0xFFB9:  # KP_0 .. KP_9
+        return chr(ord("0") + keysym - 0xFFB0)
+    if 0x01000100 <= keysym <= 0x0110FFFF:  # Unicode keysyms
+        return chr(keysym - 0x01000000)
+    return _KEYSYM_TEXT.get(keysym, "")
+
+
+class ClientMessageParser:
+    """Stateful, chunk-boundary-safe parser for client-to-server RFB bytes.
+
+    If a stream does not start with an RFB ``ProtocolVersion`` the parser
+    assumes it joined an established session and parses messages directly.
+    An unknown message type means the parser has lost framing; it drops the
+    rest of the chunk (``desynced`` until the next ``feed``, counted in
+    ``resyncs``) and starts over at the next chunk rather than guessing.
+    """
+
+    def __init__(self) -> None:
+        self._buf = bytearray()
+        self._state = "start"
+        self._cut_remaining = 0
+        self._cut_total = 0
+        self._cut_started = False
+        self.desynced = False
+        self.resyncs = 0
+
+    def feed(self, data: bytes) -> List[ClientMessage]:
+        self.desynced = False
+        if not data:
+            return []
+        self._buf.extend(data)
+        return list(self._drain())
+
+    def _drain(self) -> Iterator[ClientMessage]:
+        buf = self._buf
+        pos = 0
+        try:
+            while pos < len(buf):
+                state = self._state
+                available = len(buf) - pos
+
+                if state == "start":
+                    if available < len(_VERSION_PREFIX):
+                        break
+                    if bytes(buf[pos:pos + len(_VERSION_PREFIX)]) == _VERSION_PREFIX:
+                        self._state = "version"
+                    else:
+                        self._state = "messages"
+                    continue
+
+                if state == "version":
+                    if available < _VERSION_LENGTH:
+                        break
+                    version = bytes(buf[pos:pos + _VERSION_LENGTH])
+                    pos += _VERSION_LENGTH
+                    self._state = "security_3_3" if version == _VERSION_3_3 else "security"
+                    continue
+
+                if state == "security_3_3":
+                    # The client's next write is either the 16-byte VNC
+                    # authentication response or the 1-byte ClientInit.
+                    if available == 1:
+                        self._state = "client_init"
+                        continue
+                    if available < _VNC_AUTH_RESPONSE_LENGTH:
+                        break
+                    pos += _VNC_AUTH_RESPONSE_LENGTH
+                    self._state = "client_init"
+                    continue
+
+                if state == "security":
+                    security_type = buf[pos]
+                    pos += 1
+                    self._state = "vnc_auth" if security_type == _SECURITY_VNC_AUTH else "client_init"
+                    continue
+
+                if state == "vnc_auth":
+                    if available < _VNC_AUTH_RESPONSE_LENGTH:
+                        break
+                    pos += _VNC_AUTH_RESPONSE_LENGTH
+                    self._state = "client_init"
+                    continue
+
+                if state == "client_init":
+                    pos += 1
+                    self._state = "messages"
+                    continue
+
+                if state == "cut_text":
+                    take = min(self._cut_remaining, available)
+                    self._cut_remaining -= take
+                    first = not self._cut_started
+                    self._cut_started = True
+                    last = self._cut_remaining == 0
+                    yield CutTextFragment(bytes(buf[pos:pos + take]), self._cut_total, first, last)
+                    pos += take
+                    if last:
+                        self._state = "messages"
+                    continue
+
+                msg_type = buf[pos]
+                if msg_type in _FIXED_LENGTHS:
+                    length = _FIXED_LENGTHS[msg_type]
+                    if available < length:
+                        break
+                    if msg_type == MSG_KEY_EVENT and buf[pos + 1]:
+                        (keysym,) = struct.unpack_from(">I", buf, pos + 4)
+                        text = keysym_to_text(keysym)
+                        if text:
+                            yield KeyText(text)
+                    elif msg_type == MSG_SET_PIXEL_FORMAT:
+                        yield SetPixelFormat(bytes(buf[pos + 4:pos + 20]))
+                    pos += length
+                elif msg_type == MSG_QEMU:
+                    if available < 4:
+                        break
+                    subtype = buf[pos + 1]
+                    if subtype == _QEMU_EXTENDED_KEY_EVENT:
+                        length = 12
+                    elif subtype == _QEMU_AUDIO:
+                        (operation,) = struct.unpack_from(">H", buf, pos + 2)
+                        length = 10 if operation == _QEMU_AUDIO_SET_FORMAT else 4
+                    else:
+                        self._resync()
+                        pos = len(buf)
+                        break
+                    if available < length:
+                        break
+                    if subtype == _QEMU_EXTENDED_KEY_EVENT:
+                        down, keysym = struct.unpack_from(">HI", buf, pos + 2)
+                        text = keysym_to_text(keysym) if down else ""
+                        if text:
+                            yield KeyText(text)
+                    pos += length
+                elif msg_type in _VARIABLE_LENGTHS:
+                    header, length_of = _VARIABLE_LENGTHS[msg_type]
+                    if available < header:
+                        break
+                    length = header + length_of(buf, pos)
+                    if available < length:
+                        break
+                    pos += length
+                elif msg_type == MSG_SET_ENCODINGS:
+                    if available < 4:
+                        break
+                    (count,) = struct.unpack_from(">H", buf, pos + 2)
+                    length = 4 + 4 * count
+                    if available < length:
+                        break
+                    pos += length
+                elif msg_type == MSG_CLIENT_CUT_TEXT:
+                    if available < 8:
+                        break
+                    (text_length,) = struct.unpack_from(">I", buf, pos + 4)
+                    pos += 8
+                    if text_length == 0:
+                        yield CutTextFragment(b"", 0, True, True)
+                        continue
+                    self._cut_total = text_length
+                    self._cut_remaining = text_length
+                    self._cut_started = False
+                    self._state = "cut_text"
+                else:
+                    self._resync()
+                    pos = len(buf)
+                    break
+        finally:
+            del buf[:pos]
+
+    def _resync(self) -> None:
+        self.desynced = True
+        self.resyncs += 1
+        self._state = "messages"
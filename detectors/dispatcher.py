@@ -7,29 +7,33 @@ which then distributes them to the correct detector service.
 """
 
 from fastapi import FastAPI, Request
-from pydantic import BaseModel
 import httpx
 import logging
-from typing import Literal
+import os
+import sys
+from pathlib import Path
 
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("dispatcher")
 
-app = FastAPI(title="SentinelVNC Detector Dispatcher")
+_project_root = Path(__file__).resolve().parents[1]
+if str(_project_root) not in sys.path:
+    sys.path.insert(0, str(_project_root))
+
+from shared.contracts import JSON_HEADERS, ProxyEvent, json_body  # noqa: E402
+from shared.service_logging import EventLogSampler, configure_logging  # noqa: E402
 
-# Detector endpoints
-NETWORK_DETECTOR = "http://localhost:8001/events"
-APP_DETECTOR = "http://localhost:8002/events"
-VISUAL_DETECTOR = "http://localhost:8003/events"
+configure_logging("dispatcher")
+
+app = FastAPI(title="SentinelVNC Detector Dispatcher")
 
+# Detector endpoints. Detectors co-located in one detectors/host.py process
+# share its URL.
+NETWORK_DETECTOR = os.getenv("NETWORK_DETECTOR_URL", "http://localhost:8001/events")
+APP_DETECTOR = os.getenv("APP_DETECTOR_URL", "http://localhost:8002/events")
+VISUAL_DETECTOR = os.getenv("VISUAL_DETECTOR_URL", "http://localhost:8003/events")
 
-class ProxyEvent(BaseModel):
-    session_id: str
-    ts: str
-    stream: Literal["network_stream", "app_stream", "visual_stream"]
-    direction: Literal["client_to_server", "server_to_client"]
-    type: Literal["raw_chunk"]
-    length: int
+# Routed events are counted per detector; one in LOG_EVENT_SAMPLE_RATE is logged.
+event_log = EventLogSampler(logger)
 
 
 @app.get("/health")
@@ -39,11 +43,14 @@ async def health():
 
 
 @app.post("/events")
-async def dispatch_event(event: ProxyEvent):
+async def dispatch_event(request: Request, event: ProxyEvent = json_body(ProxyEvent)):
     """Route events to appropriate detector based on stream type.
     
     Fire-and-forget: Returns immediately after queuing the event to detector.
     This prevents blocking on the full detection chain.
+
+    The validated request body is forwarded as received rather than
+    re-serialized from the model.
     """
     import asyncio
     
@@ -61,16 +68,19 @@ async def dispatch_event(event: ProxyEvent):
         detector_name = "visual"
     
     if target:
+        body = await request.body()
+
         # Fire-and-forget: Don't wait for detector response
         async def forward_to_detector():
             async with httpx.AsyncClient(timeout=10.0) as client:
                 try:
-                    resp = await client.post(target, json=event.dict(), timeout=10.0)
+                    resp = await client.post(target, content=body, headers=JSON_HEADERS, timeout=10.0)
                     if resp.status_code == 200:
-                        logger.debug(
-                            f"Routed {event.stream} (session={event.session_id[:8]}, "
-                            f"length={event.length}) to {detector_name} detector"
-                        )
+                        if event_log.sampled("routed", tag=detector_name):
+                            logger.info(
+                                "Routed %s (session=%s, length=%d) to %s detector",
+                                event.stream, event.session_id[:8], event.length, detector_name,
+                            )
                     else:
                         logger.warning(
                             f"Failed to route to {detector_name}: HTTP {resp.status_code} - {resp.text[:100]}"
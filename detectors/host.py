@@ -0,0 +1,30 @@
+"""SentinelVNC Detector Host: any set of detector plugins in one service.
+
+``DETECTOR_PLUGINS`` lists the plugins to load, by registry name or as
+``module:Class`` (see ``detectors/plugin.py``). The usual layout co-locates
+the cheap detectors and leaves the visual one in its own process::
+
+    DETECTOR_PLUGINS=network,app uvicorn detectors.host:app --port 8001
+    uvicorn detectors.visual.main:app --port 8003
+
+with the dispatcher's ``NETWORK_DETECTOR_URL`` and ``APP_DETECTOR_URL`` both
+pointing at the host.
+"""
+
+import os
+import sys
+from pathlib import Path
+
+_project_root = Path(__file__).resolve().parents[1]
+if str(_project_root) not in sys.path:
+    sys.path.insert(0, str(_project_root))
+
+from detectors.plugin import load_plugins  # noqa: E402
+from detectors.plugin_host import create_app  # noqa: E402
+from shared.service_logging import configure_logging  # noqa: E402
+
+configure_logging("detector_host")
+
+DETECTOR_PLUGINS = os.getenv("DETECTOR_PLUGINS", "network,app,visual")
+
+app = create_app(load_plugins(DETECTOR_PLUGINS.split(",")))
@@ -0,0 +1,70 @@
+"""Network detector: size/direction heuristics for tunneling and transfers."""
+
+from typing import List, Literal, Sequence
+
+from detectors.plugin import DetectorPlugin, Result, detect_each
+from shared import contracts
+
+
+class ProxyEvent(contracts.ProxyEvent):
+    stream: Literal["network_stream"]
+
+
+class DetectorEvent(contracts.DetectorEvent):
+    detector: Literal["network"]
+
+
+def build_detector_event(event: ProxyEvent) -> DetectorEvent:
+    # Heuristic DNS/ICMP anomaly detection based only on packet size
+    # and direction. The proxy currently does not expose full protocol
+    # metadata, so these are best-effort signals for tunneling.
+
+    if event.direction == "client_to_server":
+        if event.length > 50000:  # Very large file transfers
+            event_type = "file_transfer_candidate"
+            confidence = 0.7
+        elif event.length > 1500:
+            # Large client packets are likely file transfers
+            event_type = "file_transfer_candidate"
+            confidence = 0.5
+        elif 60 <= event.length <= 120:
+            # Typical DNS packets are small; a sustained pattern of
+            # similarly sized packets can indicate DNS tunneling.
+            event_type = "dns_tunnel_suspected"
+            confidence = 0.4
+        elif 100 <= event.length <= 300:
+            # ICMP echo with unusual payload sizes used for tunneling.
+            event_type = "icmp_tunnel_suspected"
+            confidence = 0.4
+        elif event.length > 0:
+            event_type = "network_activity"
+            confidence = 0.05
+        else:
+            event_type = "network_activity"
+            confidence = 0.01
+    else:
+        # Server-to-client traffic: still useful for context but lower impact.
+        event_type = "server_response_activity"
+        confidence = 0.05
+
+    return DetectorEvent.trusted(
+        session_id=event.session_id,
+        timestamp=event.ts,
+        detector="network",
+        type=event_type,
+        confidence=confidence,
+        details={
+            "length": event.length,
+            "direction": event.direction,
+        },
+    )
+
+
+class NetworkPlugin(DetectorPlugin):
+    """Stateless: every chunk is judged on its own."""
+
+    name = "network"
+    streams = ("network_stream",)
+
+    async def detect_batch(self, events: Sequence[contracts.ProxyEvent]) -> List[Result]:
+        return detect_each(events, build_detector_event)
@@ -0,0 +1,122 @@
+"""Detector plugin interface and registry.
+
+A detector is a ``DetectorPlugin``; ``detectors/plugin_host.py`` runs any set
+of them in one process behind one ``POST /events``. Cheap detectors (network,
+app) can share a host while the expensive visual detector runs in its own
+process, without another service per detector.
+
+A plugin declares the ``streams`` it handles and implements:
+
+- ``detect_batch(events)``: the ``ProxyEvent`` chunks of one batch, in the
+  order the host received them, returning one ``DetectorEvent`` (or
+  ``None`` when there is nothing to report) per chunk. A chunk that could
+  not be handled gets the exception in its slot instead: only that chunk's
+  request fails, not the batch it shared. The host never runs two batches
+  of the same plugin at once, but other calls on the event loop
+  (``session_ended`` from ``POST /sessions/{id}/end``, the plugin's router)
+  can run while a batch awaits: state handed to a worker thread must not
+  be dropped or closed under it (``VisualPlugin`` defers those). Receive
+  order is not the proxy's order, since concurrent requests can overtake
+  each other; a plugin that needs stream order reorders on
+  ``ProxyEvent.seq`` (see ``detectors/visual/framebuffer.py``);
+- ``session_started``/``session_ended``: per-session state hooks. The host
+  calls ``session_started`` before a session's first chunk reaches the
+  plugin, and ``session_ended`` when the session is ended explicitly, has
+  been idle for ``DETECTOR_SESSION_IDLE`` seconds, or is the least recently
+  seen beyond ``DETECTOR_MAX_SESSIONS``; the plugin drops its state then.
+
+Optionally, ``start(emit)``/``stop()`` for background work (``emit`` sends a
+``DetectorEvent`` produced outside ``detect_batch``, e.g. a finding from a
+queued analysis), ``risk_result(event, response)`` to see the risk engine's
+reply to the plugin's events, ``status()`` and a FastAPI ``router`` for
+plugin-specific endpoints.
+
+``load_plugins`` builds plugins from registry names (``PLUGINS``) or
+``module:Class`` references, so a new detector can be loaded without
+editing this file. Stream and detector names are part of the event
+contracts (``shared/contracts.py``); a new detector adds its names there.
+"""
+
+from __future__ import annotations
+
+import abc
+import importlib
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+from fastapi import APIRouter
+
+from shared.contracts import DetectorEvent, ProxyEvent
+
+
+Emit = Callable[[DetectorEvent], None]
+# One chunk's outcome: its event, None when there is nothing to report, or
+# the exception handling it raised.
+Result = Union[DetectorEvent, BaseException, None]
+
+PLUGINS: Dict[str, str] = {
+    "network": "detectors.network.network_plugin:NetworkPlugin",
+    "app": "detectors.app.app_plugin:AppPlugin",
+    "visual": "detectors.visual.visual_plugin:VisualPlugin",
+}
+
+
+class DetectorPlugin(abc.ABC):
+    """Base class for detectors run by ``DetectorHost``."""
+
+    name: str = ""
+    streams: Tuple[str, ...] = ()
+    router: Optional[APIRouter] = None
+
+    def __init__(self) -> None:
+        self.emit: Emit = lambda event: None
+
+    async def start(self, emit: Emit) -> None:
+        self.emit = emit
+
+    async def stop(self) -> None:
+        pass
+
+    @abc.abstractmethod
+    async def detect_batch(self, events: Sequence[ProxyEvent]) -> List[Result]:
+        """One result per chunk: a ``DetectorEvent``, ``None``, or the exception it failed with."""
+
+    def session_started(self, session_id: str) -> None:
+        pass
+
+    def session_ended(self, session_id: str) -> None:
+        pass
+
+    def risk_result(self, event: Dict[str, object], response: Dict[str, object]) -> None:
+        pass
+
+    def status(self) -> Dict[str, object]:
+        return {}
+
+
+def detect_each(events: Sequence[ProxyEvent], detect: Callable[[ProxyEvent], Optional[DetectorEvent]]) -> List[Result]:
+    """``detect(event)`` for each chunk; a chunk that raises gets its exception instead."""
+
+    results: List[Result] = []
+    for event in events:
+        try:
+            results.append(detect(event))
+        except Exception as exc:
+            results.append(exc)
+    return results
+
+
+def load_plugin(spec: str) -> DetectorPlugin:
+    """Instantiate a plugin from a registry name or a ``module:Class`` reference."""
+
+    target = PLUGINS.get(spec, spec)
+    module_name, sep, class_name = target.partition(":")
+    if not sep:
+        raise ValueError(f"Unknown detector plugin {spec!r}; expected one of {sorted(PLUGINS)} or module:Class")
+    plugin = getattr(importlib.import_module(module_name), class_name)()
+    if not isinstance(plugin, DetectorPlugin):
+        raise TypeError(f"{target} is not a DetectorPlugin")
+    return plugin
+
+
+def load_plugins(specs: Sequence[str]) -> List[DetectorPlugin]:
+    return [load_plugin(spec.strip()) for spec in specs if spec.strip()]
@@ -0,0 +1,319 @@
+"""Runs a set of ``DetectorPlugin``s in one process and feeds them batches.
+
+``create_app(plugins)`` builds the FastAPI service:
+
+- ``POST /events`` takes one ``ProxyEvent`` and replies with the detector
+  event it produced, like the standalone detectors always have;
+- ``POST /events/batch`` takes ``{"events": [...]}`` for any mix of the
+  loaded plugins' streams and replies with ``detector_events`` in order;
+- ``POST /sessions/{session_id}/end`` ends a session in every plugin;
+- ``GET /status`` reports batches, sessions, each plugin's ``status()`` and
+  the risk sender; plugins' own routers are mounted as well.
+
+Each plugin gets one queue and one worker. The worker takes what is queued
+(up to ``DETECTOR_BATCH_SIZE`` chunks, waiting ``DETECTOR_BATCH_WAIT``
+seconds for more when set) and makes one ``detect_batch`` call, so
+concurrent requests share a call under load and a plugin never sees two
+batches at once. Other calls are not held back: while a batch awaits,
+``POST /sessions/{session_id}/end`` and the plugins' routers still run on
+the event loop and can reach the same plugin. A chunk whose slot in the
+results holds an exception fails its own request only; a ``detect_batch``
+that raises fails the whole batch. Before the call the host opens and
+expires sessions (``session_started``/``session_ended``). Detector events go
+to the risk engine through one shared ``RiskSender``; its replies are handed
+back to the plugin that produced the event.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from fastapi import FastAPI, HTTPException
+
+from detectors.plugin import DetectorPlugin
+from shared.contracts import ContractResponse, DetectorEvent, ProxyEvent, ProxyEventBatch, json_body
+from shared.risk_sender import RiskSender
+from shared.service_logging import EventLogSampler
+
+
+DETECTOR_BATCH_SIZE = int(os.getenv("DETECTOR_BATCH_SIZE", "64"))
+DETECTOR_BATCH_WAIT = float(os.getenv("DETECTOR_BATCH_WAIT", "0"))
+DETECTOR_SESSION_IDLE = float(os.getenv("DETECTOR_SESSION_IDLE", "900"))
+DETECTOR_MAX_SESSIONS = int(os.getenv("DETECTOR_MAX_SESSIONS", "20000"))
+
+Pending = Tuple[ProxyEvent, asyncio.Future]
+
+
+class DetectorHost:
+    """Per-plugin batching workers, session lifecycle and risk delivery."""
+
+    def __init__(
+        self,
+        plugins: Sequence[DetectorPlugin],
+        risk_sender: Optional[RiskSender] = None,
+        batch_size: int = DETECTOR_BATCH_SIZE,
+        batch_wait: float = DETECTOR_BATCH_WAIT,
+        session_idle: float = DETECTOR_SESSION_IDLE,
+        max_sessions: int = DETECTOR_MAX_SESSIONS,
+        logger: Optional[logging.Logger] = None,
+    ) -> None:
+        self.logger = logger or logging.getLogger("detector_host")
+        self.plugins = list(plugins)
+        self.by_stream: Dict[str, DetectorPlugin] = {}
+        for plugin in self.plugins:
+            for stream in plugin.streams:
+                if stream in self.by_stream:
+                    raise ValueError(f"{stream} is handled by both {self.by_stream[stream].name} and {plugin.name}")
+                self.by_stream[stream] = plugin
+        self.by_name = {plugin.name: plugin for plugin in self.plugins}
+        self.risk_sender = risk_sender or RiskSender(logger=self.logger)
+        self.risk_sender.on_result = self._risk_result
+        self.batch_size = max(1, batch_size)
+        self.batch_wait = max(0.0, batch_wait)
+        self.session_idle = session_idle
+        self.max_sessions = max(1, max_sessions)
+        self.event_log = EventLogSampler(self.logger)
+        # Per plugin: session_id -> last seen (monotonic), least recent first.
+        self._sessions: Dict[str, "OrderedDict[str, float]"] = {plugin.name: OrderedDict() for plugin in self.plugins}
+        self._queues: Dict[str, asyncio.Queue] = {}
+        self._tasks: List[asyncio.Task] = []
+        self.stats: Dict[str, Dict[str, int]] = {
+            plugin.name: {"events": 0, "batches": 0, "errors": 0, "sessions_ended": 0} for plugin in self.plugins
+        }
+
+    # ---- lifecycle -------------------------------------------------------
+
+    async def start(self) -> None:
+        if self._tasks:
+            return
+        await self.risk_sender.start()
+        for plugin in self.plugins:
+            await plugin.start(self.emit)
+            self._queues[plugin.name] = asyncio.Queue()
+            self._tasks.append(asyncio.create_task(self._worker(plugin), name=f"detector-{plugin.name}"))
+
+    async def stop(self) -> None:
+        if not self._tasks:
+            return
+        for queue in self._queues.values():
+            await queue.join()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        for plugin in self.plugins:
+            try:
+                await plugin.stop()
+            except Exception as exc:
+                self.logger.warning("Detector plugin %s failed to stop cleanly: %s", plugin.name, exc)
+        await self.risk_sender.stop()
+        self.event_log.flush()
+
+    # ---- events ----------------------------------------------------------
+
+    def plugin_for(self, event: ProxyEvent) -> DetectorPlugin:
+        plugin = self.by_stream.get(event.stream)
+        if plugin is None:
+            raise HTTPException(status_code=422, detail=f"No detector loaded for {event.stream}")
+        return plugin
+
+    def _enqueue(self, event: ProxyEvent) -> asyncio.Future:
+        future = asyncio.get_running_loop().create_future()
+        self._queues[self.plugin_for(event).name].put_nowait((event, future))
+        return future
+
+    async def process(self, event: ProxyEvent) -> Optional[DetectorEvent]:
+        return await self._enqueue(event)
+
+    async def process_many(self, events: Sequence[ProxyEvent]) -> List[Optional[DetectorEvent]]:
+        for event in events:
+            self.plugin_for(event)  # reject the whole batch before queueing any of it
+        return list(await asyncio.gather(*(self._enqueue(event) for event in events)))
+
+    def emit(self, detector_event: DetectorEvent) -> None:
+        self.risk_sender.submit(detector_event)
+
+    async def _next_batch(self, queue: asyncio.Queue) -> List[Pending]:
+        batch = [await queue.get()]
+        self._drain_into(queue, batch)
+        if len(batch) < self.batch_size and self.batch_wait > 0:
+            await asyncio.sleep(self.batch_wait)
+            self._drain_into(queue, batch)
+        return batch
+
+    def _drain_into(self, queue: asyncio.Queue, batch: List[Pending]) -> None:
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(queue.get_nowait())
+            except asyncio.QueueEmpty:
+                return
+
+    async def _worker(self, plugin: DetectorPlugin) -> None:
+        queue = self._queues[plugin.name]
+        stats = self.stats[plugin.name]
+        while True:
+            batch = await self._next_batch(queue)
+            events = [event for event, _ in batch]
+            try:
+                self._track_sessions(plugin, events)
+                results = await plugin.detect_batch(events)
+                if len(results) != len(events):
+                    raise RuntimeError(f"returned {len(results)} results for {len(events)} events")
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                stats["errors"] += 1
+                self.logger.exception("Detector plugin %s failed on a batch of %d events", plugin.name, len(events))
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(exc)
+            else:
+                stats["events"] += len(events)
+                stats["batches"] += 1
+                for (event, future), detector_event in zip(batch, results):
+                    if isinstance(detector_event, BaseException):
+                        # Only this chunk failed; the rest of the batch stands.
+                        stats["errors"] += 1
+                        self.logger.error(
+                            "Detector plugin %s failed on a chunk of session %s",
+                            plugin.name,
+                            event.session_id,
+                            exc_info=detector_event,
+                        )
+                        if not future.done():
+                            future.set_exception(detector_event)
+                        continue
+                    if detector_event is not None:
+                        self.risk_sender.submit(detector_event)
+                        self._log_event(plugin, event, detector_event)
+                    if not future.done():
+                        future.set_result(detector_event)
+            finally:
+                for _ in batch:
+                    queue.task_done()
+
+    def _log_event(self, plugin: DetectorPlugin, event: ProxyEvent, detector_event: DetectorEvent) -> None:
+        if self.event_log.sampled(plugin.name, tag=detector_event.type):
+            self.logger.info(
+                "%s event: session_id=%s length=%d direction=%s type=%s",
+                plugin.name,
+                event.session_id,
+                event.length,
+                event.direction,
+                detector_event.type,
+                extra={"fields": {"detector_event": detector_event.model_dump()}},
+            )
+
+    # ---- sessions --------------------------------------------------------
+
+    def _track_sessions(self, plugin: DetectorPlugin, events: Sequence[ProxyEvent]) -> None:
+        sessions = self._sessions[plugin.name]
+        now = time.monotonic()
+        for event in events:
+            session_id = event.session_id
+            if session_id in sessions:
+                sessions.move_to_end(session_id)
+            else:
+                plugin.session_started(session_id)
+            sessions[session_id] = now
+        while sessions:
+            session_id, last_seen = next(iter(sessions.items()))
+            if len(sessions) <= self.max_sessions and now - last_seen < self.session_idle:
+                break
+            del sessions[session_id]
+            self._end(plugin, session_id)
+
+    def _end(self, plugin: DetectorPlugin, session_id: str) -> None:
+        self.stats[plugin.name]["sessions_ended"] += 1
+        try:
+            plugin.session_ended(session_id)
+        except Exception as exc:
+            self.logger.warning("Detector plugin %s failed to end session %s: %s", plugin.name, session_id, exc)
+
+    def end_session(self, session_id: str) -> List[str]:
+        """End ``session_id`` in every plugin that has seen it; returns their names."""
+
+        ended = []
+        for plugin in self.plugins:
+            if self._sessions[plugin.name].pop(session_id, None) is not None:
+                self._end(plugin, session_id)
+                ended.append(plugin.name)
+        return ended
+
+    # ---- risk engine replies ---------------------------------------------
+
+    def _risk_result(self, event: Dict[str, object], response: Dict[str, object]) -> None:
+        plugin = self.by_name.get(str(event.get("detector")))
+        if plugin is not None:
+            plugin.risk_result(event, response)
+
+    def status(self) -> Dict[str, object]:
+        return {
+            "detectors": {
+                plugin.name: {
+                    "streams": list(plugin.streams),
+                    "queued": self._queues[plugin.name].qsize() if plugin.name in self._queues else 0,
+                    "sessions": len(self._sessions[plugin.name]),
+                    **self.stats[plugin.name],
+                    **plugin.status(),
+                }
+                for plugin in self.plugins
+            },
+            "risk_sender": self.risk_sender.status(),
+        }
+
+
+def create_app(
+    plugins: Sequence[DetectorPlugin],
+    title: str = "SentinelVNC Detector Host",
+    service: str = "detector_host",
+    host: Optional[DetectorHost] = None,
+) -> FastAPI:
+    """FastAPI service running ``plugins``; the host is at ``app.state.host``."""
+
+    host = host or DetectorHost(plugins, logger=logging.getLogger(service))
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        await host.start()
+        try:
+            yield
+        finally:
+            await host.stop()
+
+    app = FastAPI(title=title, lifespan=lifespan)
+    app.state.host = host
+
+    @app.get("/health")
+    async def health():
+        """Health check endpoint."""
+        return {"status": "ok", "service": service, "detectors": [plugin.name for plugin in host.plugins]}
+
+    @app.post("/events")
+    async def handle_event(event: ProxyEvent = json_body(ProxyEvent)):
+        return ContractResponse({"status": "ok", "detector_event": await host.process(event)})
+
+    @app.post("/events/batch")
+    async def handle_event_batch(batch: ProxyEventBatch = json_body(ProxyEventBatch)):
+        """``detector_events[i]`` is what ``/events`` would return for ``events[i]``."""
+
+        return ContractResponse({"status": "ok", "detector_events": await host.process_many(batch.events)})
+
+    @app.post("/sessions/{session_id}/end")
+    async def end_session(session_id: str):
+        return {"status": "ok", "session_id": session_id, "detectors": host.end_session(session_id)}
+
+    @app.get("/status")
+    async def status():
+        return host.status()
+
+    for plugin in host.plugins:
+        if plugin.router is not None:
+            app.include_router(plugin.router)
+    return app
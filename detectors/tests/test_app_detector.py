@@ -0,0 +1,170 @@
+from __future__ import annotations
+
+import base64
+import struct
+
+from detectors.app import main as app_main
+from detectors.app.command_patterns import AhoCorasick, build_default_automaton
+from detectors.app.rfb import ClientMessageParser, CutTextFragment, KeyText
+
+
+def _key_events(text: str) -> bytes:
+    out = bytearray()
+    for ch in text:
+        keysym = 0xFF0D if ch == "\n" else ord(ch)
+        out += struct.pack(">BBHI", 4, 1, 0, keysym)  # key down
+        out += struct.pack(">BBHI", 4, 0, 0, keysym)  # key up
+    return bytes(out)
+
+
+def _cut_text(text: str) -> bytes:
+    data = text.encode("latin-1")
+    return struct.pack(">B3xI", 6, len(data)) + data
+
+
+def _event(session_id: str, chunk: bytes, seq: int | None = None) -> app_main.ProxyEvent:
+    return app_main.ProxyEvent(
+        session_id=session_id,
+        seq=seq,
+        ts="2025-11-23T00:00:00Z",
+        stream="app_stream",
+        direction="client_to_server",
+        type="raw_chunk",
+        length=len(chunk),
+        payload_b64=base64.b64encode(chunk).decode("ascii"),
+    )
+
+
+def test_parser_handles_handshake_and_split_messages() -> None:
+    stream = b"RFB 003.008\n" + b"\x02" + b"\x00" * 16 + b"\x01" + _key_events("ls") + _cut_text("hello")
+    parser = ClientMessageParser()
+    messages = []
+    for i in range(0, len(stream), 5):
+        messages.extend(parser.feed(stream[i:i + 5]))
+
+    assert "".join(m.text for m in messages if isinstance(m, KeyText)) == "ls"
+    cut = [m for m in messages if isinstance(m, CutTextFragment)]
+    assert b"".join(m.data for m in cut) == b"hello"
+    assert cut[0].first and cut[-1].last
+    assert not parser.desynced
+
+
+def test_parser_skips_extensions_and_resyncs_after_unknown_messages() -> None:
+    parser = ClientMessageParser()
+    qemu_key = struct.pack(">BBHII", 255, 0, 1, ord("x"), 45)
+    fence = struct.pack(">B3xIB", 248, 0, 3) + b"abc"
+    desktop = struct.pack(">BxHHBx", 251, 800, 600, 1) + b"\0" * 16
+    # RFB 3.3 without authentication: the next client write is ClientInit alone.
+    assert parser.feed(b"RFB 003.003\n") == [] and parser.feed(b"\x01") == []
+    messages = parser.feed(struct.pack(">BBHHHH", 150, 1, 0, 0, 800, 600) + fence + desktop + qemu_key + _key_events("id"))
+    assert "".join(m.text for m in messages if isinstance(m, KeyText)) == "xid"
+    assert not parser.desynced
+
+    assert parser.feed(b"\x99garbage" + _key_events("a")) == [] and parser.desynced
+    assert [m.text for m in parser.feed(_key_events("ok"))] == ["o", "k"]
+    assert not parser.desynced and parser.resyncs == 1
+
+
+def test_dictionary_patterns_are_anchored_to_token_boundaries() -> None:
+    scanner = build_default_automaton().scanner()
+    assert scanner.feed("cat a | shuf; cat b.sh | shellcheck -\n") == []
+    assert not [m for m in scanner.feed("xtelnet host\n") if m.category == "reverse_shell"]
+    # The end boundary of "| sh" is only known once the next character arrives.
+    assert scanner.feed("curl x | sh") == []
+    assert [m.pattern for m in scanner.feed("\n")] == ["| sh"]
+    assert [m.pattern for m in scanner.feed("cat y | sh")] == [] and [m.pattern for m in scanner.flush()] == ["| sh"]
+
+
+def test_automaton_reports_overlapping_patterns() -> None:
+    automaton = AhoCorasick([("he", "a", 0.1), ("she", "b", 0.2), ("hers", "c", 0.3)])
+    found = {m.pattern for m in automaton.scanner().feed("ushers")}
+    assert found == {"he", "she", "hers"}
+
+
+def test_command_typed_across_chunks_is_detected() -> None:
+    chunk = _key_events("cat notes.txt | SH\n")
+    # Split mid-message, between "|" and "SH", to exercise chunk-boundary buffering.
+    split = len(_key_events("cat notes.txt | ")) + 3
+    first_event = _event("SID-CMD", chunk[:split])
+    first = app_main.build_detector_event(first_event, app_main.analyze_payload(first_event))
+    second_event = _event("SID-CMD", chunk[split:])
+    second = app_main.build_detector_event(second_event, app_main.analyze_payload(second_event))
+
+    assert first.type == "app_activity"
+    assert second.type == "suspicious_command_pattern"
+    assert "pipe_to_shell" in second.details["command_categories"]
+
+
+def test_keystroke_split_across_reversed_chunks_is_reordered() -> None:
+    chunk = _key_events("cat notes.txt | SH\n")
+    # Split inside the "S" KeyEvent and deliver the second half first.
+    split = len(_key_events("cat notes.txt | ")) + 3
+    late_event = _event("SID-SEQ", chunk[split:], seq=1)
+    late = app_main.build_detector_event(late_event, app_main.analyze_payload(late_event))
+    early_event = _event("SID-SEQ", chunk[:split], seq=0)
+    early = app_main.build_detector_event(early_event, app_main.analyze_payload(early_event))
+
+    assert late.type == "app_activity" and late.details["chunk_order"] == "held"
+    assert early.type == "suspicious_command_pattern"
+    assert "pipe_to_shell" in early.details["command_categories"]
+    assert early.details["keystrokes"] == len("cat notes.txt | SH\n")
+    # A redelivered chunk is not parsed again.
+    repeat_event = _event("SID-SEQ", chunk[split:], seq=1)
+    assert app_main.analyze_payload(repeat_event)["held"]
+    assert not app_main.SESSION_STATE["SID-SEQ"].parser.desynced
+
+
+def test_clipboard_text_is_scanned() -> None:
+    event = _event("SID-CUT", _cut_text("certutil -decode blob.b64 out.exe"))
+    detector_event = app_main.build_detector_event(event, app_main.analyze_payload(event))
+    assert detector_event.type == "suspicious_command_pattern"
+    assert detector_event.details["command_categories"] == ["encoding_pipeline"]
+
+
+def test_undecodable_stream_falls_back_to_length_heuristics() -> None:
+    event = _event("SID-RAW", b"X" * 300)
+    analysis = app_main.analyze_payload(event)
+    assert analysis is None
+    assert app_main.build_detector_event(event, analysis).type == "suspicious_command_pattern"
+
+
+def test_repeated_clipboard_paste_links_to_original() -> None:
+    chunk = _cut_text("A" * 3000)
+    events = []
+    for _ in range(3):
+        event = _event("SID-DUP", chunk)
+        analysis = app_main.analyze_payload(event)
+        detector_event = app_main.build_detector_event(event, analysis)
+        app_main.dedup_clipboard(event, detector_event, analysis)
+        events.append(detector_event)
+
+    assert all(e.type == "clipboard_spike_candidate" for e in events)
+    assert "duplicate_of" not in events[0].details
+    assert events[1].details["duplicate_of"] == events[0].event_id
+    assert events[2].details["repeat_count"] == 2
+
+
+def test_paste_spanning_chunks_is_scored_once_when_it_completes() -> None:
+    message = _cut_text("B" * 2000 + "C" * 2000)
+    pastes = []
+    for _ in range(2):
+        events = []
+        for chunk in (message[:1800], message[1800:3600], message[3600:]):
+            event = _event("SID-SPLIT", chunk)
+            analysis = app_main.analyze_payload(event)
+            detector_event = app_main.build_detector_event(event, analysis)
+            app_main.dedup_clipboard(event, detector_event, analysis)
+            events.append(detector_event)
+        pastes.append(events)
+
+    first, second = pastes
+    # The spike-sized chunks before the last one are not scored on their own.
+    assert [e.details["clipboard_digest_source"] for e in first[:2]] == ["pending", "pending"]
+    assert [e.type for e in first[:2] + second[:2]] == ["app_activity"] * 4
+    # The completing chunk is small, but scores the whole paste once.
+    assert first[2].type == "clipboard_spike_candidate" and first[2].confidence == 0.5
+    assert first[2].details["paste_event_id"] == first[0].event_id and "duplicate_of" not in first[2].details
+    # The repeat folds into the event that scored the first paste.
+    assert second[2].type == "clipboard_spike_candidate"
+    assert second[2].details["duplicate_of"] == first[2].event_id and second[2].details["repeat_count"] == 1
+    assert second[2].details["paste_event_id"] == second[0].event_id
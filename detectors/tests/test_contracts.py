@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import json
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+from fastapi.testclient import TestClient
+
+from detectors import dispatcher
+from risk_engine import main as risk_main
+from shared.contracts import DetectorEvent, Incident, ProxyEvent, dumps, loads
+
+
+def _detector_event(**overrides) -> dict:
+    event = {
+        "event_id": "ev-contract",
+        "session_id": "SID-C",
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "detector": "visual",
+        "type": "visual_activity",
+        "confidence": 0.05,
+        "details": {"length": 4096, "nested": {"ratio": 0.5}},
+        "artifact_refs": ["frame.png"],
+    }
+    event.update(overrides)
+    return event
+
+
+def test_decode_trusted_and_validated_paths_agree() -> None:
+    fields = _detector_event()
+    validated = DetectorEvent(**fields)
+    assert DetectorEvent.decode(json.dumps(fields).encode()) == validated
+    assert DetectorEvent.trusted(**fields) == validated
+    assert loads(validated.encode()) == fields
+
+    built = DetectorEvent.trusted(session_id="SID-C", timestamp="t", detector="app", type="x", confidence=0.1)
+    assert built.details == {} and built.artifact_refs == [] and built.event_id
+    assert built.model_fields_set == {"session_id", "timestamp", "detector", "type", "confidence"}
+
+    incident = Incident.trusted(
+        incident_id="inc-1", session_id="SID-C", risk_score=10, risk_level="LOW",
+        events=[validated], recommended_action="allow",
+    )
+    assert Incident.decode(incident.encode()) == incident
+    assert loads(dumps({"incident": incident}))["incident"] == loads(incident.encode())
+
+
+def test_endpoints_decode_raw_bodies_and_keep_422_errors(monkeypatch) -> None:
+    monkeypatch.setattr(risk_main, "publish_incident", lambda incident: None)
+    monkeypatch.setattr(risk_main, "SESSION_EVENTS", {})
+    monkeypatch.setattr(risk_main, "SEEN_EVENT_IDS", OrderedDict())
+    client = TestClient(risk_main.app)
+
+    resp = client.post("/detector-events/batch", content=dumps({"events": [_detector_event()]}))
+    assert resp.status_code == 200
+    assert resp.json()["results"][0]["incident"]["events"][0]["details"]["nested"] == {"ratio": 0.5}
+
+    resp = client.post("/detector-events", json=_detector_event(confidence=1.5))
+    assert resp.status_code == 422
+    assert resp.json()["detail"][0]["loc"] == ["body", "confidence"]
+    assert client.post("/detector-events", content=b"{not json").status_code == 422
+
+
+def test_dispatcher_rejects_unknown_streams() -> None:
+    event = ProxyEvent(
+        session_id="SID-C", ts="2024-01-01T00:00:00Z", stream="visual_stream",
+        direction="client_to_server", type="raw_chunk", length=3,
+    ).model_dump()
+    resp = TestClient(dispatcher.app).post("/events", json={**event, "stream": "audio_stream"})
+    assert resp.status_code == 422
+    assert resp.json()["detail"][0]["loc"] == ["body", "stream"]
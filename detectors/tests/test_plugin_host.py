@@ -0,0 +1,193 @@
+from __future__ import annotations
+
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from detectors.network.network_plugin import NetworkPlugin
+from detectors.plugin import DetectorPlugin, detect_each, load_plugins
+from detectors.plugin_host import DetectorHost, create_app
+from shared.contracts import DetectorEvent, ProxyEvent
+from shared.risk_sender import RiskSender
+
+
+def _proxy_event(session_id: str, length: int, stream: str = "app_stream") -> dict:
+    return {
+        "session_id": session_id,
+        "ts": "2025-11-23T00:00:00Z",
+        "stream": stream,
+        "direction": "client_to_server",
+        "type": "raw_chunk",
+        "length": length,
+    }
+
+
+def _event(session_id: str, length: int) -> ProxyEvent:
+    return ProxyEvent(**_proxy_event(session_id, length))
+
+
+class RecordingPlugin(DetectorPlugin):
+    """Stands in for the app detector (stream and detector names are part of the contract)."""
+
+    name = "app"
+    streams = ("app_stream",)
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.batches = []
+        self.calls = []
+        self.risk = {}
+
+    async def detect_batch(self, events):
+        self.batches.append([event.length for event in events])
+        await asyncio.sleep(0.01)  # let later requests queue up behind this batch
+        return [
+            None if event.length == 0 else DetectorEvent.trusted(
+                session_id=event.session_id,
+                timestamp=event.ts,
+                detector=self.name,
+                type="app_activity",
+                confidence=0.1,
+                details={"length": event.length},
+            )
+            for event in events
+        ]
+
+    def session_started(self, session_id: str) -> None:
+        self.calls.append(("started", session_id))
+
+    def session_ended(self, session_id: str) -> None:
+        self.calls.append(("ended", session_id))
+
+    def risk_result(self, event, response) -> None:
+        self.risk[event["details"]["length"]] = response["incident"]["risk_score"]
+
+
+def _risk_sender(posted: list) -> RiskSender:
+    def handler(request: httpx.Request) -> httpx.Response:
+        events = json.loads(request.content)["events"]
+        posted.extend(event["details"]["length"] for event in events)
+        return httpx.Response(200, json={"results": [{"incident": {"risk_score": 7}} for _ in events]})
+
+    return RiskSender(url="http://risk/detector-events", batch_wait=0.0, transport=httpx.MockTransport(handler))
+
+
+def test_host_batches_in_order_and_delivers_to_the_risk_engine() -> None:
+    plugin = RecordingPlugin()
+    posted: list = []
+    host = DetectorHost([plugin], risk_sender=_risk_sender(posted), batch_size=4)
+
+    async def run():
+        await host.start()
+        first = await host.process(_event("s1", 1))
+        # Arrive together: queued while the worker is busy, then batched.
+        rest = await asyncio.gather(*(host.process(_event("s1", i)) for i in range(2, 8)))
+        await host.stop()
+        return first, rest
+
+    first, rest = asyncio.run(run())
+    assert first.details["length"] == 1 and [event.details["length"] for event in rest] == list(range(2, 8))
+    assert plugin.batches == [[1], [2, 3, 4, 5], [6, 7]]
+    assert sorted(posted) == list(range(1, 8)) and plugin.risk[5] == 7
+
+
+def test_a_failing_chunk_fails_only_its_own_request() -> None:
+    class FlakyPlugin(RecordingPlugin):
+        def _detect(self, event):
+            if event.length == 13:
+                raise ValueError("bad chunk")
+            return None if event.length == 0 else DetectorEvent.trusted(
+                session_id=event.session_id, timestamp=event.ts, detector=self.name,
+                type="app_activity", confidence=0.1, details={"length": event.length},
+            )
+
+        async def detect_batch(self, events):
+            self.batches.append([event.length for event in events])
+            await asyncio.sleep(0.01)
+            return detect_each(events, self._detect)
+
+    plugin = FlakyPlugin()
+    host = DetectorHost([plugin], risk_sender=_risk_sender([]), batch_size=8)
+
+    async def run():
+        await host.start()
+        await host.process(_event("s1", 1))
+        results = await asyncio.gather(
+            *(host.process(_event(f"s{i}", length)) for i, length in enumerate((2, 13, 4))),
+            return_exceptions=True,
+        )
+        await host.stop()
+        return results
+
+    ok, failed, other = asyncio.run(run())
+    assert plugin.batches[1] == [2, 13, 4]
+    assert ok.details["length"] == 2 and other.details["length"] == 4
+    assert isinstance(failed, ValueError)
+    assert host.stats["app"]["errors"] == 1 and host.stats["app"]["events"] == 4
+
+
+def test_plugins_must_implement_detect_batch() -> None:
+    class Incomplete(DetectorPlugin):
+        name = "app"
+        streams = ("app_stream",)
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def test_host_starts_and_ends_sessions() -> None:
+    plugin = RecordingPlugin()
+    host = DetectorHost([plugin], risk_sender=_risk_sender([]), max_sessions=2)
+
+    async def run():
+        await host.start()
+        for session_id in ("s1", "s2", "s1", "s3"):
+            await host.process(_event(session_id, 1))
+        ended = [host.end_session("s3"), host.end_session("s3")]
+        await host.stop()
+        return ended
+
+    assert asyncio.run(run()) == [["app"], []]
+    # s2 is the least recently seen when s3 makes three sessions.
+    assert plugin.calls == [("started", "s1"), ("started", "s2"), ("started", "s3"), ("ended", "s2"), ("ended", "s3")]
+
+
+def test_app_routes_streams_to_colocated_plugins_and_rejects_unknown_ones() -> None:
+    plugin = RecordingPlugin()
+    posted: list = []
+    host = DetectorHost([NetworkPlugin(), plugin], risk_sender=_risk_sender(posted))
+    app = create_app(host.plugins, host=host)
+
+    async def run():
+        await host.start()
+        try:
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://host") as client:
+                single = await client.post("/events", json=_proxy_event("s1", 80, "network_stream"))
+                batch = await client.post("/events/batch", json={"events": [
+                    _proxy_event("s1", 0), _proxy_event("s1", 60000, "network_stream"), _proxy_event("s1", 3),
+                ]})
+                unknown = await client.post("/events", json=_proxy_event("s1", 5, "visual_stream"))
+                ended = await client.post("/sessions/s1/end")
+                status = await client.get("/status")
+        finally:
+            await host.stop()
+        return single, batch, unknown, ended, status
+
+    single, batch, unknown, ended, status = asyncio.run(run())
+    assert single.json()["detector_event"]["type"] == "dns_tunnel_suspected"
+    events = batch.json()["detector_events"]
+    assert events[0] is None
+    assert events[1]["detector"] == "network" and events[1]["type"] == "file_transfer_candidate"
+    assert events[2]["detector"] == "app" and events[2]["details"] == {"length": 3}
+    assert unknown.status_code == 422
+    assert sorted(ended.json()["detectors"]) == ["app", "network"]
+    detectors = status.json()["detectors"]
+    assert detectors["network"]["events"] == 2 and detectors["app"]["events"] == 2
+    assert sorted(posted) == [3, 80, 60000]
+
+
+def test_load_plugins_accepts_registry_names_and_module_references() -> None:
+    plugins = load_plugins(["network", " detectors.app.app_plugin:AppPlugin ", ""])
+    assert [plugin.name for plugin in plugins] == ["network", "app"]
@@ -0,0 +1,236 @@
+from __future__ import annotations
+
+import asyncio
+import json
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+import httpx
+
+from risk_engine import main as risk_main
+from shared.risk_sender import RiskSender
+
+
+def _event(i: int, session_id: str = "SID-RS") -> dict:
+    return {
+        "event_id": f"ev-{i}",
+        "session_id": session_id,
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "detector": "network",
+        "type": "network_activity",
+        "confidence": 0.05,
+        "details": {"length": i},
+        "artifact_refs": [],
+    }
+
+
+def test_sender_batches_events_into_the_risk_engine(monkeypatch) -> None:
+    monkeypatch.setattr(risk_main, "publish_incident", lambda incident: None)
+    monkeypatch.setattr(risk_main, "SESSION_EVENTS", {})
+    monkeypatch.setattr(risk_main, "SEEN_EVENT_IDS", OrderedDict())
+    results = []
+
+    async def run():
+        sender = RiskSender(
+            url="http://risk/detector-events",
+            batch_wait=0.01,
+            transport=httpx.ASGITransport(app=risk_main.app),
+            on_result=lambda event, result: results.append((event["event_id"], result["incident_created"])),
+        )
+        await sender.start()
+        for i in range(20):
+            assert sender.submit(_event(i))
+        await sender.stop()
+        return sender.status()
+
+    status = asyncio.run(run())
+    assert status["sent"] == 20 and status["batches"] < 20 and status["batch_endpoint"]
+    assert len(risk_main.SESSION_EVENTS["SID-RS"]) == 20
+    assert sorted(event_id for event_id, _ in results) == sorted(f"ev-{i}" for i in range(20))
+
+
+def test_sender_retries_with_backoff_and_falls_back_to_single_posts() -> None:
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request.url.path)
+        if request.url.path.endswith("/batch"):
+            # First attempt: overloaded; second: an engine without the batch route.
+            return httpx.Response(503 if len(calls) == 1 else 404)
+        return httpx.Response(200, json={"status": "ok", "incident": {"risk_score": 42}})
+
+    async def run():
+        sender = RiskSender(
+            url="http://risk/detector-events",
+            workers=1,
+            backoff=0.001,
+            transport=httpx.MockTransport(handler),
+        )
+        await sender.start()
+        for i in range(3):
+            sender.submit(_event(i))
+        await sender.stop()
+        return sender.status()
+
+    status = asyncio.run(run())
+    assert status["retries"] == 1 and status["sent"] == 3 and not status["batch_endpoint"]
+    assert calls[:2] == ["/detector-events/batch", "/detector-events/batch"]
+    assert calls[2:] == ["/detector-events"] * 3
+
+
+def test_sender_queue_is_bounded_and_never_blocks() -> None:
+    async def run():
+        sender = RiskSender(url="http://risk/detector-events", queue_size=2, transport=httpx.MockTransport(
+            lambda request: httpx.Response(200, json={"results": [{"status": "ok"}] * len(json.loads(request.content)["events"])})
+        ))
+        assert not sender.submit(_event(0))  # not started
+        await sender.start()
+        accepted = [sender.submit(_event(i)) for i in range(5)]
+        await sender.stop()
+        return accepted, sender.status()
+
+    accepted, status = asyncio.run(run())
+    assert accepted == [True, True, False, False, False]
+    assert status["dropped"] == 4 and status["sent"] == 2
+
+
+def test_replayed_events_are_not_scored_twice(monkeypatch) -> None:
+    monkeypatch.setattr(risk_main, "publish_incident", lambda incident: None)
+    monkeypatch.setattr(risk_main, "SESSION_EVENTS", {})
+    monkeypatch.setattr(risk_main, "SEEN_EVENT_IDS", OrderedDict())
+    monkeypatch.setattr(risk_main, "INCIDENTS", {})
+    calls = []
+
+    async def engine(scope, receive, send):
+        # The first batch is ingested, but its reply never reaches the sender.
+        calls.append(scope["path"])
+        await risk_main.app(scope, receive, send)
+        if len(calls) == 1:
+            raise httpx.ReadTimeout("reply lost")
+
+    async def run():
+        sender = RiskSender(
+            url="http://risk/detector-events",
+            workers=1,
+            backoff=0.001,
+            transport=httpx.ASGITransport(app=engine),
+        )
+        await sender.start()
+        for i in range(3):
+            sender.submit(_event(i, session_id="SID-REPLAY"))
+        await sender.stop()
+        return sender.status()
+
+    status = asyncio.run(run())
+    assert status["retries"] == 1 and status["sent"] == 3 and len(calls) == 2
+    assert len(risk_main.SESSION_EVENTS["SID-REPLAY"]) == 3
+    assert len(risk_main.INCIDENTS) == 3
+
+
+def test_rejected_batch_only_loses_its_invalid_event(monkeypatch) -> None:
+    monkeypatch.setattr(risk_main, "publish_incident", lambda incident: None)
+    monkeypatch.setattr(risk_main, "SESSION_EVENTS", {})
+    monkeypatch.setattr(risk_main, "SEEN_EVENT_IDS", OrderedDict())
+    calls = []
+
+    async def engine(scope, receive, send):
+        calls.append(scope["path"])
+        await risk_main.app(scope, receive, send)
+
+    async def run():
+        sender = RiskSender(
+            url="http://risk/detector-events",
+            workers=1,
+            batch_wait=0.01,
+            transport=httpx.ASGITransport(app=engine),
+        )
+        await sender.start()
+        for i in range(4):
+            event = _event(i, session_id="SID-422")
+            if i == 2:
+                event["confidence"] = "very"
+            sender.submit(event)
+        await sender.stop()
+        return sender.status()
+
+    status = asyncio.run(run())
+    assert calls == ["/detector-events/batch"] + ["/detector-events"] * 4
+    assert status["sent"] == 3 and status["rejected"] == 1 and status["batch_endpoint"]
+    assert [e.event_id for e in risk_main.SESSION_EVENTS["SID-422"]] == ["ev-0", "ev-1", "ev-3"]
+
+
+def test_workers_keep_each_sessions_events_in_order() -> None:
+    ingested = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        events = json.loads(request.content)["events"]
+        # The first event is slow to ingest: a worker holding a later event
+        # of the same session would overtake it.
+        await asyncio.sleep(0.05 if events[0]["event_id"] == "ev-0" else 0.0)
+        ingested.extend((e["session_id"], e["event_id"]) for e in events)
+        return httpx.Response(200, json={"results": [{"status": "ok"}] * len(events)})
+
+    async def run():
+        sender = RiskSender(url="http://risk/detector-events", workers=2, batch_size=1, batch_wait=0,
+                            transport=httpx.MockTransport(handler))
+        await sender.start()
+        for i in range(12):
+            sender.submit(_event(i, session_id=f"SID-ORDER-{i % 3}"))
+        await sender.stop()
+        return sender.status()
+
+    status = asyncio.run(run())
+    assert status["sent"] == 12
+    for n in range(3):
+        session = [event_id for session_id, event_id in ingested if session_id == f"SID-ORDER-{n}"]
+        assert session == [f"ev-{i}" for i in range(n, 12, 3)]
+
+
+def test_single_post_retries_resume_after_the_last_reply() -> None:
+    posted = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.path.endswith("/batch"):
+            return httpx.Response(404)
+        event_id = json.loads(request.content)["event_id"]
+        posted.append(event_id)
+        if posted.count("ev-1") == 1 and event_id == "ev-1":
+            return httpx.Response(503)
+        return httpx.Response(200, json={"status": "ok"})
+
+    async def run():
+        sender = RiskSender(url="http://risk/detector-events", workers=1, backoff=0.001,
+                            transport=httpx.MockTransport(handler))
+        await sender.start()
+        for i in range(3):
+            sender.submit(_event(i))
+        await sender.stop()
+        return sender.status()
+
+    status = asyncio.run(run())
+    assert posted == ["ev-0", "ev-1", "ev-1", "ev-2"]
+    assert status["sent"] == 3 and status["retries"] == 1
+
+
+def test_incidents_are_published_off_the_event_loop(monkeypatch) -> None:
+    posted = []
+
+    async def slow_post(incident):
+        await asyncio.sleep(0.05)
+        posted.append(incident.incident_id)
+
+    monkeypatch.setattr(risk_main, "_post_incident", slow_post)
+    monkeypatch.setattr(risk_main, "SESSION_EVENTS", {})
+    monkeypatch.setattr(risk_main, "SEEN_EVENT_IDS", OrderedDict())
+
+    async def run():
+        event = risk_main.DetectorEvent(**_event(0, session_id="SID-PUB"))
+        reply = risk_main.ingest(event)
+        pending = len(risk_main._PUBLISH_TASKS)
+        await asyncio.gather(*risk_main._PUBLISH_TASKS)
+        return reply, pending
+
+    reply, pending = asyncio.run(run())
+    # ingest returned before the post finished; the post still happened.
+    assert reply["incident_created"] and pending == 1
+    assert posted == [reply["incident"].incident_id]
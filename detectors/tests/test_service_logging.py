@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+import io
+import json
+import logging
+
+from shared import service_logging
+from shared.service_logging import EventLogSampler, configure_logging
+
+
+def test_sampler_spaces_logs_evenly_and_summarises_counts(caplog) -> None:
+    now = [0.0]
+    sampler = EventLogSampler(logging.getLogger("sampler-test"), rate=0.25, interval=10.0, clock=lambda: now[0])
+
+    picked = [i for i in range(1, 13) if sampler.sampled("chunk", tag="a" if i % 3 else "b")]
+    assert picked == [4, 8, 12]
+
+    now[0] = 10.0
+    with caplog.at_level(logging.INFO, logger="sampler-test"):
+        assert not sampler.sampled("chunk", tag="a")
+    (summary,) = caplog.records
+    assert summary.fields["counts"] == {"chunk": 13}
+    assert summary.fields["logged"] == {"chunk": 3}
+    assert summary.fields["tags"] == {"chunk": {"a": 9, "b": 4}}
+
+    sampler.flush()  # nothing counted since the summary: stays quiet
+    assert len(caplog.records) == 1
+    assert not any(EventLogSampler(logging.getLogger("x"), rate=0.0).sampled("chunk") for _ in range(100))
+
+
+def test_configure_logging_writes_json_from_a_background_thread() -> None:
+    root = logging.getLogger()
+    saved_handlers, saved_level = list(root.handlers), root.level
+    stream = io.StringIO()
+    try:
+        configure_logging("unit", stream=stream, force=True)
+        mutable = {"step": 1}
+        logging.getLogger("svc").info("state %s", mutable, extra={"fields": {"detector_event": {"type": "x"}}})
+        mutable["step"] = 2  # rendered when logged, not when written
+        try:
+            raise ValueError("bad")
+        except ValueError:
+            logging.getLogger("svc").exception("failed")
+        service_logging.stop_logging()
+    finally:
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        for handler in saved_handlers:
+            root.addHandler(handler)
+        root.setLevel(saved_level)
+
+    first, second = (json.loads(line) for line in stream.getvalue().splitlines())
+    assert first["msg"] == "state {'step': 1}" and first["service"] == "unit"
+    assert first["detector_event"] == {"type": "x"} and first["level"] == "INFO"
+    assert second["level"] == "ERROR" and "ValueError: bad" in second["exc"]
+
+
+def test_configure_logging_takes_over_uvicorns_own_handlers() -> None:
+    root = logging.getLogger()
+    saved_handlers, saved_level = list(root.handlers), root.level
+    access = logging.getLogger("uvicorn.access")
+    direct = io.StringIO()
+    # What uvicorn's default log config leaves behind before the app is imported.
+    access.addHandler(logging.StreamHandler(direct))
+    access.propagate = False
+    stream = io.StringIO()
+    try:
+        configure_logging("unit", stream=stream, force=True)
+        access.info('%s - "%s %s HTTP/%s" %d', "127.0.0.1:5000", "POST", "/events", "1.1", 200)
+        service_logging.stop_logging()
+    finally:
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        for handler in saved_handlers:
+            root.addHandler(handler)
+        root.setLevel(saved_level)
+
+    (line,) = (json.loads(line) for line in stream.getvalue().splitlines())
+    assert line["logger"] == "uvicorn.access" and line["msg"] == '127.0.0.1:5000 - "POST /events HTTP/1.1" 200'
+    assert direct.getvalue() == "" and access.propagate and not access.handlers
@@ -0,0 +1,428 @@
+"""Process pool that runs OCR and steganography analysis off the event loop.
+
+Tesseract and ``cv2.fastNlMeansDenoising`` can take hundreds of milliseconds
+per image, which would stall every request on the detector worker if run
+inline. ``AnalysisPool`` ships each artifact to a ``ProcessPoolExecutor``
+whose workers import cv2 / pytesseract and build their ``OCRDetector`` and
+``StegoDetector`` once, at worker start.
+
+The pool is split into single-process shards and a session is always routed
+to the same shard, so detector state that is kept per session inside a
+worker stays on one process. ``submit_many`` sends each shard's share of
+several artifacts as one call, in which small frames share OCR engine calls
+(see ``_run_batch``).
+
+Back-pressure is explicit: at most ``max_pending`` calls may be queued or
+running. When the pool is saturated, or a call exceeds ``job_timeout``,
+its artifacts get ``None`` and the caller keeps its metadata-only
+classification.
+
+With a ``ResultCache`` attached, an artifact whose bytes were analysed
+before is answered from the cache without touching the workers, even when
+the pool is saturated.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import time
+import zlib
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List, Optional, Sequence, Tuple
+
+
+logger = logging.getLogger("visual_detector.analysis_pool")
+
+
+ANALYSIS_WORKERS = int(os.getenv("VISUAL_ANALYSIS_WORKERS", str(min(4, os.cpu_count() or 1))))
+ANALYSIS_MAX_PENDING = int(os.getenv("VISUAL_ANALYSIS_MAX_PENDING", "8"))
+ANALYSIS_JOB_TIMEOUT = float(os.getenv("VISUAL_ANALYSIS_TIMEOUT", "5.0"))
+ANALYSIS_START_METHOD = os.getenv("VISUAL_ANALYSIS_START_METHOD", "spawn")
+
+
+# --- Worker-process side ------------------------------------------------------
+
+_ocr_detector = None
+_stego_detector = None
+_frame_cache = None
+
+
+def _worker_init() -> None:
+    """Pre-load cv2, the OCR engine and the detectors in each worker."""
+
+    global _ocr_detector, _stego_detector, _frame_cache
+    try:
+        import cv2
+
+        # One process per shard already gives parallelism; keep OpenCV from
+        # spawning its own thread pool inside every worker.
+        cv2.setNumThreads(1)
+        try:
+            from ocr_stego import OCRDetector, StegoDetector
+            from frame_cache import FrameCache
+        except ImportError:
+            from .ocr_stego import OCRDetector, StegoDetector
+            from .frame_cache import FrameCache
+        _ocr_detector = OCRDetector()
+        _stego_detector = StegoDetector()
+        # Sessions are pinned to a shard, so each session's recent frames
+        # always land in the same worker's cache.
+        _frame_cache = FrameCache()
+    except Exception as exc:
+        logging.getLogger("visual_detector.analysis_worker").warning(
+            "Visual analysis worker could not load OCR/stego detectors: %s", exc
+        )
+        return
+
+    if _ocr_detector.engine.name != "subprocess":
+        return
+    try:
+        import pytesseract
+
+        pytesseract.get_tesseract_version()
+    except Exception as exc:
+        logging.getLogger("visual_detector.analysis_worker").warning("Tesseract unavailable: %s", exc)
+
+
+def _frame_hash(gray) -> Optional[int]:
+    try:
+        from frame_cache import dhash
+    except ImportError:
+        from .frame_cache import dhash
+
+    try:
+        return dhash(gray)
+    except ValueError:
+        return None
+
+
+def _tile_signatures(gray):
+    try:
+        from ocr_stego import tile_signatures
+    except ImportError:
+        from .ocr_stego import tile_signatures
+
+    return tile_signatures(gray, _ocr_detector.tile_size, _ocr_detector.tile_diff_threshold)
+
+
+def _cpu_seconds() -> float:
+    # The subprocess OCR engine runs tesseract as a child process; its CPU
+    # time is added to the children's counters once it has been waited for.
+    times = os.times()
+    return times.user + times.system + times.children_user + times.children_system
+
+
+def _run_analysis(session_id: str, image_path: str) -> Dict[str, object]:
+    """Analyse one artifact; ``cpu_time`` is the CPU seconds the worker spent on it."""
+
+    return _run_batch([(session_id, image_path)])[0]
+
+
+def _run_batch(jobs: Sequence[Tuple[str, str]]) -> List[Dict[str, object]]:
+    """Analyse ``(session_id, image_path)`` jobs in one worker call, one result each.
+
+    Each artifact is decoded, hashed and checked against the frame cache on
+    its own (a cached verdict answers only a frame whose OCR tiles are all
+    unchanged); the OCR of the rest is one ``OCRDetector.process_many`` call,
+    so small frames and dirty regions from several jobs share engine calls.
+    A job whose session already has a frame waiting in the batch flushes it
+    first, so that frame's verdict can answer it from the frame cache.
+    ``cpu_time`` is charged per job, the shared OCR call split evenly
+    between the jobs in it.
+    """
+
+    if _ocr_detector is None or _stego_detector is None:
+        unavailable = {"skipped": True, "reason": "detectors_unavailable"}
+        return [
+            {"ocr": {"detected": False, **unavailable}, "stego": {"suspicious": False, **unavailable}, "cpu_time": 0.0}
+            for _ in jobs
+        ]
+
+    try:
+        from container_scan import scan_container
+        from decoded_image import DecodedImage
+    except ImportError:
+        from .container_scan import scan_container
+        from .decoded_image import DecodedImage
+
+    results: List[Dict[str, object]] = [{} for _ in jobs]
+    costs = [0.0] * len(jobs)
+    # (job index, decoded image, frame hash, tile signatures, whether the verdict may be cached)
+    misses: List[Tuple[int, object, Optional[int], object, bool]] = []
+
+    def analyse_misses() -> None:
+        if not misses:
+            return
+        started = _cpu_seconds()
+        ocr_results = _ocr_detector.process_many([(jobs[i][0], image) for i, image, _, _, _ in misses])
+        share = (_cpu_seconds() - started) / len(misses)
+        for (i, image, frame_hash, tiles, storable), ocr_result in zip(misses, ocr_results):
+            started = _cpu_seconds()
+            session_id = jobs[i][0]
+            verdict = {"ocr": ocr_result, "stego": _stego_detector.process(session_id, image)}
+            image.close()
+            if storable:
+                _frame_cache.store(session_id, frame_hash, verdict, tiles)
+            results[i] = {**verdict, "frame_cache": "miss" if frame_hash is not None else "unhashable"}
+            costs[i] += share + _cpu_seconds() - started
+        misses.clear()
+
+    try:
+        for i, (session_id, image_path) in enumerate(jobs):
+            if any(jobs[j][0] == session_id for j, _, _, _, _ in misses):
+                analyse_misses()
+            started = _cpu_seconds()
+            try:
+                image = DecodedImage.from_path(image_path)
+            except OSError as exc:
+                error = {"error": str(exc)}
+                results[i] = {"ocr": {"detected": False, **error}, "stego": {"suspicious": False, **error}}
+                costs[i] += _cpu_seconds() - started
+                continue
+
+            # Decode once; the frame hash, OCR and steganalysis share the arrays.
+            try:
+                # The 8x9 dHash grid is just as stable at quarter size, and for
+                # JPEG the reduced decode avoids a full-resolution one.
+                frame_hash = _frame_hash(image.reduced_gray(4))
+            except ValueError:
+                frame_hash = None
+            # The dHash only sees pixels: bytes appended to or hidden in the
+            # container must not be answered with a previous frame's verdict,
+            # nor may their verdict answer a later frame with the same pixels.
+            storable = frame_hash is not None and not scan_container(image.raw)["suspicious"]
+            # A few new words on a static screen hardly move the dHash; the
+            # OCR's own tile signatures decide whether there is anything new.
+            tiles = _tile_signatures(image.gray) if storable else None
+            cached = _frame_cache.lookup(session_id, frame_hash, tiles) if storable else None
+            if cached is not None:
+                image.close()
+                results[i] = {**_rebind(cached, session_id, image_path), "frame_cache": "hit"}
+            else:
+                misses.append((i, image, frame_hash, tiles, storable))
+            costs[i] += _cpu_seconds() - started
+        analyse_misses()
+    finally:
+        for _, image, _, _, _ in misses:
+            image.close()
+
+    for result, cost in zip(results, costs):
+        result["cpu_time"] = cost
+    return results
+
+
+def _rebind(verdict: Dict[str, object], session_id: str, image_path: str) -> Dict[str, object]:
+    """A reused verdict describes the artifact it answers, not the one it came from."""
+
+    rebound = {}
+    for part, value in verdict.items():
+        if isinstance(value, dict) and ("session_id" in value or "image_path" in value):
+            value = {**value, "session_id": session_id, "image_path": image_path}
+        rebound[part] = value
+    return rebound
+
+
+# --- Event-loop side ----------------------------------------------------------
+
+
+def _cacheable(result: Dict[str, object]) -> bool:
+    """Only complete verdicts are cached; errors and skips may be transient."""
+
+    return all(
+        isinstance(result.get(part), dict) and "error" not in result[part] and not result[part].get("skipped")
+        for part in ("ocr", "stego")
+    )
+
+
+class AnalysisPool:
+    """Bounded, session-affine process pool for visual analysis jobs."""
+
+    def __init__(
+        self,
+        workers: int = ANALYSIS_WORKERS,
+        max_pending: int = ANALYSIS_MAX_PENDING,
+        job_timeout: float = ANALYSIS_JOB_TIMEOUT,
+        start_method: str = ANALYSIS_START_METHOD,
+        result_cache=None,
+    ) -> None:
+        self.workers = max(1, workers)
+        self.result_cache = result_cache
+        self.max_pending = max(1, max_pending)
+        self.job_timeout = job_timeout
+        self.start_method = start_method
+        self._shards: List[ProcessPoolExecutor] = []
+        self._pending = 0
+        self.stats: Dict[str, int] = {
+            "submitted": 0,
+            "completed": 0,
+            "failed": 0,
+            "rejected_saturated": 0,
+            "timed_out": 0,
+            "frame_cache_hits": 0,
+            "frame_cache_misses": 0,
+            "result_cache_hits": 0,
+        }
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    @property
+    def started(self) -> bool:
+        return bool(self._shards)
+
+    def start(self) -> None:
+        if self._shards:
+            return
+        self._shards = [self._new_shard() for _ in range(self.workers)]
+        logger.info(
+            "Visual analysis pool started: workers=%d max_pending=%d timeout=%.1fs",
+            self.workers,
+            self.max_pending,
+            self.job_timeout,
+        )
+
+    def _new_shard(self) -> ProcessPoolExecutor:
+        ctx = multiprocessing.get_context(self.start_method)
+        return ProcessPoolExecutor(max_workers=1, mp_context=ctx, initializer=_worker_init)
+
+    def _replace_broken(self, shard: int, executor) -> None:
+        # A worker that died takes its executor with it; later calls to the
+        # shard get a fresh process instead of failing for good.
+        if self._shards and self._shards[shard] is executor:
+            executor.shutdown(wait=False, cancel_futures=True)
+            self._shards[shard] = self._new_shard()
+
+    def shutdown(self) -> None:
+        for shard in self._shards:
+            shard.shutdown(wait=False, cancel_futures=True)
+        self._shards = []
+
+    def shard_of(self, session_id: str) -> int:
+        """Index of the shard ``session_id`` is pinned to."""
+
+        return zlib.crc32(session_id.encode("utf-8")) % self.workers
+
+    def _release(self, future: Future, jobs: int) -> None:
+        self._pending -= 1
+        if future.cancelled():
+            return
+        if future.exception() is not None:
+            self.stats["failed"] += jobs
+        else:
+            self.stats["completed"] += jobs
+
+    async def submit(self, session_id: str, image_path: str) -> Optional[Dict[str, object]]:
+        """Run OCR + stego for ``image_path``; ``None`` if saturated or timed out."""
+
+        return (await self.submit_many([(session_id, image_path)]))[0]
+
+    async def submit_many(self, jobs: Sequence[Tuple[str, str]]) -> List[Optional[Dict[str, object]]]:
+        """Run OCR + stego for ``(session_id, image_path)`` jobs, one call per shard.
+
+        Results are in input order; a job gets ``None`` when its shard's call
+        was rejected as saturated, timed out, or failed (the worker raised or
+        died, or the shard could not take the call). A failing shard is
+        logged and counted in ``failed``; the other shards' results are still
+        returned and cached.
+        """
+
+        started = time.perf_counter()
+        results: List[Optional[Dict[str, object]]] = [None] * len(jobs)
+        digests: Dict[int, str] = {}
+        by_shard: Dict[int, List[int]] = {}
+        for i, (session_id, image_path) in enumerate(jobs):
+            if self.result_cache is not None:
+                try:
+                    digest, cached = await asyncio.to_thread(self.result_cache.lookup_file, image_path)
+                except OSError as exc:
+                    logger.warning("Could not hash %s for the result cache: %s", image_path, exc)
+                    digest, cached = None, None
+                if cached is not None:
+                    verdict, tier = cached
+                    self.stats["result_cache_hits"] += 1
+                    results[i] = {
+                        **_rebind(verdict, session_id, image_path),
+                        "result_cache": tier,
+                        "duration": time.perf_counter() - started,
+                    }
+                    continue
+                if digest is not None:
+                    digests[i] = digest
+            by_shard.setdefault(self.shard_of(session_id), []).append(i)
+
+        loop = asyncio.get_running_loop()
+        calls = []
+        for shard, indices in by_shard.items():
+            if self._pending >= self.max_pending:
+                self.stats["rejected_saturated"] += len(indices)
+                continue
+            self.start()
+            executor = self._shards[shard]
+            try:
+                future = executor.submit(_run_batch, [jobs[i] for i in indices])
+            except (BrokenProcessPool, RuntimeError) as exc:
+                self.stats["failed"] += len(indices)
+                logger.warning("Visual analysis shard %d rejected a call: %s", shard, exc)
+                if isinstance(exc, BrokenProcessPool):
+                    self._replace_broken(shard, executor)
+                continue
+            self._pending += 1
+            self.stats["submitted"] += len(indices)
+            # The slot is only released once the worker really finishes, so a
+            # timed-out call still counts against max_pending while it runs.
+            future.add_done_callback(lambda f, n=len(indices): loop.call_soon_threadsafe(self._release, f, n))
+            calls.append((shard, executor, indices, future))
+
+        # Shards run their calls in parallel, so every call gets the same deadline.
+        deadline = loop.time() + self.job_timeout
+        for shard, executor, indices, future in calls:
+            try:
+                batch = await asyncio.wait_for(
+                    asyncio.shield(asyncio.wrap_future(future)), max(0.0, deadline - loop.time())
+                )
+            except asyncio.TimeoutError:
+                self.stats["timed_out"] += len(indices)
+                logger.warning(
+                    "Visual analysis timed out after %.1fs for session(s) %s",
+                    self.job_timeout,
+                    ", ".join(sorted({jobs[i][0] for i in indices})),
+                )
+                continue
+            except Exception as exc:
+                # Counted in ``failed`` by ``_release`` once the future settles.
+                logger.warning(
+                    "Visual analysis failed for session(s) %s: %r",
+                    ", ".join(sorted({jobs[i][0] for i in indices})),
+                    exc,
+                )
+                if isinstance(exc, BrokenProcessPool):
+                    self._replace_broken(shard, executor)
+                continue
+            for i, result in zip(indices, batch):
+                if i in digests and _cacheable(result):
+                    verdict = {"ocr": result["ocr"], "stego": result["stego"]}
+                    await asyncio.to_thread(self.result_cache.put, digests[i], verdict)
+                result["duration"] = time.perf_counter() - started
+                if result.get("frame_cache") == "hit":
+                    self.stats["frame_cache_hits"] += 1
+                elif result.get("frame_cache") == "miss":
+                    self.stats["frame_cache_misses"] += 1
+                results[i] = result
+        return results
+
+    def status(self) -> Dict[str, object]:
+        lookups = self.stats["frame_cache_hits"] + self.stats["frame_cache_misses"]
+        return {
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "job_timeout": self.job_timeout,
+            "pending": self._pending,
+            **self.stats,
+            "frame_cache_hit_rate": self.stats["frame_cache_hits"] / lookups if lookups else 0.0,
+            "result_cache": self.result_cache.status() if self.result_cache is not None else None,
+        }
@@ -0,0 +1,179 @@
+"""Priority job queue feeding the visual analysis pool.
+
+``handle_event`` no longer waits for OCR: it reports the size-based event
+straight away and enqueues the artifact here. Background workers drain the
+queue through ``AnalysisPool`` and hand each result to a callback, which
+sends a follow-up detector event linked to the original ``event_id``.
+
+Jobs from sessions the risk engine already scores highly are analysed first;
+within the same risk level jobs run in arrival order. A worker that takes a
+job also takes up to ``VISUAL_ANALYSIS_BATCH - 1`` more that are already
+queued for the same pool shard, and submits them as one call, so small
+frames share OCR engine calls; it never waits for a batch to fill. With a ``scheduler``
+attached, the CPU time the worker spent on each job (``cpu_time`` in the
+pool's result) is reported back to it as the cost of one analysis; time a
+job spent queued in the pool or waiting on I/O is not charged.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import itertools
+import logging
+import os
+import time
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, List, Optional
+
+
+logger = logging.getLogger("visual_detector.analysis_queue")
+
+
+ANALYSIS_QUEUE_SIZE = int(os.getenv("VISUAL_ANALYSIS_QUEUE_SIZE", "256"))
+ANALYSIS_BATCH = int(os.getenv("VISUAL_ANALYSIS_BATCH", "8"))
+LATENCY_SAMPLES = 512
+
+
+class AnalysisJob:
+    __slots__ = ("session_id", "image_path", "parent_event_id", "risk", "enqueued_at")
+
+    def __init__(self, session_id: str, image_path: str, parent_event_id: Optional[str], risk: int = 0) -> None:
+        self.session_id = session_id
+        self.image_path = image_path
+        self.parent_event_id = parent_event_id
+        self.risk = risk
+        self.enqueued_at = time.perf_counter()
+
+
+ResultCallback = Callable[[AnalysisJob, Optional[Dict[str, object]]], Awaitable[None]]
+
+
+def _percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    idx = min(len(sorted_values) - 1, int(round(pct / 100.0 * (len(sorted_values) - 1))))
+    return sorted_values[idx]
+
+
+class AnalysisQueue:
+    """Bounded priority queue with a fixed number of draining workers."""
+
+    def __init__(
+        self,
+        pool,
+        on_result: ResultCallback,
+        maxsize: int = ANALYSIS_QUEUE_SIZE,
+        scheduler=None,
+        batch_size: int = ANALYSIS_BATCH,
+    ) -> None:
+        self._pool = pool
+        self._on_result = on_result
+        self._maxsize = maxsize
+        self._batch_size = max(1, batch_size)
+        self._scheduler = scheduler
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._workers: List[asyncio.Task] = []
+        self._seq = itertools.count()
+        self._in_flight = 0
+        # (queue_wait, run_time) in seconds for the most recent jobs
+        self._latencies: Deque[tuple] = deque(maxlen=LATENCY_SAMPLES)
+        self.stats: Dict[str, int] = {"enqueued": 0, "dropped_full": 0, "analysed": 0, "degraded": 0}
+
+    def start(self) -> None:
+        if self._workers:
+            return
+        self._queue = asyncio.PriorityQueue(maxsize=self._maxsize)
+        # One worker per pool slot keeps the pool busy without ever
+        # tripping its saturation guard.
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self._pool.max_pending)]
+
+    async def stop(self) -> None:
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self._queue = None
+
+    def enqueue(self, job: AnalysisJob) -> bool:
+        if self._queue is None:
+            self.start()
+        try:
+            # Higher risk sorts first; the sequence number keeps FIFO order
+            # among equal risk and avoids comparing jobs.
+            self._queue.put_nowait((-job.risk, next(self._seq), job))
+        except asyncio.QueueFull:
+            self.stats["dropped_full"] += 1
+            logger.warning("Visual analysis queue full; dropping job for session %s", job.session_id)
+            return False
+        self.stats["enqueued"] += 1
+        return True
+
+    def _take_batch(self, queue: asyncio.PriorityQueue, first: AnalysisJob) -> List[AnalysisJob]:
+        """``first`` plus queued jobs for its shard, in priority order."""
+
+        jobs = [first]
+        shard = self._pool.shard_of(first.session_id)
+        skipped = []
+        while len(jobs) < self._batch_size and not queue.empty():
+            item = queue.get_nowait()
+            if self._pool.shard_of(item[2].session_id) == shard:
+                jobs.append(item[2])
+            else:
+                skipped.append(item)
+        for item in skipped:
+            queue.put_nowait(item)
+            queue.task_done()  # the put above counts it again
+        return jobs
+
+    async def _worker(self) -> None:
+        queue = self._queue
+        while True:
+            _, _, first = await queue.get()
+            jobs = self._take_batch(queue, first)
+            self._in_flight += len(jobs)
+            started = time.perf_counter()
+            results: List[Optional[Dict[str, object]]] = [None] * len(jobs)
+            try:
+                results = await self._pool.submit_many([(job.session_id, job.image_path) for job in jobs])
+            except Exception as exc:
+                logger.warning(
+                    "Visual analysis failed for session(s) %s: %s",
+                    ", ".join(sorted({job.session_id for job in jobs})),
+                    exc,
+                )
+            finally:
+                finished = time.perf_counter()
+                self._in_flight -= len(jobs)
+                for job, result in zip(jobs, results):
+                    self._latencies.append((started - job.enqueued_at, finished - started))
+                    if self._scheduler is not None and result is not None:
+                        # A result-cache hit never reached a worker and costs nothing.
+                        self._scheduler.record_cost(job.session_id, float(result.get("cpu_time") or 0.0))
+                    self.stats["analysed" if result is not None else "degraded"] += 1
+                    queue.task_done()
+            for job, result in zip(jobs, results):
+                try:
+                    await self._on_result(job, result)
+                except Exception as exc:
+                    logger.warning("Visual analysis callback failed for session %s: %s", job.session_id, exc)
+
+    def status(self) -> Dict[str, object]:
+        waits = sorted(w for w, _ in self._latencies)
+        runs = sorted(r for _, r in self._latencies)
+        totals = sorted(w + r for w, r in self._latencies)
+        return {
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "queue_capacity": self._maxsize,
+            "in_flight": self._in_flight,
+            **self.stats,
+            "latency_ms": {
+                "samples": len(totals),
+                "queue_wait_p50": _percentile(waits, 50) * 1000.0,
+                "queue_wait_p95": _percentile(waits, 95) * 1000.0,
+                "run_p50": _percentile(runs, 50) * 1000.0,
+                "run_p95": _percentile(runs, 95) * 1000.0,
+                "total_p50": _percentile(totals, 50) * 1000.0,
+                "total_p95": _percentile(totals, 95) * 1000.0,
+                "total_max": (totals[-1] if totals else 0.0) * 1000.0,
+            },
+        }
@@ -0,0 +1,210 @@
+"""Screenshot-burst detection from each session's large-update arrival rate.
+
+A single large visual chunk is not a burst: one full-screen repaint after a
+window switch is routine. A burst is a rate phenomenon, so ``BurstTracker``
+keeps for every session and direction (framebuffer updates coming back from
+the server are rated apart from what the client sends, so a flood in one
+direction is never averaged into the other's baseline):
+
+- a ring of the last ``VISUAL_BURST_MAX_FRAMES`` large updates (chunks of at
+  least ``VISUAL_BURST_LARGE_BYTES``), as ``(timestamp, bytes)``, from which
+  the rate and bytes/sec over the last ``VISUAL_BURST_WINDOW`` seconds are
+  read;
+- a baseline rate and byte rate: time-decayed averages (time constant
+  ``VISUAL_BURST_BASELINE_TAU``) of the windowed values, updated only while
+  the session is not bursting so a burst never raises its own bar.
+
+A burst starts when the windowed rate exceeds ``VISUAL_BURST_MULTIPLE``
+times the baseline (never less than ``VISUAL_BURST_BASELINE_FLOOR`` per
+second) with at least ``VISUAL_BURST_MIN_FRAMES`` updates in the window. It
+is reported once, when it starts, and ends when the rate falls back under
+the threshold. The report's ``frame_count``/``duration_s``/``bytes`` cover
+the run of newest updates spaced closer than the threshold rate allows; the
+windowed rates and the baselines are reported alongside. State per session
+and direction is a fixed-size ring plus a few scalars; beyond
+``VISUAL_BURST_MAX_SESSIONS`` of them the least recently seen are evicted.
+"""
+
+from __future__ import annotations
+
+import math
+import os
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+
+
+BURST_LARGE_BYTES = int(os.getenv("VISUAL_BURST_LARGE_BYTES", "2000"))
+BURST_WINDOW = float(os.getenv("VISUAL_BURST_WINDOW", "2.0"))
+BURST_MULTIPLE = float(os.getenv("VISUAL_BURST_MULTIPLE", "4.0"))
+BURST_BASELINE_FLOOR = float(os.getenv("VISUAL_BURST_BASELINE_FLOOR", "0.5"))
+BURST_BASELINE_TAU = float(os.getenv("VISUAL_BURST_BASELINE_TAU", "120.0"))
+BURST_MIN_FRAMES = int(os.getenv("VISUAL_BURST_MIN_FRAMES", "5"))
+BURST_MAX_FRAMES = int(os.getenv("VISUAL_BURST_MAX_FRAMES", "64"))
+BURST_MAX_SESSIONS = int(os.getenv("VISUAL_BURST_MAX_SESSIONS", "20000"))
+
+DIRECTIONS = ("client_to_server", "server_to_client")
+
+
+class _SessionRate:
+    __slots__ = (
+        "times", "sizes", "head", "count", "last_ts",
+        "baseline_rate", "baseline_bps", "baseline_at",
+        "burst_start", "bursts",
+    )
+
+    def __init__(self, capacity: int, baseline_rate: float) -> None:
+        self.times = [0.0] * capacity
+        self.sizes = [0] * capacity
+        self.head = 0  # next slot to write
+        self.count = 0
+        self.last_ts = float("-inf")
+        self.baseline_rate = baseline_rate
+        self.baseline_bps = 0.0
+        self.baseline_at: Optional[float] = None
+        self.burst_start: Optional[float] = None
+        self.bursts = 0
+
+
+class BurstTracker:
+    """Per-session, per-direction sliding-window rate of large visual updates, against a baseline."""
+
+    def __init__(
+        self,
+        large_bytes: int = BURST_LARGE_BYTES,
+        window: float = BURST_WINDOW,
+        multiple: float = BURST_MULTIPLE,
+        baseline_floor: float = BURST_BASELINE_FLOOR,
+        baseline_tau: float = BURST_BASELINE_TAU,
+        min_frames: int = BURST_MIN_FRAMES,
+        max_frames: int = BURST_MAX_FRAMES,
+        max_sessions: int = BURST_MAX_SESSIONS,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.large_bytes = max(1, large_bytes)
+        self.window = max(1e-3, window)
+        self.multiple = max(1.0, multiple)
+        self.baseline_floor = max(1e-3, baseline_floor)
+        self.baseline_tau = max(1e-3, baseline_tau)
+        self.max_frames = max(2, max_frames)
+        self.min_frames = min(max(2, min_frames), self.max_frames)
+        self.max_sessions = max(1, max_sessions)
+        self._clock = clock
+        self._sessions: "OrderedDict[Tuple[str, str], _SessionRate]" = OrderedDict()
+        self.stats: Dict[str, int] = {"large_updates": 0, "bursts": 0, "evicted": 0}
+
+    def _state(self, key: Tuple[str, str]) -> _SessionRate:
+        state = self._sessions.get(key)
+        if state is None:
+            state = self._sessions[key] = _SessionRate(self.max_frames, self.baseline_floor)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+                self.stats["evicted"] += 1
+        else:
+            self._sessions.move_to_end(key)
+        return state
+
+    def _window(self, state: _SessionRate, now: float) -> tuple:
+        """``(frames, bytes, rate_hz, bytes_per_s)`` over the sliding window."""
+
+        frames = 0
+        total = 0
+        oldest = now
+        slot = state.head
+        for _ in range(state.count):
+            slot = (slot - 1) % self.max_frames
+            if now - state.times[slot] > self.window:
+                break
+            frames += 1
+            total += state.sizes[slot]
+            oldest = state.times[slot]
+        span = self.window
+        if frames == self.max_frames:
+            # The ring is full inside the window: measure over the span it
+            # covers instead, or sustained high rates would be capped at
+            # max_frames / window.
+            span = max(now - oldest, 1e-3)
+        return frames, total, frames / span, total / span
+
+    def _run(self, state: _SessionRate, frames: int, max_gap: float) -> tuple:
+        """``(frames, bytes, first_ts)`` of the newest updates spaced under ``max_gap``."""
+
+        slot = (state.head - 1) % self.max_frames
+        first = state.times[slot]
+        run, total = 1, state.sizes[slot]
+        for _ in range(frames - 1):
+            slot = (slot - 1) % self.max_frames
+            if first - state.times[slot] >= max_gap:
+                break
+            first = state.times[slot]
+            run += 1
+            total += state.sizes[slot]
+        return run, total, first
+
+    def observe(
+        self,
+        session_id: str,
+        length: int,
+        ts: Optional[float] = None,
+        direction: str = "server_to_client",
+    ) -> Optional[Dict[str, object]]:
+        """Record one visual chunk; returns burst details when a burst starts."""
+
+        if length < self.large_bytes:
+            return None
+        state = self._state((session_id, direction))
+        now = self._clock() if ts is None else ts
+        now = state.last_ts = max(now, state.last_ts)
+        state.times[state.head] = now
+        state.sizes[state.head] = length
+        state.head = (state.head + 1) % self.max_frames
+        state.count = min(state.count + 1, self.max_frames)
+        self.stats["large_updates"] += 1
+
+        frames, total, rate, bps = self._window(state, now)
+        threshold = self.multiple * max(state.baseline_rate, self.baseline_floor)
+        bursting = frames >= self.min_frames and rate > threshold
+
+        if state.burst_start is not None:
+            if bursting:
+                return None
+            state.burst_start = None
+        elif bursting:
+            state.burst_start = now
+            state.bursts += 1
+            self.stats["bursts"] += 1
+            run, run_bytes, first = self._run(state, frames, 1.0 / threshold)
+            return {
+                "frame_count": run,
+                "duration_s": round(now - first, 3),
+                "bytes": run_bytes,
+                "rate_hz": round(rate, 3),
+                "bytes_per_s": round(bps, 1),
+                "baseline_rate_hz": round(state.baseline_rate, 3),
+                "baseline_bytes_per_s": round(state.baseline_bps, 1),
+                "rate_multiple": round(rate / max(state.baseline_rate, self.baseline_floor), 2),
+                "window_s": self.window,
+                "session_bursts": state.bursts,
+                "burst_direction": direction,
+            }
+
+        # Quiet traffic: let the baseline follow it.
+        if state.baseline_at is not None:
+            alpha = 1.0 - math.exp(-(now - state.baseline_at) / self.baseline_tau)
+            state.baseline_rate += alpha * (rate - state.baseline_rate)
+            state.baseline_bps += alpha * (bps - state.baseline_bps)
+        else:
+            state.baseline_bps = bps
+        state.baseline_at = now
+        return None
+
+    def forget(self, session_id: str) -> None:
+        for direction in DIRECTIONS:
+            self._sessions.pop((session_id, direction), None)
+
+    def status(self) -> Dict[str, object]:
+        return {
+            "sessions": len(self._sessions),
+            "bursting": sum(1 for state in self._sessions.values() if state.burst_start is not None),
+            **self.stats,
+        }
@@ -0,0 +1,205 @@
+"""Structural scan of PNG and JPEG containers, without decoding pixels.
+
+Much practical steganography never touches pixel values: the payload is
+appended after the PNG ``IEND`` chunk or the JPEG ``EOI`` marker, or stuffed
+into ancillary chunks and metadata segments that viewers ignore. Pixel
+statistics miss all of it, and cost far more.
+
+``scan_container`` walks the encoded bytes once:
+
+- **PNG**: chunk headers are read and their bodies skipped; only ancillary
+  chunk bodies are CRC-checked (image data is never touched).
+- **JPEG**: marker segments are skipped by their length; entropy-coded scan
+  data is jumped over with a single regex search for the next marker.
+
+Findings:
+
+- ``trailing_data``: bytes after ``IEND`` / ``EOI`` (more than
+  ``STEGO_TRAILING_MIN``);
+- ``oversized_chunk``: one ancillary chunk or metadata segment larger than
+  ``STEGO_ANCILLARY_MAX`` bytes, or metadata totalling more than
+  ``STEGO_METADATA_MAX``;
+- ``unusual_chunk``: private or unknown PNG ancillary chunks, unknown JPEG
+  ``APPn`` identifiers, ancillary chunks with a bad CRC;
+- ``malformed``: a truncated container or a chunk running past the end.
+
+Cost is proportional to the number of chunks/segments, not the image size:
+microseconds for a typical screenshot.
+"""
+
+from __future__ import annotations
+
+import os
+import re
+import struct
+import zlib
+from typing import Dict, List, Optional, Union
+
+
+STEGO_TRAILING_MIN = int(os.getenv("STEGO_TRAILING_MIN", "16"))
+STEGO_ANCILLARY_MAX = int(os.getenv("STEGO_ANCILLARY_MAX", str(64 * 1024)))
+STEGO_METADATA_MAX = int(os.getenv("STEGO_METADATA_MAX", str(256 * 1024)))
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+JPEG_SOI = b"\xff\xd8"
+
+_PNG_KNOWN_ANCILLARY = {
+    b"tRNS", b"cHRM", b"gAMA", b"iCCP", b"sBIT", b"sRGB", b"cICP", b"mDCv", b"cLLi",
+    b"tEXt", b"zTXt", b"iTXt", b"bKGD", b"hIST", b"pHYs", b"sPLT", b"eXIf", b"tIME",
+    b"acTL", b"fcTL", b"fdAT",
+}
+
+# APPn identifiers written by common encoders, cameras and editors.
+_JPEG_KNOWN_APP_IDS = (
+    b"JFIF\x00", b"JFXX\x00", b"Exif\x00", b"http://ns.adobe.com/", b"ICC_PROFILE\x00",
+    b"Adobe", b"Ducky", b"Photoshop 3.0\x00", b"MPF\x00", b"XMP\x00", b"AVI1",
+)
+
+_JPEG_EOI = 0xD9
+_JPEG_SOS = 0xDA
+_JPEG_COM = 0xFE
+# Markers without a length field: TEM, RSTn, SOI, EOI.
+_JPEG_STANDALONE = {0x01, *range(0xD0, 0xD8), 0xD8, _JPEG_EOI}
+# Inside scan data, FF00 is a stuffed byte and FFD0-FFD7 are restart markers.
+_JPEG_NEXT_MARKER = re.compile(rb"\xff[^\x00\xd0-\xd7\xff]")
+
+Buffer = Union[bytes, bytearray, memoryview]
+
+
+def _report(fmt: str) -> Dict[str, object]:
+    return {
+        "format": fmt,
+        "trailing_bytes": 0,
+        "metadata_bytes": 0,
+        "chunks": 0,
+        "findings": [],
+        "suspicious": False,
+    }
+
+
+def _finding(report: Dict[str, object], kind: str, detail: str, size: int = 0) -> None:
+    report["findings"].append({"kind": kind, "detail": detail, "bytes": size})
+
+
+def _scan_png(data: Buffer, report: Dict[str, object], ancillary_max: int) -> Optional[int]:
+    """Walk PNG chunks; returns the offset just past ``IEND`` or ``None`` if truncated."""
+
+    pos = len(PNG_SIGNATURE)
+    end = len(data)
+    while pos + 12 <= end:
+        (length,) = struct.unpack_from(">I", data, pos)
+        ctype = bytes(data[pos + 4:pos + 8])
+        body = pos + 8
+        chunk_end = body + length + 4
+        if chunk_end > end:
+            _finding(report, "malformed", f"{ctype.decode('latin-1')} runs past end of file", length)
+            return None
+        report["chunks"] += 1
+        if ctype == b"IEND":
+            return chunk_end
+        ancillary = bool(ctype[0] & 0x20)
+        if ancillary:
+            report["metadata_bytes"] += length
+            name = ctype.decode("latin-1")
+            if length > ancillary_max:
+                _finding(report, "oversized_chunk", name, length)
+            if ctype not in _PNG_KNOWN_ANCILLARY:
+                kind = "private" if ctype[1] & 0x20 else "unknown"
+                _finding(report, "unusual_chunk", f"{kind} {name}", length)
+            (crc,) = struct.unpack_from(">I", data, body + length)
+            if zlib.crc32(data[pos + 4:body + length]) != crc:
+                _finding(report, "unusual_chunk", f"bad CRC in {name}", length)
+        pos = chunk_end
+    _finding(report, "malformed", "no IEND chunk")
+    return None
+
+
+def _scan_jpeg(data: Buffer, report: Dict[str, object], ancillary_max: int) -> Optional[int]:
+    """Walk JPEG markers; returns the offset just past ``EOI`` or ``None`` if truncated."""
+
+    pos = len(JPEG_SOI)
+    end = len(data)
+    while pos + 2 <= end:
+        if data[pos] != 0xFF:
+            _finding(report, "malformed", f"expected marker at offset {pos}")
+            return None
+        marker = data[pos + 1]
+        if marker == 0xFF:
+            pos += 1  # fill byte
+            continue
+        if marker == _JPEG_EOI:
+            return pos + 2
+        if marker in _JPEG_STANDALONE:
+            pos += 2
+            continue
+        if pos + 4 > end:
+            break
+        (length,) = struct.unpack_from(">H", data, pos + 2)
+        segment_end = pos + 2 + length
+        if length < 2 or segment_end > end:
+            _finding(report, "malformed", f"segment FF{marker:02X} runs past end of file", length)
+            return None
+        report["chunks"] += 1
+        if 0xE0 <= marker <= 0xEF or marker == _JPEG_COM:
+            size = length - 2
+            report["metadata_bytes"] += size
+            name = "COM" if marker == _JPEG_COM else f"APP{marker - 0xE0}"
+            if size > ancillary_max:
+                _finding(report, "oversized_chunk", name, size)
+            if marker != _JPEG_COM:
+                identifier = bytes(data[pos + 4:pos + 4 + 32])
+                if not identifier.startswith(_JPEG_KNOWN_APP_IDS):
+                    _finding(report, "unusual_chunk", f"{name} {identifier[:12]!r}", size)
+        pos = segment_end
+        if marker == _JPEG_SOS:
+            match = _JPEG_NEXT_MARKER.search(data, pos)
+            if match is None:
+                _finding(report, "malformed", "scan data without a following marker")
+                return None
+            pos = match.start()
+    _finding(report, "malformed", "no EOI marker")
+    return None
+
+
+def scan_container(
+    data: Optional[Buffer],
+    trailing_min: int = STEGO_TRAILING_MIN,
+    ancillary_max: int = STEGO_ANCILLARY_MAX,
+    metadata_max: int = STEGO_METADATA_MAX,
+) -> Dict[str, object]:
+    """Structural findings for encoded PNG/JPEG bytes; other formats are reported as ``unknown``."""
+
+    if not data:
+        return _report("none")
+    if bytes(data[:len(PNG_SIGNATURE)]) == PNG_SIGNATURE:
+        report = _report("png")
+        container_end = _scan_png(data, report, ancillary_max)
+    elif bytes(data[:2]) == JPEG_SOI:
+        report = _report("jpeg")
+        container_end = _scan_jpeg(data, report, ancillary_max)
+    else:
+        return _report("unknown")
+
+    if container_end is not None:
+        trailing = len(data) - container_end
+        report["trailing_bytes"] = trailing
+        if trailing > trailing_min:
+            _finding(report, "trailing_data", "bytes after end of image", trailing)
+    if report["metadata_bytes"] > metadata_max:
+        _finding(report, "oversized_chunk", "total metadata", report["metadata_bytes"])
+    report["suspicious"] = any(f["kind"] != "malformed" for f in report["findings"])
+    return report
+
+
+def container_confidence(report: Dict[str, object]) -> float:
+    """Confidence contribution of the structural findings."""
+
+    kinds: List[str] = [f["kind"] for f in report.get("findings", [])]
+    confidence = 0.0
+    if "trailing_data" in kinds:
+        confidence += 0.6
+    if "oversized_chunk" in kinds:
+        confidence += 0.4
+    if "unusual_chunk" in kinds:
+        confidence += 0.3
+    return min(confidence, 1.0)
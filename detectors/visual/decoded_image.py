@@ -0,0 +1,207 @@
+"""One decoded artifact shared by every analysis stage.
+
+OCR, steganalysis and the frame hash used to call ``cv2.imread`` on the same
+file independently. ``DecodedImage`` reads the encoded bytes once (through a
+read-only ``mmap`` for files, so the bytes are not copied into the Python
+heap), decodes them once, and derives the grayscale view on first use.
+
+Frames that never touched disk (e.g. reconstructed from the RFB stream) are
+wrapped with ``from_array`` or ``from_bytes`` and go through the same
+detectors.
+
+``reduced_gray(factor)`` serves pre-screens. JPEG bytes are decoded
+straight to a 1/2, 1/4 or 1/8 grayscale (``IMREAD_REDUCED_GRAYSCALE_*``,
+scaled inside the DCT), so a verdict of "nothing here" never pays for the
+full-resolution decode. Other formats have to inflate every pixel anyway, so
+they are decoded once at full size and area-downscaled; a later full-size
+stage then reuses that decode instead of repeating it.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import mmap
+import os
+from typing import ContextManager, Optional, Union
+
+import cv2
+import numpy as np
+
+
+IMAGE_SUFFIXES = (".png", ".jpg", ".jpeg", ".bmp", ".tiff")
+
+_JPEG_SOI = b"\xff\xd8"
+_REDUCED_FLAGS = {
+    2: cv2.IMREAD_REDUCED_GRAYSCALE_2,
+    4: cv2.IMREAD_REDUCED_GRAYSCALE_4,
+    8: cv2.IMREAD_REDUCED_GRAYSCALE_8,
+}
+
+
+class DecodedImage:
+    """Lazily decoded BGR and grayscale views of one image."""
+
+    __slots__ = ("source", "_raw", "_mmap", "_bgr", "_gray", "_reduced")
+
+    def __init__(
+        self,
+        source: str,
+        raw: Optional[Union[bytes, memoryview]] = None,
+        bgr: Optional[np.ndarray] = None,
+        gray: Optional[np.ndarray] = None,
+        _mapped: Optional[mmap.mmap] = None,
+    ) -> None:
+        self.source = source
+        self._raw = raw
+        self._mmap = _mapped
+        self._bgr = bgr
+        self._gray = gray
+        self._reduced = {}
+
+    @classmethod
+    def from_path(cls, path: str) -> "DecodedImage":
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return cls(path, raw=b"")
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls(path, raw=memoryview(mapped), _mapped=mapped)
+
+    @classmethod
+    def from_bytes(cls, data: Union[bytes, bytearray, memoryview], source: str = "<memory>") -> "DecodedImage":
+        return cls(source, raw=memoryview(data))
+
+    @classmethod
+    def from_array(cls, image: np.ndarray, source: str = "<memory>") -> "DecodedImage":
+        """Wrap an already decoded 8-bit grayscale, BGR or BGRA frame."""
+
+        if image.dtype != np.uint8:
+            raise ValueError("expected an 8-bit image")
+        if image.ndim == 2:
+            return cls(source, gray=image)
+        if image.ndim == 3 and image.shape[2] == 4:
+            image = cv2.cvtColor(image, cv2.COLOR_BGRA2BGR)
+        return cls(source, bgr=image)
+
+    @property
+    def raw(self) -> Optional[memoryview]:
+        """Encoded bytes, when the image came from a file or buffer."""
+
+        if self._raw is None:
+            return None
+        return self._raw if isinstance(self._raw, memoryview) else memoryview(self._raw)
+
+    @property
+    def bgr(self) -> np.ndarray:
+        if self._bgr is None:
+            if self._gray is not None:
+                self._bgr = cv2.cvtColor(self._gray, cv2.COLOR_GRAY2BGR)
+            else:
+                self._bgr = self._decode()
+        return self._bgr
+
+    @property
+    def gray(self) -> np.ndarray:
+        if self._gray is None:
+            self._gray = cv2.cvtColor(self.bgr, cv2.COLOR_BGR2GRAY)
+        return self._gray
+
+    def reduced_gray(self, factor: int) -> np.ndarray:
+        """Grayscale at 1/``factor`` resolution (2, 4 or 8), without a full decode when possible."""
+
+        if factor <= 1:
+            return self.gray
+        reduced = self._reduced.get(factor)
+        if reduced is not None:
+            return reduced
+        if (
+            self._gray is None
+            and self._bgr is None
+            and factor in _REDUCED_FLAGS
+            and self._raw
+            and bytes(self._raw[:2]) == _JPEG_SOI
+        ):
+            reduced = cv2.imdecode(np.frombuffer(self._raw, dtype=np.uint8), _REDUCED_FLAGS[factor])
+            if reduced is None:
+                raise ValueError(f"Failed to load image: {self.source}")
+        else:
+            source = self._gray if self._gray is not None else self.gray
+            h, w = source.shape[:2]
+            size = (max(1, -(-w // factor)), max(1, -(-h // factor)))
+            reduced = cv2.resize(source, size, interpolation=cv2.INTER_AREA)
+        self._reduced[factor] = reduced
+        return reduced
+
+    @property
+    def is_grayscale(self) -> bool:
+        """True when the image was supplied as a single-channel array."""
+
+        return self._raw is None and self._bgr is None and self._gray is not None
+
+    def _decode(self) -> np.ndarray:
+        if not self._raw:
+            raise ValueError(f"Failed to load image: {self.source}")
+        img = cv2.imdecode(np.frombuffer(self._raw, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if img is None:
+            raise ValueError(f"Failed to load image: {self.source}")
+        return img
+
+    def close(self) -> None:
+        """Release the file mapping; decoded arrays stay usable."""
+
+        if self._mmap is None:
+            return
+        try:
+            if isinstance(self._raw, memoryview):
+                self._raw.release()
+            self._mmap.close()
+        except BufferError:
+            # Someone still holds a view of the raw bytes; the mapping is
+            # released when the last reference goes away.
+            return
+        self._raw = None
+        self._mmap = None
+
+    def __enter__(self) -> "DecodedImage":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+ImageInput = Union[str, DecodedImage, np.ndarray, bytes, bytearray, memoryview]
+
+
+def as_decoded(image: ImageInput) -> DecodedImage:
+    """Accept a path, encoded bytes, a decoded array or a ``DecodedImage``."""
+
+    if isinstance(image, DecodedImage):
+        return image
+    if isinstance(image, str):
+        return DecodedImage.from_path(image)
+    if isinstance(image, np.ndarray):
+        return DecodedImage.from_array(image)
+    if isinstance(image, (bytes, bytearray, memoryview)):
+        return DecodedImage.from_bytes(image)
+    raise TypeError(f"unsupported image input: {type(image).__name__}")
+
+
+def decoded_input(image: ImageInput) -> ContextManager[DecodedImage]:
+    """``as_decoded`` for a ``with`` block: closes what it opened, never the caller's ``DecodedImage``."""
+
+    if isinstance(image, DecodedImage):
+        return contextlib.nullcontext(image)
+    return as_decoded(image)
+
+
+def is_image_source(image: ImageInput) -> bool:
+    """Paths must carry an image extension; in-memory inputs always qualify."""
+
+    if isinstance(image, str):
+        return image.lower().endswith(IMAGE_SUFFIXES)
+    return True
+
+
+def image_source(image: ImageInput) -> str:
+    if isinstance(image, DecodedImage):
+        return image.source
+    return image if isinstance(image, str) else "<memory>"
@@ -0,0 +1,116 @@
+"""Perceptual-hash cache that lets near-identical frames skip OCR and stego.
+
+Consecutive screenshots of a static desktop differ by a blinking cursor or a
+clock at most. A 64-bit difference hash (dHash) of each frame is compared
+with the last few analysed frames of the same session; within
+``max_distance`` differing bits the previous OCR/stego verdict is reused.
+
+The hash is computed with NumPy only: the grayscale frame is area-averaged
+down to a 9x8 grid with ``np.add.reduceat`` and each bit records whether a
+cell is brighter than its right-hand neighbour.
+
+A 9x8 grid over a whole screen averages a new line of text away, so the
+dHash alone only shortlists candidates. Callers that pass the frame's tile
+signatures (``ocr_stego.tile_signatures``) get a verdict back only when no
+tile changed, which is what the OCR needs to have nothing new to read.
+
+Reuse trades recall for CPU: a payload hidden purely in pixel LSBs moves
+neither the dHash nor the bucketed tile signatures. Set
+``VISUAL_FRAME_CACHE_DISTANCE=-1`` to disable reuse.
+"""
+
+from __future__ import annotations
+
+import os
+from collections import OrderedDict, deque
+from typing import Deque, Dict, Optional, Tuple
+
+import numpy as np
+
+
+FRAME_CACHE_DISTANCE = int(os.getenv("VISUAL_FRAME_CACHE_DISTANCE", "4"))
+FRAME_CACHE_SESSIONS = int(os.getenv("VISUAL_FRAME_CACHE_SESSIONS", "1024"))
+FRAME_CACHE_PER_SESSION = int(os.getenv("VISUAL_FRAME_CACHE_PER_SESSION", "4"))
+
+_HASH_ROWS = 8
+_HASH_COLS = _HASH_ROWS + 1
+
+
+def _area_downscale(gray: np.ndarray, rows: int, cols: int) -> np.ndarray:
+    h, w = gray.shape[:2]
+    row_edges = np.linspace(0, h, rows + 1).astype(np.intp)[:-1]
+    col_edges = np.linspace(0, w, cols + 1).astype(np.intp)[:-1]
+    sums = np.add.reduceat(np.add.reduceat(gray.astype(np.float64), row_edges, axis=0), col_edges, axis=1)
+    counts = np.outer(np.diff(np.append(row_edges, h)), np.diff(np.append(col_edges, w)))
+    return sums / counts
+
+
+def dhash(gray: np.ndarray) -> int:
+    """64-bit difference hash of a 2-D grayscale image."""
+
+    if gray.ndim != 2 or gray.shape[0] < _HASH_ROWS or gray.shape[1] < _HASH_COLS:
+        raise ValueError("dhash needs a 2-D image of at least 8x9 pixels")
+    small = _area_downscale(gray, _HASH_ROWS, _HASH_COLS)
+    bits = (small[:, 1:] > small[:, :-1]).ravel()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def hamming(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+def _same_tiles(a: Optional[np.ndarray], b: Optional[np.ndarray]) -> bool:
+    if a is None or b is None:
+        return a is None and b is None
+    return a.shape == b.shape and bool(np.array_equal(a, b))
+
+
+class FrameCache:
+    """Per-session LRU of recent (dHash, tile signatures, verdict) entries."""
+
+    def __init__(
+        self,
+        max_distance: int = FRAME_CACHE_DISTANCE,
+        max_sessions: int = FRAME_CACHE_SESSIONS,
+        per_session: int = FRAME_CACHE_PER_SESSION,
+    ) -> None:
+        self.max_distance = max_distance
+        self.max_sessions = max_sessions
+        self.per_session = per_session
+        self._sessions: "OrderedDict[str, Deque[Tuple[int, Optional[np.ndarray], Dict[str, object]]]]" = OrderedDict()
+        self.stats: Dict[str, int] = {"hits": 0, "misses": 0, "evicted_sessions": 0}
+
+    def lookup(
+        self, session_id: str, frame_hash: int, tiles: Optional[np.ndarray] = None
+    ) -> Optional[Dict[str, object]]:
+        """A recent verdict within ``max_distance`` bits whose tile signatures equal ``tiles``."""
+
+        if self.max_distance < 0:
+            self.stats["misses"] += 1
+            return None
+        entries = self._sessions.get(session_id)
+        if entries is not None:
+            self._sessions.move_to_end(session_id)
+            for cached_hash, cached_tiles, verdict in reversed(entries):
+                if hamming(cached_hash, frame_hash) <= self.max_distance and _same_tiles(cached_tiles, tiles):
+                    self.stats["hits"] += 1
+                    return verdict
+        self.stats["misses"] += 1
+        return None
+
+    def store(
+        self, session_id: str, frame_hash: int, verdict: Dict[str, object], tiles: Optional[np.ndarray] = None
+    ) -> None:
+        entries = self._sessions.get(session_id)
+        if entries is None:
+            entries = self._sessions[session_id] = deque(maxlen=self.per_session)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+                self.stats["evicted_sessions"] += 1
+        else:
+            self._sessions.move_to_end(session_id)
+        entries.append((frame_hash, tiles, verdict))
+
+    def hit_rate(self) -> float:
+        total = self.stats["hits"] + self.stats["misses"]
+        return self.stats["hits"] / total if total else 0.0
@@ -0,0 +1,878 @@
+"""Live framebuffer reconstruction from the server-to-client RFB stream.
+
+The proxy forwards raw TCP chunks (``payload_b64``). ``ServerStreamParser``
+follows the server side of the handshake (ProtocolVersion, security,
+ServerInit), then applies every ``FramebufferUpdate`` rectangle in place to
+one preallocated ``(height, width, 3)`` BGR canvas per session:
+
+- ``Raw`` rows are converted straight into the canvas slice as soon as they
+  arrive, so a full-screen update never has to be buffered whole;
+- ``CopyRect`` is a single slice assignment inside the canvas;
+- ``RRE`` and ``Hextile`` fill sub-rectangles with slice assignments;
+- ``Zlib`` inflates through the per-connection zlib stream into the Raw path.
+
+``DesktopSize`` / ``ExtendedDesktopSize`` reallocate the canvas, ``LastRect``
+ends an update, and cursor shapes, colour maps, bells and server cut text are
+consumed by length. Any encoding the parser cannot frame marks the stream
+``desynced``; reconstruction stops for that session instead of guessing.
+
+A Zlib rectangle is inflated with ``max_length`` set to the bytes it needs
+and rejected (desync) when its compressed data holds more, or when it is
+larger than the canvas, so a hostile stream cannot make the parser inflate
+more than one screen's worth per rectangle.
+
+Pixel formats are honoured as negotiated: the server's ``ServerInit`` format
+and any ``SetPixelFormat`` seen on the client-to-server stream
+(``ClientFormatWatcher``, framed by the application detector's
+``rfb.ClientMessageParser``). The common 32bpp little-endian BGRX layout is a
+plain strided copy; other true-colour formats are unpacked with shifts, and
+colour-mapped formats go through a lookup table.
+
+The parsers need each direction's chunks in order and exactly once, but
+events reach the detector over independent HTTP requests. When the proxy
+numbers its chunks (``seq``, per session and direction) ``FramebufferSessions``
+applies them in that order: duplicates are dropped, early chunks wait for the
+missing ones, and a gap that ``VISUAL_FB_REORDER_WINDOW`` later chunks have
+not filled is a loss. A lost server chunk desyncs reconstruction for the
+session; a lost client chunk restarts the client parser at the next chunk.
+Chunks without ``seq`` are applied as they arrive.
+
+``FramebufferSessions`` keeps one canvas per active session (LRU-capped by
+``VISUAL_FB_MAX_SESSIONS``) and cuts a snapshot for analysis when the canvas
+changed and ``VISUAL_FB_SNAPSHOT_INTERVAL`` seconds have passed, or on demand.
+With a ``sampler`` (``ocr_scheduler.SamplingScheduler``) the sampler decides
+instead, given how much of the screen changed. Its methods take a lock, so
+chunks can be decoded on a worker thread while the event loop cuts on-demand
+snapshots.
+"""
+
+from __future__ import annotations
+
+import os
+import struct
+import sys
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+_project_root = Path(__file__).resolve().parents[2]
+if str(_project_root) not in sys.path:
+    sys.path.insert(0, str(_project_root))
+
+from detectors.app.rfb import ClientMessageParser, SetPixelFormat  # noqa: E402
+from shared.seq_reorder import SeqReorder  # noqa: E402
+
+
+FB_MAX_SESSIONS = int(os.getenv("VISUAL_FB_MAX_SESSIONS", "64"))
+FB_SNAPSHOT_INTERVAL = float(os.getenv("VISUAL_FB_SNAPSHOT_INTERVAL", "2.0"))
+FB_MAX_DIMENSION = int(os.getenv("VISUAL_FB_MAX_DIMENSION", "8192"))
+FB_REORDER_WINDOW = int(os.getenv("VISUAL_FB_REORDER_WINDOW", "32"))
+
+# Encodings (RFC 6143 section 7.7)
+ENC_RAW = 0
+ENC_COPY_RECT = 1
+ENC_RRE = 2
+ENC_HEXTILE = 5
+ENC_ZLIB = 6
+ENC_CURSOR = -239
+ENC_DESKTOP_SIZE = -223
+ENC_LAST_RECT = -224
+ENC_EXTENDED_DESKTOP_SIZE = -308
+
+# Server-to-client message types (RFC 6143 section 7.6)
+MSG_FRAMEBUFFER_UPDATE = 0
+MSG_SET_COLOUR_MAP_ENTRIES = 1
+MSG_BELL = 2
+MSG_SERVER_CUT_TEXT = 3
+
+_VERSION_PREFIX = b"RFB "
+_VERSION_LENGTH = 12
+_SECURITY_NONE = 1
+_SECURITY_VNC_AUTH = 2
+_VNC_AUTH_CHALLENGE_LENGTH = 16
+_SERVER_INIT_LENGTH = 24
+_MAX_NAME_LENGTH = 4096
+
+# Hextile subencoding mask bits
+_HEXTILE_RAW = 1
+_HEXTILE_BACKGROUND = 2
+_HEXTILE_FOREGROUND = 4
+_HEXTILE_ANY_SUBRECTS = 8
+_HEXTILE_SUBRECTS_COLOURED = 16
+
+
+class PixelFormat(NamedTuple):
+    bits_per_pixel: int
+    depth: int
+    big_endian: bool
+    true_colour: bool
+    red_max: int
+    green_max: int
+    blue_max: int
+    red_shift: int
+    green_shift: int
+    blue_shift: int
+
+    @classmethod
+    def parse(cls, buf, offset: int = 0) -> "PixelFormat":
+        bpp, depth, big_endian, true_colour, rmax, gmax, bmax, rshift, gshift, bshift = struct.unpack_from(
+            ">BBBBHHHBBB", buf, offset
+        )
+        return cls(bpp, depth, bool(big_endian), bool(true_colour), rmax, gmax, bmax, rshift, gshift, bshift)
+
+    @property
+    def bytes_per_pixel(self) -> int:
+        return self.bits_per_pixel // 8
+
+    @property
+    def is_bgrx(self) -> bool:
+        """Memory order B, G, R, X: copy bytes without unpacking."""
+
+        return (
+            self.bits_per_pixel == 32
+            and self.true_colour
+            and (self.red_max, self.green_max, self.blue_max) == (255, 255, 255)
+            and (
+                (not self.big_endian and (self.red_shift, self.green_shift, self.blue_shift) == (16, 8, 0))
+                or (self.big_endian and (self.red_shift, self.green_shift, self.blue_shift) == (8, 16, 24))
+            )
+        )
+
+    def is_valid(self) -> bool:
+        return self.bits_per_pixel in (8, 16, 32) and 0 < self.depth <= self.bits_per_pixel
+
+
+BGRX32 = PixelFormat(32, 24, False, True, 255, 255, 255, 16, 8, 0)
+
+
+def _pixel_dtype(fmt: PixelFormat) -> np.dtype:
+    order = ">" if fmt.big_endian else "<"
+    return np.dtype(f"{order}u{fmt.bytes_per_pixel}")
+
+
+def _channel(values: np.ndarray, shift: int, maximum: int) -> np.ndarray:
+    channel = (values >> shift) & maximum
+    if maximum != 255:
+        channel = channel.astype(np.uint32) * 255 // max(1, maximum)
+    return channel
+
+
+def convert_pixels(data, fmt: PixelFormat, out: np.ndarray, colour_map: Optional[np.ndarray] = None) -> None:
+    """Decode ``out.shape[0] * out.shape[1]`` pixels from ``data`` into the BGR view ``out``."""
+
+    h, w = out.shape[:2]
+    if fmt.is_bgrx:
+        pixels = np.frombuffer(data, dtype=np.uint8, count=h * w * 4).reshape(h, w, 4)
+        out[...] = pixels[..., :3]
+        return
+    values = np.frombuffer(data, dtype=_pixel_dtype(fmt), count=h * w).reshape(h, w)
+    if not fmt.true_colour:
+        lut = colour_map if colour_map is not None else _GRAY_MAP
+        out[...] = lut[values & 0xFF]
+        return
+    out[..., 0] = _channel(values, fmt.blue_shift, fmt.blue_max)
+    out[..., 1] = _channel(values, fmt.green_shift, fmt.green_max)
+    out[..., 2] = _channel(values, fmt.red_shift, fmt.red_max)
+
+
+def convert_pixel(data, fmt: PixelFormat, colour_map: Optional[np.ndarray] = None) -> np.ndarray:
+    out = np.empty((1, 1, 3), dtype=np.uint8)
+    convert_pixels(data, fmt, out, colour_map)
+    return out[0, 0]
+
+
+_GRAY_MAP = np.repeat(np.arange(256, dtype=np.uint8)[:, None], 3, axis=1)
+
+
+class Framebuffer:
+    """A preallocated BGR canvas updated in place, rectangle by rectangle."""
+
+    __slots__ = ("pixels", "updates", "rects", "changed")
+
+    def __init__(self, width: int, height: int) -> None:
+        self.pixels = np.zeros((height, width, 3), dtype=np.uint8)
+        self.updates = 0
+        self.rects = 0
+        # Pixels written since the last snapshot (overlapping writes count twice).
+        self.changed = 0
+
+    @property
+    def width(self) -> int:
+        return self.pixels.shape[1]
+
+    @property
+    def height(self) -> int:
+        return self.pixels.shape[0]
+
+    @property
+    def dirty(self) -> bool:
+        return self.changed > 0
+
+    @property
+    def churn(self) -> float:
+        """Share of the canvas repainted since the last snapshot, capped at 1."""
+
+        return min(1.0, self.changed / float(max(1, self.pixels.shape[0] * self.pixels.shape[1])))
+
+    def resize(self, width: int, height: int) -> None:
+        if (height, width) == self.pixels.shape[:2]:
+            return
+        old = self.pixels
+        self.pixels = np.zeros((height, width, 3), dtype=np.uint8)
+        h, w = min(height, old.shape[0]), min(width, old.shape[1])
+        self.pixels[:h, :w] = old[:h, :w]
+        self.changed += width * height
+
+    def region(self, x: int, y: int, w: int, h: int) -> np.ndarray:
+        """A view of the canvas; out-of-bounds parts are clipped away."""
+
+        return self.pixels[y:y + h, x:x + w]
+
+    def raw_rows(self, x: int, y: int, w: int, data, fmt: PixelFormat, colour_map=None) -> None:
+        """Write whole rows of ``w`` pixels starting at row ``y``."""
+
+        rows = len(data) // (w * fmt.bytes_per_pixel)
+        target = self.region(x, y, w, rows)
+        th, tw = target.shape[:2]
+        if th == 0 or tw == 0:
+            return
+        if (th, tw) == (rows, w):
+            convert_pixels(data, fmt, target, colour_map)
+        else:
+            # Partly off-canvas: decode the full rows, keep the visible part.
+            full = np.empty((rows, w, 3), dtype=np.uint8)
+            convert_pixels(data, fmt, full, colour_map)
+            target[...] = full[:th, :tw]
+        self.changed += th * tw
+
+    def copy_rect(self, src_x: int, src_y: int, x: int, y: int, w: int, h: int) -> None:
+        source = self.region(src_x, src_y, w, h)
+        target = self.region(x, y, w, h)
+        h = min(source.shape[0], target.shape[0])
+        w = min(source.shape[1], target.shape[1])
+        if h and w:
+            # NumPy detects the overlap of two views of one array and copies safely.
+            target[:h, :w] = source[:h, :w]
+            self.changed += h * w
+
+    def fill(self, x: int, y: int, w: int, h: int, colour: np.ndarray) -> None:
+        target = self.region(x, y, w, h)
+        if target.size:
+            target[...] = colour
+            self.changed += target.shape[0] * target.shape[1]
+
+    def snapshot(self) -> np.ndarray:
+        """A copy of the canvas that later updates cannot touch."""
+
+        self.changed = 0
+        return self.pixels.copy()
+
+
+def _plausible_server_init(buf: bytearray, pos: int) -> bool:
+    width, height = struct.unpack_from(">HH", buf, pos)
+    fmt = PixelFormat.parse(buf, pos + 4)
+    (name_length,) = struct.unpack_from(">I", buf, pos + 20)
+    return (
+        0 < width <= FB_MAX_DIMENSION
+        and 0 < height <= FB_MAX_DIMENSION
+        and fmt.is_valid()
+        and buf[pos + 6] in (0, 1)
+        and buf[pos + 7] in (0, 1)
+        and name_length <= _MAX_NAME_LENGTH
+    )
+
+
+class _Incomplete(Exception):
+    """Not enough buffered bytes to finish the current item."""
+
+
+class ServerStreamParser:
+    """Stateful, chunk-boundary-safe parser for server-to-client RFB bytes.
+
+    A stream that does not start with ``ProtocolVersion`` cannot be framed
+    (the pixel format and screen size come from ``ServerInit``), so the parser
+    marks it ``desynced`` immediately.
+    """
+
+    def __init__(self) -> None:
+        self._buf = bytearray()
+        self._state = "start"
+        self._minor = 8
+        self._security_types: Tuple[int, ...] = ()
+        self._rects_left = 0
+        self._rect: Tuple[int, int, int, int] = (0, 0, 0, 0)
+        self._raw_row = 0
+        self._skip_left = 0
+        self._zlib: Optional["zlib._Decompress"] = None
+        self.framebuffer: Optional[Framebuffer] = None
+        self.pixel_format: Optional[PixelFormat] = None
+        self.colour_map = _GRAY_MAP.copy()
+        self.name = ""
+        self.desynced = False
+
+    def set_pixel_format(self, fmt: PixelFormat) -> None:
+        """Apply a client ``SetPixelFormat``; later updates use this format."""
+
+        if fmt.is_valid():
+            self.pixel_format = fmt
+
+    def feed(self, data: bytes) -> int:
+        """Consume ``data``; returns the number of rectangles applied."""
+
+        if self.desynced or not data:
+            return 0
+        self._buf.extend(data)
+        before = self.framebuffer.rects if self.framebuffer is not None else 0
+        try:
+            self._drain()
+        except (ValueError, zlib.error):
+            self.desync()
+        after = self.framebuffer.rects if self.framebuffer is not None else 0
+        return after - before
+
+    def desync(self) -> None:
+        """Stop parsing: framing is lost (a bad message or a missing chunk)."""
+
+        self.desynced = True
+        self._buf.clear()
+        self._zlib = None
+
+    def _drain(self) -> None:
+        buf = self._buf
+        pos = 0
+        try:
+            while pos < len(buf) or (self._state == "rect" and self._rects_left == 0):
+                state = self._state
+                available = len(buf) - pos
+
+                if state == "start":
+                    if available < len(_VERSION_PREFIX):
+                        break
+                    if bytes(buf[pos:pos + len(_VERSION_PREFIX)]) != _VERSION_PREFIX:
+                        self.desync()
+                        return
+                    self._state = "version"
+                    continue
+
+                if state == "version":
+                    if available < _VERSION_LENGTH:
+                        break
+                    version = bytes(buf[pos:pos + _VERSION_LENGTH])
+                    try:
+                        self._minor = int(version[8:11])
+                    except ValueError:
+                        self._minor = 3
+                    pos += _VERSION_LENGTH
+                    self._state = "security_33" if self._minor < 7 else "security_types"
+                    continue
+
+                if state == "security_33":
+                    if available < 4:
+                        break
+                    (security_type,) = struct.unpack_from(">I", buf, pos)
+                    pos += 4
+                    if security_type == _SECURITY_NONE:
+                        self._state = "server_init"
+                    elif security_type == _SECURITY_VNC_AUTH:
+                        self._security_types = (_SECURITY_VNC_AUTH,)
+                        self._state = "auth"
+                    else:
+                        self.desync()
+                        return
+                    continue
+
+                if state == "security_types":
+                    count = buf[pos]
+                    if available < 1 + count:
+                        break
+                    self._security_types = tuple(buf[pos + 1:pos + 1 + count])
+                    pos += 1 + count
+                    if not count:
+                        self.desync()
+                        return
+                    self._state = "auth"
+                    continue
+
+                if state == "auth":
+                    skip = self._locate_server_init(buf, pos)
+                    if skip is None:
+                        break
+                    pos += skip
+                    self._state = "server_init"
+                    continue
+
+                if state == "server_init":
+                    if available < _SERVER_INIT_LENGTH:
+                        break
+                    if not _plausible_server_init(buf, pos):
+                        raise ValueError("implausible ServerInit")
+                    (name_length,) = struct.unpack_from(">I", buf, pos + 20)
+                    if available < _SERVER_INIT_LENGTH + name_length:
+                        break
+                    width, height = struct.unpack_from(">HH", buf, pos)
+                    self.pixel_format = PixelFormat.parse(buf, pos + 4)
+                    self.name = bytes(buf[pos + 24:pos + 24 + name_length]).decode("utf-8", "replace")
+                    self.framebuffer = Framebuffer(width, height)
+                    pos += _SERVER_INIT_LENGTH + name_length
+                    self._state = "messages"
+                    continue
+
+                if state == "rect":
+                    if self._rects_left == 0:
+                        self.framebuffer.updates += 1
+                        self._state = "messages"
+                        continue
+                    if available < 12:
+                        break
+                    x, y, w, h, encoding = struct.unpack_from(">HHHHi", buf, pos)
+                    consumed = self._rect_payload(buf, pos + 12, x, y, w, h, encoding)
+                    if consumed is None:
+                        break
+                    pos += 12 + consumed
+                    continue
+
+                if state == "raw":
+                    consumed = self._raw_payload(buf, pos)
+                    if not consumed:
+                        break
+                    pos += consumed
+                    continue
+
+                if state == "skip":
+                    take = min(self._skip_left, available)
+                    self._skip_left -= take
+                    pos += take
+                    if self._skip_left == 0:
+                        self._state = "messages"
+                    continue
+
+                msg_type = buf[pos]
+                if msg_type == MSG_FRAMEBUFFER_UPDATE:
+                    if available < 4:
+                        break
+                    (self._rects_left,) = struct.unpack_from(">H", buf, pos + 2)
+                    pos += 4
+                    self._state = "rect"
+                elif msg_type == MSG_SET_COLOUR_MAP_ENTRIES:
+                    if available < 6:
+                        break
+                    first, count = struct.unpack_from(">HH", buf, pos + 2)
+                    if available < 6 + 6 * count:
+                        break
+                    entries = np.frombuffer(bytes(buf[pos + 6:pos + 6 + 6 * count]), dtype=">u2").reshape(count, 3)
+                    last = min(256, first + count)
+                    if first < last:
+                        # RGB 16-bit entries into the BGR lookup table.
+                        self.colour_map[first:last] = (entries[: last - first, ::-1] >> 8).astype(np.uint8)
+                    pos += 6 + 6 * count
+                elif msg_type == MSG_BELL:
+                    pos += 1
+                elif msg_type == MSG_SERVER_CUT_TEXT:
+                    if available < 8:
+                        break
+                    (self._skip_left,) = struct.unpack_from(">I", buf, pos + 4)
+                    pos += 8
+                    if self._skip_left:
+                        self._state = "skip"
+                else:
+                    self.desync()
+                    return
+        finally:
+            if not self.desynced:
+                del buf[:pos]
+
+    def _locate_server_init(self, buf: bytearray, pos: int) -> Optional[int]:
+        """Bytes between the security types and ``ServerInit``.
+
+        Only the server half of the stream is visible here, so the chosen
+        security type is inferred: each handshake the offered types allow is
+        tried and the first that is followed by a plausible ``ServerInit``
+        wins.
+        """
+
+        candidates: List[int] = []
+        if _SECURITY_VNC_AUTH in self._security_types:
+            candidates.append(_VNC_AUTH_CHALLENGE_LENGTH + 4)
+        if _SECURITY_NONE in self._security_types and self._minor >= 7:
+            candidates.append(4 if self._minor >= 8 else 0)
+        if not candidates:
+            raise ValueError("unsupported RFB security types")
+        available = len(buf) - pos
+        waiting = False
+        for skip in candidates:
+            if available < skip + _SERVER_INIT_LENGTH:
+                waiting = True
+                continue
+            if skip and bytes(buf[pos + skip - 4:pos + skip]) != b"\x00\x00\x00\x00":
+                continue
+            if _plausible_server_init(buf, pos + skip):
+                return skip
+        if waiting:
+            return None
+        raise ValueError("no ServerInit after the security handshake")
+
+    def _rect_payload(self, buf: bytearray, pos: int, x: int, y: int, w: int, h: int, encoding: int) -> Optional[int]:
+        """Apply one rectangle whose payload starts at ``pos``; ``None`` if incomplete."""
+
+        fb = self.framebuffer
+        fmt = self.pixel_format
+        available = len(buf) - pos
+        bpp = fmt.bytes_per_pixel
+
+        if encoding == ENC_RAW:
+            self._rect = (x, y, w, h)
+            self._raw_row = 0
+            self._rects_left -= 1
+            fb.rects += 1
+            self._state = "raw" if w and h else "rect"
+            return 0
+
+        if encoding == ENC_COPY_RECT:
+            if available < 4:
+                return None
+            src_x, src_y = struct.unpack_from(">HH", buf, pos)
+            fb.copy_rect(src_x, src_y, x, y, w, h)
+            self._finish_rect()
+            return 4
+
+        if encoding == ENC_RRE:
+            if available < 4 + bpp:
+                return None
+            (count,) = struct.unpack_from(">I", buf, pos)
+            length = 4 + bpp + count * (bpp + 8)
+            if available < length:
+                return None
+            view = memoryview(buf)
+            try:
+                fb.fill(x, y, w, h, convert_pixel(view[pos + 4:pos + 4 + bpp], fmt, self.colour_map))
+                offset = pos + 4 + bpp
+                for _ in range(count):
+                    colour = convert_pixel(view[offset:offset + bpp], fmt, self.colour_map)
+                    sx, sy, sw, sh = struct.unpack_from(">HHHH", buf, offset + bpp)
+                    fb.fill(x + sx, y + sy, min(sw, w - sx), min(sh, h - sy), colour)
+                    offset += bpp + 8
+            finally:
+                view.release()
+            self._finish_rect()
+            return length
+
+        if encoding == ENC_HEXTILE:
+            try:
+                length = self._hextile(buf, pos, x, y, w, h)
+            except _Incomplete:
+                return None
+            self._finish_rect()
+            return length
+
+        if encoding == ENC_ZLIB:
+            if available < 4:
+                return None
+            (length,) = struct.unpack_from(">I", buf, pos)
+            if available < 4 + length:
+                return None
+            if w * h > fb.width * fb.height:
+                raise ValueError("zlib rectangle larger than the screen")
+            if self._zlib is None:
+                self._zlib = zlib.decompressobj()
+            expected = w * h * bpp
+            pixels = self._zlib.decompress(bytes(buf[pos + 4:pos + 4 + length]), expected)
+            if len(pixels) < expected:
+                raise ValueError("short zlib rectangle")
+            if self._zlib.unconsumed_tail:
+                # Only an empty flush block may follow the rectangle's pixels.
+                if self._zlib.decompress(self._zlib.unconsumed_tail, 1) or self._zlib.unconsumed_tail:
+                    raise ValueError("oversized zlib rectangle")
+            if w and h:
+                fb.raw_rows(x, y, w, memoryview(pixels), fmt, self.colour_map)
+            self._finish_rect()
+            return 4 + length
+
+        if encoding == ENC_CURSOR:
+            length = w * h * bpp + ((w + 7) // 8) * h
+            if available < length:
+                return None
+            self._rects_left -= 1
+            return length
+
+        if encoding == ENC_DESKTOP_SIZE:
+            self._resize(w, h)
+            self._rects_left -= 1
+            return 0
+
+        if encoding == ENC_EXTENDED_DESKTOP_SIZE:
+            if available < 4:
+                return None
+            length = 4 + 16 * buf[pos]
+            if available < length:
+                return None
+            self._resize(w, h)
+            self._rects_left -= 1
+            return length
+
+        if encoding == ENC_LAST_RECT:
+            self._rects_left = 0
+            return 0
+
+        raise ValueError(f"unsupported RFB encoding {encoding}")
+
+    def _finish_rect(self) -> None:
+        self._rects_left -= 1
+        self.framebuffer.rects += 1
+
+    def _resize(self, width: int, height: int) -> None:
+        if not (0 < width <= FB_MAX_DIMENSION and 0 < height <= FB_MAX_DIMENSION):
+            raise ValueError("implausible desktop size")
+        self.framebuffer.resize(width, height)
+
+    def _raw_payload(self, buf: bytearray, pos: int) -> int:
+        """Apply every complete buffered row of the current Raw rectangle; returns bytes used."""
+
+        x, y, w, h = self._rect
+        row_bytes = w * self.pixel_format.bytes_per_pixel
+        rows = min((len(buf) - pos) // row_bytes, h - self._raw_row)
+        if rows == 0:
+            return 0
+        view = memoryview(buf)
+        try:
+            self.framebuffer.raw_rows(
+                x, y + self._raw_row, w, view[pos:pos + rows * row_bytes], self.pixel_format, self.colour_map
+            )
+        finally:
+            view.release()
+        self._raw_row += rows
+        if self._raw_row == h:
+            self._state = "rect"
+        return rows * row_bytes
+
+    def _hextile(self, buf: bytearray, pos: int, x: int, y: int, w: int, h: int) -> int:
+        """Apply a Hextile rectangle once it is fully buffered; returns its length."""
+
+        fmt = self.pixel_format
+        bpp = fmt.bytes_per_pixel
+        end = len(buf)
+        # Size pass first, so a rectangle split across chunks is applied once.
+        offset = pos
+        for ty in range(y, y + h, 16):
+            th = min(16, y + h - ty)
+            for tx in range(x, x + w, 16):
+                tw = min(16, x + w - tx)
+                if offset >= end:
+                    raise _Incomplete()
+                mask = buf[offset]
+                offset += 1
+                if mask & _HEXTILE_RAW:
+                    offset += tw * th * bpp
+                    continue
+                if mask & _HEXTILE_BACKGROUND:
+                    offset += bpp
+                if mask & _HEXTILE_FOREGROUND:
+                    offset += bpp
+                if mask & _HEXTILE_ANY_SUBRECTS:
+                    if offset >= end:
+                        raise _Incomplete()
+                    count = buf[offset]
+                    offset += 1 + count * (2 + (bpp if mask & _HEXTILE_SUBRECTS_COLOURED else 0))
+                if offset > end:
+                    raise _Incomplete()
+        if offset > end:
+            raise _Incomplete()
+
+        fb = self.framebuffer
+        view = memoryview(buf)
+        background = foreground = np.zeros(3, dtype=np.uint8)
+        try:
+            offset = pos
+            for ty in range(y, y + h, 16):
+                th = min(16, y + h - ty)
+                for tx in range(x, x + w, 16):
+                    tw = min(16, x + w - tx)
+                    mask = buf[offset]
+                    offset += 1
+                    if mask & _HEXTILE_RAW:
+                        fb.raw_rows(tx, ty, tw, view[offset:offset + tw * th * bpp], fmt, self.colour_map)
+                        offset += tw * th * bpp
+                        continue
+                    if mask & _HEXTILE_BACKGROUND:
+                        background = convert_pixel(view[offset:offset + bpp], fmt, self.colour_map)
+                        offset += bpp
+                    fb.fill(tx, ty, tw, th, background)
+                    if mask & _HEXTILE_FOREGROUND:
+                        foreground = convert_pixel(view[offset:offset + bpp], fmt, self.colour_map)
+                        offset += bpp
+                    if not mask & _HEXTILE_ANY_SUBRECTS:
+                        continue
+                    count = buf[offset]
+                    offset += 1
+                    coloured = mask & _HEXTILE_SUBRECTS_COLOURED
+                    for _ in range(count):
+                        colour = foreground
+                        if coloured:
+                            colour = convert_pixel(view[offset:offset + bpp], fmt, self.colour_map)
+                            offset += bpp
+                        xy, wh = buf[offset], buf[offset + 1]
+                        offset += 2
+                        sx, sy = xy >> 4, xy & 0x0F
+                        fb.fill(tx + sx, ty + sy, min((wh >> 4) + 1, tw - sx), min((wh & 0x0F) + 1, th - sy), colour)
+        finally:
+            view.release()
+        return offset - pos
+
+
+class ClientFormatWatcher:
+    """Tracks ``SetPixelFormat`` on the client-to-server stream.
+
+    Clients usually ask for a pixel format other than the server's native
+    one right after ``ServerInit``; every later update is encoded in it. The
+    framing is the application detector's ``ClientMessageParser``; only the
+    pixel format is kept.
+    """
+
+    def __init__(self) -> None:
+        self._parser = ClientMessageParser()
+
+    @property
+    def desynced(self) -> bool:
+        return self._parser.desynced
+
+    def feed(self, data: bytes) -> Optional[PixelFormat]:
+        """Consume ``data``; returns the last pixel format the client set, if any."""
+
+        fmt: Optional[PixelFormat] = None
+        for message in self._parser.feed(data):
+            if isinstance(message, SetPixelFormat):
+                fmt = PixelFormat.parse(message.pixel_format)
+        return fmt
+
+
+class _SessionFramebuffer:
+    __slots__ = ("server", "client", "last_snapshot", "order")
+
+    def __init__(self) -> None:
+        self.server = ServerStreamParser()
+        self.client = ClientFormatWatcher()
+        self.last_snapshot = float("-inf")
+        self.order: Dict[str, SeqReorder] = {}
+
+
+class FramebufferSessions:
+    """One reconstructed canvas per active session, with snapshot cadence."""
+
+    def __init__(
+        self,
+        max_sessions: int = FB_MAX_SESSIONS,
+        snapshot_interval: float = FB_SNAPSHOT_INTERVAL,
+        clock: Callable[[], float] = time.monotonic,
+        sampler=None,
+        reorder_window: int = FB_REORDER_WINDOW,
+    ) -> None:
+        self.max_sessions = max(1, max_sessions)
+        self.snapshot_interval = snapshot_interval
+        self.sampler = sampler
+        self.reorder_window = max(0, reorder_window)
+        self._clock = clock
+        self._sessions: "OrderedDict[str, _SessionFramebuffer]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats: Dict[str, int] = {
+            "rects": 0,
+            "snapshots": 0,
+            "desynced": 0,
+            "evicted": 0,
+            "reordered": 0,
+            "duplicates": 0,
+            "gaps": 0,
+        }
+
+    def _session(self, session_id: str) -> _SessionFramebuffer:
+        state = self._sessions.get(session_id)
+        if state is None:
+            state = self._sessions[session_id] = _SessionFramebuffer()
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+                self.stats["evicted"] += 1
+        else:
+            self._sessions.move_to_end(session_id)
+        return state
+
+    def feed(self, session_id: str, direction: str, data: bytes, seq: Optional[int] = None) -> Optional[np.ndarray]:
+        """Apply one proxied chunk (number ``seq`` in its direction); returns a snapshot when one is due."""
+
+        with self._lock:
+            state = self._session(session_id)
+            was_desynced = state.server.desynced
+            if seq is None:
+                chunks = [data]
+            else:
+                chunks = self._in_order(state, direction, seq, data)
+
+            if direction == "client_to_server":
+                for chunk in chunks:
+                    fmt = state.client.feed(chunk)
+                    if fmt is not None:
+                        state.server.set_pixel_format(fmt)
+                return None
+
+            for chunk in chunks:
+                self.stats["rects"] += state.server.feed(chunk)
+            if state.server.desynced:
+                if not was_desynced:
+                    self.stats["desynced"] += 1
+                return None
+            fb = state.server.framebuffer
+            if fb is None or not fb.dirty or self.snapshot_interval < 0:
+                return None
+            if self.sampler is not None:
+                if not self.sampler.admit(session_id, fb.churn):
+                    return None
+            elif self._clock() - state.last_snapshot < self.snapshot_interval:
+                return None
+            return self._cut(state)
+
+    def _in_order(self, state: _SessionFramebuffer, direction: str, seq: int, data: bytes) -> List[bytes]:
+        order = state.order.get(direction)
+        if order is None:
+            order = state.order[direction] = SeqReorder()
+        if seq < order.expected or seq in order.pending:
+            self.stats["duplicates"] += 1
+        elif seq != order.expected:
+            self.stats["reordered"] += 1
+        chunks, lost = order.push(seq, data, self.reorder_window)
+        if lost:
+            self.stats["gaps"] += 1
+            if direction == "client_to_server":
+                # Clients write whole messages, so framing resumes at the next chunk.
+                state.client = ClientFormatWatcher()
+            else:
+                state.server.desync()
+        return chunks
+
+    def snapshot(self, session_id: str) -> Optional[np.ndarray]:
+        """Cut a snapshot now, whether or not the cadence is due."""
+
+        with self._lock:
+            state = self._sessions.get(session_id)
+            if state is None or state.server.framebuffer is None:
+                return None
+            return self._cut(state)
+
+    def _cut(self, state: _SessionFramebuffer) -> np.ndarray:
+        state.last_snapshot = self._clock()
+        self.stats["snapshots"] += 1
+        return state.server.framebuffer.snapshot()
+
+    def drop(self, session_id: str) -> None:
+        with self._lock:
+            self._sessions.pop(session_id, None)
+        if self.sampler is not None:
+            self.sampler.forget(session_id)
+
+    def status(self) -> Dict[str, object]:
+        with self._lock:
+            canvas_bytes = sum(
+                s.server.framebuffer.pixels.nbytes for s in self._sessions.values() if s.server.framebuffer is not None
+            )
+            return {"sessions": len(self._sessions), "canvas_bytes": canvas_bytes, **self.stats}
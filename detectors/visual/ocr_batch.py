@@ -0,0 +1,131 @@
+"""Pack many small OCR regions into one canvas so they share one engine call.
+
+Each OCR call pays a fixed cost regardless of how few pixels it reads: the
+pytesseract path writes a temp file and spawns a process, and even a
+persistent handle re-runs page layout. With many small dirty regions, or
+small frames from many sessions, that fixed cost dominates.
+
+``pack_regions`` lays the preprocessed (binarised, scaled) regions out on
+shelves: sorted by height, left to right, with ``OCR_BATCH_GAP`` pixels of
+background between neighbours and between shelves, each shelf at most
+``OCR_BATCH_MAX_WIDTH`` wide. A canvas holds at most ``OCR_BATCH_MAX_PIXELS``
+pixels; further regions start a new canvas. ``compose`` paints the canvas
+white and normalises every region to dark text on a light background, so
+light-on-dark terminals and dark-on-light documents can share a page.
+
+Only regions of at most ``OCR_BATCH_REGION_PIXELS`` source pixels share a
+canvas; larger ones (a full frame, a big dirty area) are read on their own
+with the page-segmentation mode their preprocessing plan chose, since the
+fixed cost is small next to theirs and sparse-text segmentation reads whole
+documents worse.
+
+``assign_words`` maps each recognised word back to the placement that
+contains its centre. The blank gap is wider than any inter-word space, so
+the engine never joins words from neighbouring regions; a word whose centre
+lands in a gap is dropped.
+"""
+
+from __future__ import annotations
+
+import os
+from typing import Dict, List, NamedTuple, Sequence, Tuple
+
+import numpy as np
+
+
+OCR_BATCH_MAX_WIDTH = int(os.getenv("OCR_BATCH_MAX_WIDTH", "2400"))
+OCR_BATCH_MAX_PIXELS = int(os.getenv("OCR_BATCH_MAX_PIXELS", str(4096 * 2400)))
+OCR_BATCH_GAP = int(os.getenv("OCR_BATCH_GAP", "32"))
+OCR_BATCH_REGION_PIXELS = int(os.getenv("OCR_BATCH_REGION_PIXELS", str(640 * 480)))
+# Sparse-text segmentation: regions on one canvas are not one text block.
+OCR_BATCH_PSM = int(os.getenv("OCR_BATCH_PSM", "11"))
+
+
+class Placement(NamedTuple):
+    index: int  # position of the region in the caller's list
+    x: int
+    y: int
+    w: int
+    h: int
+
+
+class Canvas(NamedTuple):
+    width: int
+    height: int
+    placements: List[Placement]
+
+
+def pack_regions(
+    shapes: Sequence[Tuple[int, int]],
+    max_width: int = OCR_BATCH_MAX_WIDTH,
+    max_pixels: int = OCR_BATCH_MAX_PIXELS,
+    gap: int = OCR_BATCH_GAP,
+) -> List[Canvas]:
+    """Shelf-pack ``(height, width)`` shapes onto one or more canvases.
+
+    A region wider than ``max_width`` gets a shelf of its own.
+    """
+
+    order = sorted(range(len(shapes)), key=lambda i: (-shapes[i][0], -shapes[i][1]))
+    canvases: List[Canvas] = []
+    placements: List[Placement] = []
+    width, shelf_y, shelf_h, x = 0, gap, 0, gap
+
+    def flush() -> None:
+        if placements:
+            canvases.append(Canvas(width + gap, shelf_y + shelf_h + gap, list(placements)))
+            placements.clear()
+
+    for i in order:
+        h, w = shapes[i]
+        if x > gap and x + w + gap > max_width:
+            shelf_y += shelf_h + gap
+            shelf_h, x = 0, gap
+        if placements and max(width, x + w) * (shelf_y + max(shelf_h, h)) > max_pixels:
+            flush()
+            width, shelf_y, shelf_h, x = 0, gap, 0, gap
+        placements.append(Placement(i, x, shelf_y, w, h))
+        width = max(width, x + w)
+        shelf_h = max(shelf_h, h)
+        x += w + gap
+    flush()
+    return canvases
+
+
+def compose(canvas: Canvas, regions: Sequence[np.ndarray]) -> np.ndarray:
+    """Paint binarised ``regions`` onto a white canvas as dark text on light."""
+
+    page = np.full((canvas.height, canvas.width), 255, dtype=np.uint8)
+    for p in canvas.placements:
+        region = regions[p.index]
+        if region.mean() < 128:
+            region = 255 - region
+        page[p.y:p.y + p.h, p.x:p.x + p.w] = region
+    return page
+
+
+def assign_words(data: Dict[str, List[object]], canvas: Canvas) -> Dict[int, List[Dict[str, object]]]:
+    """Split engine output by placement; boxes become region-relative pixels."""
+
+    grouped: Dict[int, List[Dict[str, object]]] = {p.index: [] for p in canvas.placements}
+    for i, text in enumerate(data.get("text", [])):
+        if not str(text).strip():
+            continue
+        left, top = int(data["left"][i]), int(data["top"][i])
+        width, height = int(data["width"][i]), int(data["height"][i])
+        cx, cy = left + width / 2.0, top + height / 2.0
+        for p in canvas.placements:
+            if p.x <= cx < p.x + p.w and p.y <= cy < p.y + p.h:
+                # Clip to the region so a box never reaches into the gap.
+                x0, y0 = max(left, p.x), max(top, p.y)
+                x1, y1 = min(left + width, p.x + p.w), min(top + height, p.y + p.h)
+                grouped[p.index].append({
+                    "text": text,
+                    "conf": int(float(data["conf"][i])),
+                    "left": x0 - p.x,
+                    "top": y0 - p.y,
+                    "width": x1 - x0,
+                    "height": y1 - y0,
+                })
+                break
+    return grouped
@@ -0,0 +1,113 @@
+"""OCR engine backends: persistent tesseract API handles or the pytesseract CLI.
+
+``pytesseract.image_to_data`` writes the image to a temp file, spawns a
+``tesseract`` process and reloads the language model for every call; on
+small dirty-tile regions that overhead is most of the OCR time.
+
+``TesserocrEngine`` keeps one ``tesserocr.PyTessBaseAPI`` handle alive with
+its model loaded once. Each analysis shard is a single-process,
+single-threaded worker that builds its own detector, so one handle per
+worker is all it can ever use: calls never overlap and need no lending or
+wait queue.
+
+Every engine returns the ``pytesseract.Output.DICT`` layout (parallel
+``text`` / ``conf`` / ``left`` / ``top`` / ``width`` / ``height`` lists), so
+callers do not care which backend produced it.
+
+Settings: ``OCR_ENGINE`` (``auto`` | ``tesserocr`` | ``subprocess``) and
+``OCR_LANG``.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+from typing import Dict, List
+
+import numpy as np
+
+
+logger = logging.getLogger("visual_ocr.engine")
+
+
+OCR_ENGINE = os.getenv("OCR_ENGINE", "auto")
+OCR_LANG = os.getenv("OCR_LANG", "eng")
+
+OCRData = Dict[str, List[object]]
+
+
+class SubprocessEngine:
+    """One ``tesseract`` process per call via pytesseract (the original path)."""
+
+    name = "subprocess"
+
+    def __init__(self, lang: str = OCR_LANG) -> None:
+        self.lang = lang
+
+    def image_to_data(self, image: np.ndarray, psm: int = 6) -> OCRData:
+        import pytesseract
+
+        return pytesseract.image_to_data(
+            image,
+            lang=self.lang,
+            output_type=pytesseract.Output.DICT,
+            config=f"--oem 3 --psm {psm}",
+        )
+
+    def close(self) -> None:
+        pass
+
+
+class TesserocrEngine:
+    """A single ``PyTessBaseAPI`` handle; not thread-safe, one per worker."""
+
+    name = "tesserocr"
+
+    def __init__(self, lang: str = OCR_LANG) -> None:
+        import tesserocr
+
+        self._tesserocr = tesserocr
+        self._api = tesserocr.PyTessBaseAPI(lang=lang)
+
+    def image_to_data(self, image: np.ndarray, psm: int = 6) -> OCRData:
+        tesserocr = self._tesserocr
+        api = self._api
+        image = np.ascontiguousarray(image)
+        height, width = image.shape[:2]
+        channels = 1 if image.ndim == 2 else image.shape[2]
+        api.SetPageSegMode(psm)
+        api.SetImageBytes(image.tobytes(), width, height, channels, width * channels)
+        api.Recognize()
+
+        data: OCRData = {"text": [], "conf": [], "left": [], "top": [], "width": [], "height": []}
+        level = tesserocr.RIL.WORD
+        iterator = api.GetIterator()
+        if iterator is not None:
+            for word in tesserocr.iterate_level(iterator, level):
+                box = word.BoundingBox(level)
+                if box is None:
+                    continue
+                x0, y0, x1, y1 = box
+                data["text"].append(word.GetUTF8Text(level) or "")
+                data["conf"].append(word.Confidence(level))
+                data["left"].append(x0)
+                data["top"].append(y0)
+                data["width"].append(x1 - x0)
+                data["height"].append(y1 - y0)
+        api.Clear()
+        return data
+
+    def close(self) -> None:
+        self._api.End()
+
+
+def build_engine(kind: str = OCR_ENGINE, lang: str = OCR_LANG):
+    """One persistent tesserocr engine for the calling worker, else the subprocess engine."""
+
+    if kind in ("auto", "tesserocr"):
+        try:
+            return TesserocrEngine(lang)
+        except Exception as exc:
+            log = logger.warning if kind == "tesserocr" else logger.info
+            log("tesserocr engine unavailable (%s); using the tesseract subprocess", exc)
+    return SubprocessEngine(lang)
@@ -0,0 +1,202 @@
+"""CPU-budgeted sampling of framebuffer snapshots across sessions.
+
+With many sessions connected, snapshots worth analysing arrive faster than
+the pool can OCR them, and a fixed per-session interval either wastes cores
+on idle desktops or starves the sessions that matter. ``SamplingScheduler``
+spreads a global budget of ``VISUAL_OCR_CPU_BUDGET`` CPU-seconds per second
+(default: one core per analysis worker) over the active sessions:
+
+- the budget divided by the measured cost of one analysis (an EWMA of the
+  CPU seconds workers report per analysis) gives the analyses per second
+  the detector can afford;
+- every active session is first guaranteed ``VISUAL_OCR_MIN_RATE`` samples
+  per second, even when that alone exceeds the budget;
+- the remainder is shared in proportion to a weight that grows with the
+  session's risk score and frame churn (share of the screen repainted since
+  its last sample), capped at ``VISUAL_OCR_MAX_RATE`` per session.
+
+Rates are recomputed at most once a second. A session that has not offered
+a frame for ``VISUAL_OCR_SESSION_IDLE`` seconds stops counting as active.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, Optional, Tuple
+
+
+OCR_CPU_BUDGET = float(os.getenv("VISUAL_OCR_CPU_BUDGET", str(min(4, os.cpu_count() or 1))))
+OCR_MIN_RATE = float(os.getenv("VISUAL_OCR_MIN_RATE", "0.05"))
+OCR_MAX_RATE = float(os.getenv("VISUAL_OCR_MAX_RATE", "2.0"))
+OCR_RISK_WEIGHT = float(os.getenv("VISUAL_OCR_RISK_WEIGHT", "4.0"))
+OCR_CHURN_WEIGHT = float(os.getenv("VISUAL_OCR_CHURN_WEIGHT", "2.0"))
+OCR_SESSION_IDLE = float(os.getenv("VISUAL_OCR_SESSION_IDLE", "60.0"))
+OCR_COST_ESTIMATE = float(os.getenv("VISUAL_OCR_COST_ESTIMATE", "0.5"))
+
+_REALLOCATE_EVERY = 1.0
+_COST_ALPHA = 0.1
+_USAGE_WINDOW = 10.0
+
+
+class _SessionSampling:
+    __slots__ = ("risk", "churn", "rate", "last_seen", "last_sample", "samples", "skipped")
+
+    def __init__(self, rate: float) -> None:
+        self.risk = 0
+        self.churn = 0.0
+        self.rate = rate
+        self.last_seen = 0.0
+        self.last_sample = float("-inf")
+        self.samples = 0
+        self.skipped = 0
+
+
+class SamplingScheduler:
+    """Per-session sampling rates that fit a global CPU-seconds budget."""
+
+    def __init__(
+        self,
+        budget: float = OCR_CPU_BUDGET,
+        min_rate: float = OCR_MIN_RATE,
+        max_rate: float = OCR_MAX_RATE,
+        risk_weight: float = OCR_RISK_WEIGHT,
+        churn_weight: float = OCR_CHURN_WEIGHT,
+        idle_after: float = OCR_SESSION_IDLE,
+        cost_estimate: float = OCR_COST_ESTIMATE,
+        risk_of: Optional[Callable[[str], int]] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.budget = max(0.01, budget)
+        self.min_rate = max(0.0, min_rate)
+        self.max_rate = max(self.min_rate, max_rate)
+        self.risk_weight = risk_weight
+        self.churn_weight = churn_weight
+        self.idle_after = idle_after
+        self.cost = max(1e-3, cost_estimate)
+        self._risk_of = risk_of
+        self._clock = clock
+        self._sessions: Dict[str, _SessionSampling] = {}
+        self._allocated_at = float("-inf")
+        # (finished_at, cpu_seconds) of recent analyses
+        self._usage: Deque[Tuple[float, float]] = deque()
+        self.stats: Dict[str, int] = {"admitted": 0, "skipped": 0}
+        # Framebuffer chunks are decoded (and admitted) on a worker thread.
+        self._lock = threading.Lock()
+
+    def admit(self, session_id: str, churn: float = 1.0, risk: Optional[int] = None) -> bool:
+        """Whether ``session_id``'s frame should be analysed now.
+
+        ``churn`` is the share of the screen repainted since the session's
+        last sample; ``risk`` defaults to ``risk_of(session_id)``.
+        """
+
+        with self._lock:
+            now = self._clock()
+            state = self._sessions.get(session_id)
+            if state is None:
+                state = self._sessions[session_id] = _SessionSampling(self.min_rate)
+                self._allocated_at = float("-inf")
+            if risk is None:
+                risk = self._risk_of(session_id) if self._risk_of is not None else 0
+            state.risk = risk
+            state.churn = min(1.0, max(0.0, churn))
+            state.last_seen = now
+            if now - self._allocated_at >= _REALLOCATE_EVERY:
+                self._reallocate(now)
+
+            if state.rate > 0 and now - state.last_sample >= 1.0 / state.rate:
+                state.last_sample = now
+                state.samples += 1
+                self.stats["admitted"] += 1
+                return True
+            state.skipped += 1
+            self.stats["skipped"] += 1
+            return False
+
+    def record_cost(self, session_id: str, seconds: float) -> None:
+        """Feed back the CPU time one admitted analysis took."""
+
+        with self._lock:
+            now = self._clock()
+            seconds = max(0.0, seconds)
+            self.cost += _COST_ALPHA * (max(1e-3, seconds) - self.cost)
+            self._usage.append((now, seconds))
+            self._trim_usage(now)
+
+    def _trim_usage(self, now: float) -> None:
+        while self._usage and now - self._usage[0][0] > _USAGE_WINDOW:
+            self._usage.popleft()
+
+    def _weight(self, state: _SessionSampling) -> float:
+        return 1.0 + self.risk_weight * state.risk / 100.0 + self.churn_weight * state.churn
+
+    def _reallocate(self, now: float) -> None:
+        self._allocated_at = now
+        for session_id in [s for s, st in self._sessions.items() if now - st.last_seen > self.idle_after]:
+            del self._sessions[session_id]
+        if not self._sessions:
+            return
+
+        capacity = self.budget / self.cost
+        sessions = list(self._sessions.values())
+        for state in sessions:
+            state.rate = self.min_rate
+        spare = capacity - self.min_rate * len(sessions)
+        # Water-fill the spare capacity by weight; sessions that hit the cap
+        # hand their excess back to the others.
+        open_sessions = [s for s in sessions if s.rate < self.max_rate]
+        while spare > 1e-9 and open_sessions:
+            total_weight = sum(self._weight(s) for s in open_sessions)
+            handed_out = 0.0
+            still_open = []
+            for state in open_sessions:
+                extra = spare * self._weight(state) / total_weight
+                room = self.max_rate - state.rate
+                if extra >= room:
+                    state.rate = self.max_rate
+                    handed_out += room
+                else:
+                    state.rate += extra
+                    handed_out += extra
+                    still_open.append(state)
+            spare -= handed_out
+            if len(still_open) == len(open_sessions):
+                break
+            open_sessions = still_open
+
+    def forget(self, session_id: str) -> None:
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def rate(self, session_id: str) -> float:
+        with self._lock:
+            state = self._sessions.get(session_id)
+            return state.rate if state is not None else 0.0
+
+    def status(self) -> Dict[str, object]:
+        with self._lock:
+            now = self._clock()
+            self._trim_usage(now)
+            used = sum(seconds for _, seconds in self._usage)
+            planned = sum(state.rate for state in self._sessions.values()) * self.cost
+            return {
+                "cpu_budget": self.budget,
+                "cost_per_analysis_s": self.cost,
+                "utilization": used / (self.budget * _USAGE_WINDOW),
+                "planned_utilization": planned / self.budget,
+                "active_sessions": len(self._sessions),
+                **self.stats,
+                "sessions": {
+                    session_id: {
+                        "rate_hz": round(state.rate, 4),
+                        "risk": state.risk,
+                        "churn": round(state.churn, 3),
+                        "samples": state.samples,
+                        "skipped": state.skipped,
+                    }
+                    for session_id, state in self._sessions.items()
+                },
+            }
@@ -1,15 +1,33 @@
+import contextlib
+import functools
 import os
 import time
 import logging
 from datetime import datetime
-from typing import Dict, List, Tuple
-from collections import Counter
+from typing import Dict, List, Optional, Sequence, Tuple
+from collections import OrderedDict
 
 import cv2
 import numpy as np
-import pytesseract
-import re
-import math
+
+try:
+    import steganalysis
+    from container_scan import container_confidence, scan_container
+    from sensitive_matcher import DEFAULT_KEYWORDS, DEFAULT_PATTERNS, SensitiveMatcher, build_default_matcher
+    from text_prefilter import TextPrefilter
+    from ocr_preprocess import PreprocessPlan, apply_plan, plan_preprocessing
+    from ocr_engine import build_engine
+    from ocr_batch import OCR_BATCH_PSM, OCR_BATCH_REGION_PIXELS, assign_words, compose, pack_regions
+    from decoded_image import ImageInput, decoded_input, image_source, is_image_source
+except ImportError:
+    from . import steganalysis
+    from .container_scan import container_confidence, scan_container
+    from .sensitive_matcher import DEFAULT_KEYWORDS, DEFAULT_PATTERNS, SensitiveMatcher, build_default_matcher
+    from .text_prefilter import TextPrefilter
+    from .ocr_preprocess import PreprocessPlan, apply_plan, plan_preprocessing
+    from .ocr_engine import build_engine
+    from .ocr_batch import OCR_BATCH_PSM, OCR_BATCH_REGION_PIXELS, assign_words, compose, pack_regions
+    from .decoded_image import ImageInput, decoded_input, image_source, is_image_source
 
 
 # Lightweight configuration via environment variables
@@ -17,98 +35,367 @@ OCR_MIN_CONF = float(os.getenv("OCR_MIN_CONF", "0.5"))
 STEGO_ENTROPY_THRESH = float(os.getenv("STEGO_ENTROPY_THRESH", "7.5"))
 STEGO_LSB_MIN = float(os.getenv("STEGO_LSB_MIN", "0.45"))
 STEGO_LSB_MAX = float(os.getenv("STEGO_LSB_MAX", "0.55"))
+STEGO_CHI2_P = float(os.getenv("STEGO_CHI2_P", "0.95"))
+STEGO_SPA_RATE = float(os.getenv("STEGO_SPA_RATE", "0.2"))
+
+# Reduced-resolution pre-screens (1/N decode, see DecodedImage.reduced_gray).
+# OCR runs only when the text prefilter finds word blobs at 1/OCR_PRESCREEN_FACTOR;
+# pixel steganalysis runs only when the grayscale entropy at
+# 1/STEGO_PRESCREEN_FACTOR reaches STEGO_PRESCREEN_ENTROPY. A factor of 0 or 1
+# disables the pre-screen. The stego pre-screen is opt-in: area downscaling
+# averages away the LSB plane it would have to see, and it missed embedded
+# frames in bench_prescreen.py (recall 0.71 at factor 4, entropy 1.0).
+OCR_PRESCREEN_FACTOR = int(os.getenv("OCR_PRESCREEN_FACTOR", "2"))
+STEGO_PRESCREEN_FACTOR = int(os.getenv("STEGO_PRESCREEN_FACTOR", "0"))
+STEGO_PRESCREEN_ENTROPY = float(os.getenv("STEGO_PRESCREEN_ENTROPY", "0.5"))
+
+# Incremental OCR: frames are compared with the session's previous frame in
+# OCR_TILE_SIZE squares (through per-tile signatures); tiles with a pixel
+# that changed by more than OCR_TILE_DIFF_THRESH are re-OCRed. Past OCR_DIRTY_MAX_FRACTION of changed
+# tiles a single full-frame pass is cheaper than many region passes.
+OCR_TILE_SIZE = int(os.getenv("OCR_TILE_SIZE", "64"))
+OCR_TILE_DIFF_THRESH = int(os.getenv("OCR_TILE_DIFF_THRESH", "24"))
+OCR_DIRTY_MAX_FRACTION = float(os.getenv("OCR_DIRTY_MAX_FRACTION", "0.5"))
+OCR_TRACKED_SESSIONS = int(os.getenv("OCR_TRACKED_SESSIONS", "256"))
+
+
+@functools.lru_cache(maxsize=4)
+def _tile_weights(tile: int) -> np.ndarray:
+    return np.random.default_rng(0x5EED).integers(1, 2**63, size=(tile, 1, tile), dtype=np.uint64)
+
+
+def tile_signatures(gray: np.ndarray, tile: int, threshold: int) -> np.ndarray:
+    """(rows, cols) uint64 signature per tile, for ``dirty_tile_mask``.
+
+    Pixels are bucketed by ``threshold + 1`` before hashing, so a pixel that
+    changes by more than ``threshold`` always moves to another bucket and
+    changes its tile's signature (up to a 2**-64-ish collision). Smaller
+    changes alter it only when they cross a bucket edge. A session keeps
+    8 bytes per tile instead of its whole previous frame.
+    """
+
+    h, w = gray.shape
+    rows, cols = -(-h // tile), -(-w // tile)
+    padded = np.zeros((rows * tile, cols * tile), dtype=np.uint64)
+    padded[:h, :w] = gray // (threshold + 1)
+    weights = _tile_weights(tile)
+    signatures = np.empty((rows, cols), dtype=np.uint64)
+    with np.errstate(over="ignore"):
+        for r in range(rows):
+            band = padded[r * tile:(r + 1) * tile].reshape(tile, cols, tile)
+            signatures[r] = (band * weights).sum(axis=(0, 2), dtype=np.uint64)
+    return signatures
+
+
+def dirty_tile_mask(previous: np.ndarray, current: np.ndarray) -> np.ndarray:
+    """Boolean (rows, cols) grid of tiles whose signatures differ."""
+
+    return previous != current
+
+
+def dirty_boxes(mask: np.ndarray, tile: int, shape: Tuple[int, int], margin: int = 0) -> List[Tuple[int, int, int, int]]:
+    """Merge 8-connected dirty tiles into pixel boxes ``(x, y, w, h)`` clipped to ``shape``."""
+
+    h, w = shape
+    count, _, stats, _ = cv2.connectedComponentsWithStats(mask.astype(np.uint8), connectivity=8)
+    boxes = []
+    for label in range(1, count):
+        tx, ty, tw, th = stats[label, :4]
+        x0 = max(0, tx * tile - margin)
+        y0 = max(0, ty * tile - margin)
+        x1 = min(w, (tx + tw) * tile + margin)
+        y1 = min(h, (ty + th) * tile + margin)
+        boxes.append((int(x0), int(y0), int(x1 - x0), int(y1 - y0)))
+    return boxes
+
+
+def _overlaps(word: Dict[str, object], box: Tuple[int, int, int, int]) -> bool:
+    x, y, w, h = box
+    return (
+        word["left"] < x + w
+        and word["left"] + word["width"] > x
+        and word["top"] < y + h
+        and word["top"] + word["height"] > y
+    )
+
+
+def words_to_text(words: List[Dict[str, object]]) -> str:
+    """Join words in reading order (line by line, left to right)."""
+
+    if not words:
+        return ""
+    heights = sorted(int(wd["height"]) for wd in words)
+    line_height = max(8, heights[len(heights) // 2])
+    ordered = sorted(words, key=lambda wd: ((wd["top"] + wd["height"] // 2) // line_height, wd["left"]))
+    return " ".join(str(wd["text"]) for wd in ordered)
 
 
 class OCRDetector:
     """Detects sensitive text in screenshots using OCR with per-word confidence."""
 
-    SENSITIVE_KEYWORDS = [
-        "password",
-        "passwd",
-        "pwd",
-        "secret",
-        "api_key",
-        "apikey",
-        "api-key",
-        "private_key",
-        "private key",
-        "privatekey",
-        "access_token",
-        "auth_token",
-        "token",
-        "credentials",
-        "credential",
-        "confidential",
-        "sensitive",
-    ]
-
-    PATTERNS: Dict[str, str] = {
-        "credit_card": r"\b\d{4}[\s\-]?\d{4}[\s\-]?\d{4}[\s\-]?\d{4}\b",
-        "ssn": r"\b\d{3}-\d{2}-\d{4}\b",
-        "email": r"\b[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}\b",
-        "phone": r"\b\d{3}[-.\s]?\d{3}[-.\s]?\d{4}\b",
-        "ip_address": r"\b\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3}\b",
-    }
-
-    def __init__(self, min_confidence: float | None = None) -> None:
+    SENSITIVE_KEYWORDS = DEFAULT_KEYWORDS
+    PATTERNS: Dict[str, str] = DEFAULT_PATTERNS
+
+    def __init__(
+        self,
+        min_confidence: float | None = None,
+        tile_size: int | None = None,
+        tile_diff_threshold: int | None = None,
+        dirty_max_fraction: float | None = None,
+        tracked_sessions: int | None = None,
+        matcher: SensitiveMatcher | None = None,
+        prefilter: TextPrefilter | None = None,
+        engine=None,
+        prescreen_factor: int | None = None,
+    ) -> None:
+        # Persistent tesserocr handles when installed, else one tesseract
+        # process per call (see ocr_engine.py).
+        self.engine = engine if engine is not None else build_engine()
+        self.matcher = matcher if matcher is not None else build_default_matcher()
+        # Set OCR_PREFILTER_MIN_BLOBS=0 to send every region to tesseract.
+        self.prefilter = prefilter if prefilter is not None else TextPrefilter()
+        self.prescreen_factor = int(prescreen_factor) if prescreen_factor is not None else OCR_PRESCREEN_FACTOR
         self.min_confidence = float(min_confidence) if min_confidence is not None else OCR_MIN_CONF
+        self.tile_size = int(tile_size) if tile_size is not None else OCR_TILE_SIZE
+        self.tile_diff_threshold = int(tile_diff_threshold) if tile_diff_threshold is not None else OCR_TILE_DIFF_THRESH
+        self.dirty_max_fraction = float(dirty_max_fraction) if dirty_max_fraction is not None else OCR_DIRTY_MAX_FRACTION
+        self.tracked_sessions = int(tracked_sessions) if tracked_sessions is not None else OCR_TRACKED_SESSIONS
         self.logger = logging.getLogger("visual_ocr")
+        # session_id -> (previous frame's shape, its tile signatures, words recognised on it)
+        self._frames: "OrderedDict[str, Tuple[Tuple[int, int], np.ndarray, List[Dict[str, object]]]]" = OrderedDict()
+        self.stats: Dict[str, int] = {
+            "full_frames": 0,
+            "incremental_frames": 0,
+            "unchanged_frames": 0,
+            "frame_pixels": 0,
+            "ocr_pixels": 0,
+            "prefilter_passed": 0,
+            "prefilter_skipped": 0,
+            "prescreen_passed": 0,
+            "prescreen_skipped": 0,
+            "denoise_none": 0,
+            "denoise_median": 0,
+            "denoise_nlm": 0,
+            "batch_calls": 0,
+            "batch_regions": 0,
+        }
+
+    def load_gray(self, image: ImageInput) -> np.ndarray:
+        with decoded_input(image) as decoded:
+            return decoded.gray
+
+    def preprocess_gray(self, gray: np.ndarray, plan: PreprocessPlan | None = None) -> Tuple[np.ndarray, float]:
+        """Scale, denoise and binarise as ``plan`` says; returns (image, scale).
+
+        Without a plan one is chosen from the image itself (see
+        ``ocr_preprocess.plan_preprocessing``).
+        """
+
+        if plan is None:
+            plan = plan_preprocessing(gray)
+        return apply_plan(gray, plan)
+
+    def preprocess_image(self, image: ImageInput) -> np.ndarray:
+        return self.preprocess_gray(self.load_gray(image))[0]
+
+    def extract_words(
+        self,
+        processed_image: np.ndarray,
+        scale: float = 1.0,
+        offset: Tuple[int, int] = (0, 0),
+        psm: int = 6,
+    ) -> List[Dict[str, object]]:
+        """OCR ``processed_image`` into words with boxes in source-frame pixels."""
 
-    def preprocess_image(self, image_path: str) -> np.ndarray:
-        img = cv2.imread(image_path)
-        if img is None:
-            raise ValueError(f"Failed to load image: {image_path}")
-
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-        height, width = gray.shape
-        if width < 300:
-            scale = 300 / float(width)
-            new_width = 300
-            new_height = int(height * scale)
-            gray = cv2.resize(gray, (new_width, new_height))
-
-        denoised = cv2.fastNlMeansDenoising(gray, None, 10, 7, 21)
-        _, thresh = cv2.threshold(denoised, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-        return thresh
-
-    def extract_text_with_confidence(self, processed_image: np.ndarray) -> Tuple[str, float]:
         try:
-            data = pytesseract.image_to_data(
-                processed_image,
-                output_type=pytesseract.Output.DICT,
-                config="--oem 3 --psm 6",
-            )
-            words: List[str] = []
-            confidences: List[int] = []
-
-            for i, word in enumerate(data.get("text", [])):
-                if word.strip():
-                    words.append(word)
-                    conf = data.get("conf", [])[i]
-                    if conf != -1:
-                        confidences.append(int(conf))
-
-            full_text = " ".join(words)
-            if confidences:
-                avg_conf = sum(confidences) / float(len(confidences)) / 100.0
-            else:
-                avg_conf = 0.0
-            return full_text, avg_conf
+            data = self.engine.image_to_data(processed_image, psm)
         except Exception as exc:
             self.logger.error("OCR failed: %s", exc)
-            return "", 0.0
+            return []
+
+        ox, oy = offset
+        words: List[Dict[str, object]] = []
+        for i, word in enumerate(data.get("text", [])):
+            if not word.strip():
+                continue
+            words.append({
+                "text": word,
+                "conf": int(float(data["conf"][i])),
+                "left": ox + int(data["left"][i] / scale),
+                "top": oy + int(data["top"][i] / scale),
+                "width": max(1, int(data["width"][i] / scale)),
+                "height": max(1, int(data["height"][i] / scale)),
+            })
+        return words
+
+    def extract_text_with_confidence(self, processed_image: np.ndarray) -> Tuple[str, float]:
+        return self._summarise(self.extract_words(processed_image))
+
+    @staticmethod
+    def _summarise(words: List[Dict[str, object]]) -> Tuple[str, float]:
+        confidences = [int(w["conf"]) for w in words if w["conf"] != -1]
+        avg_conf = sum(confidences) / float(len(confidences)) / 100.0 if confidences else 0.0
+        return words_to_text(words), avg_conf
+
+    def _prepare_region(self, region: np.ndarray) -> Optional[Tuple[np.ndarray, float, PreprocessPlan]]:
+        """Prefilter and preprocess one region; ``None`` when it holds no text."""
+
+        if not self.prefilter.likely_text(region):
+            self.stats["prefilter_skipped"] += 1
+            return None
+        self.stats["prefilter_passed"] += 1
+        plan = plan_preprocessing(region)
+        self.stats[f"denoise_{plan.denoise}"] += 1
+        processed, scale = self.preprocess_gray(region, plan)
+        self.stats["ocr_pixels"] += region.shape[0] * region.shape[1]
+        return processed, scale, plan
+
+    def recognize_batch(
+        self,
+        regions: Sequence[Tuple[str, np.ndarray, Tuple[int, int]]],
+    ) -> List[List[Dict[str, object]]]:
+        """OCR many small ``(session_id, gray_region, (x, y))`` regions in as few engine calls as possible.
+
+        Text-bearing regions are preprocessed as usual, packed onto shared
+        canvases (see ``ocr_batch.py``) and read with one call per canvas;
+        regions over ``OCR_BATCH_REGION_PIXELS`` are read on their own.
+        Returns one word list per input region, in input order, with boxes in
+        the pixels of the frame the region was cut from (``(x, y)`` is its
+        offset there). Frame-diff state is not touched: callers batch regions
+        they already know to be new.
+        """
+
+        results: List[List[Dict[str, object]]] = [[] for _ in regions]
+        prepared: Dict[int, Tuple[np.ndarray, float, PreprocessPlan]] = {}
+        for i, (_, region, _) in enumerate(regions):
+            item = self._prepare_region(region)
+            if item is None:
+                continue
+            if region.size > OCR_BATCH_REGION_PIXELS:
+                processed, scale, plan = item
+                results[i] = self.extract_words(processed, scale, regions[i][2], psm=plan.psm)
+            else:
+                prepared[i] = item
+        if not prepared:
+            return results
+
+        indices = list(prepared)
+        images = [prepared[i][0] for i in indices]
+        for canvas in pack_regions([image.shape[:2] for image in images]):
+            if len(canvas.placements) == 1:
+                # Nothing to share the call with: keep the region's own PSM.
+                i = indices[canvas.placements[0].index]
+                processed, scale, plan = prepared[i]
+                results[i] = self.extract_words(processed, scale, regions[i][2], psm=plan.psm)
+                continue
+            page = compose(canvas, images)
+            self.stats["batch_calls"] += 1
+            self.stats["batch_regions"] += len(canvas.placements)
+            try:
+                data = self.engine.image_to_data(page, OCR_BATCH_PSM)
+            except Exception as exc:
+                self.logger.error("Batch OCR failed: %s", exc)
+                continue
+            for placement, words in assign_words(data, canvas).items():
+                i = indices[placement]
+                _, scale, _ = prepared[i]
+                ox, oy = regions[i][2]
+                results[i] = [
+                    {
+                        "text": w["text"],
+                        "conf": w["conf"],
+                        "left": ox + int(w["left"] / scale),
+                        "top": oy + int(w["top"] / scale),
+                        "width": max(1, int(w["width"] / scale)),
+                        "height": max(1, int(w["height"] / scale)),
+                    }
+                    for w in words
+                ]
+        return results
+
+    def recognize_frame(self, session_id: str, gray: np.ndarray) -> List[Dict[str, object]]:
+        """OCR one frame; see ``recognize_frames``."""
+
+        return self.recognize_frames([(session_id, gray)])[0]
+
+    def recognize_frames(self, frames: Sequence[Tuple[str, np.ndarray]]) -> List[List[Dict[str, object]]]:
+        """OCR ``(session_id, gray)`` frames, re-reading only the tiles that changed.
+
+        Words from unchanged tiles are carried over from the session's
+        previous frame, so OCR cost follows the changed screen area rather
+        than the resolution. The regions left to read, from every frame, go
+        through one ``recognize_batch``, so small dirty boxes and small
+        frames share engine calls. A second frame from the same session is
+        diffed against the first, in a later round.
+        """
+
+        results: List[List[Dict[str, object]]] = [[] for _ in frames]
+        pending = list(range(len(frames)))
+        while pending:
+            current: List[int] = []
+            later: List[int] = []
+            sessions = set()
+            for i in pending:
+                (later if frames[i][0] in sessions else current).append(i)
+                sessions.add(frames[i][0])
+            self._recognize_round(frames, current, results)
+            pending = later
+        return results
+
+    def _recognize_round(
+        self,
+        frames: Sequence[Tuple[str, np.ndarray]],
+        indices: Sequence[int],
+        results: List[List[Dict[str, object]]],
+    ) -> None:
+        regions: List[Tuple[str, np.ndarray, Tuple[int, int]]] = []
+        owners: List[int] = []
+        signatures_by: Dict[int, np.ndarray] = {}
+        for i in indices:
+            session_id, gray = frames[i]
+            frame_h, frame_w = gray.shape
+            self.stats["frame_pixels"] += frame_h * frame_w
+            previous = self._frames.get(session_id)
+            signatures_by[i] = tile_signatures(gray, self.tile_size, self.tile_diff_threshold)
+            boxes: Optional[List[Tuple[int, int, int, int]]] = None
+
+            if previous is not None and previous[0] == gray.shape:
+                _, prev_signatures, prev_words = previous
+                mask = dirty_tile_mask(prev_signatures, signatures_by[i])
+                dirty_fraction = float(mask.mean())
+                if dirty_fraction == 0.0:
+                    self.stats["unchanged_frames"] += 1
+                    results[i] = list(prev_words)
+                    boxes = []
+                elif dirty_fraction <= self.dirty_max_fraction:
+                    self.stats["incremental_frames"] += 1
+                    # Grow regions by half a tile so words straddling a tile
+                    # edge are read whole.
+                    boxes = dirty_boxes(mask, self.tile_size, gray.shape, margin=self.tile_size // 2)
+                    results[i] = [w for w in prev_words if not any(_overlaps(w, box) for box in boxes)]
+
+            if boxes is None:
+                self.stats["full_frames"] += 1
+                boxes = [(0, 0, frame_w, frame_h)]
+            for x, y, w, h in boxes:
+                regions.append((session_id, gray[y:y + h, x:x + w], (x, y)))
+                owners.append(i)
+
+        for i, words in zip(owners, self.recognize_batch(regions) if regions else []):
+            results[i].extend(words)
+
+        for i in indices:
+            session_id, gray = frames[i]
+            self._frames[session_id] = (gray.shape, signatures_by[i], results[i])
+            self._frames.move_to_end(session_id)
+        while len(self._frames) > self.tracked_sessions:
+            self._frames.popitem(last=False)
 
     def detect_keywords(self, text: str) -> List[str]:
-        text_lower = text.lower()
-        return [kw for kw in self.SENSITIVE_KEYWORDS if kw in text_lower]
+        return self.matcher.scan(text).keywords
 
     def detect_patterns(self, text: str) -> Dict[str, List[str]]:
-        results: Dict[str, List[str]] = {}
-        for name, pattern in self.PATTERNS.items():
-            matches = re.findall(pattern, text)
-            if matches:
-                results[name] = matches
-        return results
+        return self.matcher.scan(text).patterns
 
     def calculate_detection_confidence(
         self,
@@ -124,15 +411,63 @@ class OCRDetector:
         final_score = base_score * max(0.0, min(ocr_confidence, 1.0))
         return min(final_score, 1.0)
 
-    def process(self, session_id: str, image_path: str) -> Dict[str, object]:
+    def process(self, session_id: str, image: ImageInput) -> Dict[str, object]:
+        """OCR ``image``: a path, encoded bytes, a decoded array or a ``DecodedImage``."""
+
+        return self.process_many([(session_id, image)])[0]
+
+    def process_many(self, items: Sequence[Tuple[str, ImageInput]]) -> List[Dict[str, object]]:
+        """OCR ``(session_id, image)`` items, one result each, sharing engine calls.
+
+        Every image is decoded and pre-screened on its own; the frames left
+        are read with one ``recognize_frames`` call.
+        """
+
         start_time = time.time()
-        # Only attempt OCR on common image extensions
-        if not image_path.lower().endswith((".png", ".jpg", ".jpeg", ".bmp", ".tiff")):
-            return {"detected": False, "skipped": True, "reason": "not_image"}
+        results: List[Optional[Dict[str, object]]] = [None] * len(items)
+        frames: List[Tuple[str, np.ndarray]] = []
+        owners: List[Tuple[int, str]] = []
+        with contextlib.ExitStack() as stack:
+            for i, (session_id, image) in enumerate(items):
+                # Only attempt OCR on common image extensions
+                if not is_image_source(image):
+                    results[i] = {"detected": False, "skipped": True, "reason": "not_image"}
+                    continue
+                try:
+                    decoded = stack.enter_context(decoded_input(image))
+                    if self.prescreen_factor > 1 and self.prefilter.min_blobs > 0:
+                        if not self.prefilter.likely_text(decoded.reduced_gray(self.prescreen_factor)):
+                            self.stats["prescreen_skipped"] += 1
+                            results[i] = {"detected": False, "prescreened": True}
+                            continue
+                        self.stats["prescreen_passed"] += 1
+                    frames.append((session_id, decoded.gray))
+                    owners.append((i, decoded.source))
+                except Exception as exc:
+                    self.logger.error("OCR processing failed: %s", exc)
+                    results[i] = {"detected": False, "error": str(exc)}
+            try:
+                recognized = self.recognize_frames(frames)
+            except Exception as exc:
+                self.logger.error("OCR processing failed: %s", exc)
+                recognized = [exc] * len(frames)
+
+        for (i, image_path), words in zip(owners, recognized):
+            if isinstance(words, Exception):
+                results[i] = {"detected": False, "error": str(words)}
+            else:
+                results[i] = self._verdict(items[i][0], image_path, words, start_time)
+        return results
 
+    def _verdict(
+        self,
+        session_id: str,
+        image_path: str,
+        words: List[Dict[str, object]],
+        start_time: float,
+    ) -> Dict[str, object]:
         try:
-            processed = self.preprocess_image(image_path)
-            text, ocr_conf = self.extract_text_with_confidence(processed)
+            text, ocr_conf = self._summarise(words)
             duration = time.time() - start_time
 
             if not text.strip():
@@ -143,8 +478,7 @@ class OCRDetector:
                 self.logger.debug("OCR confidence too low: %.2f", ocr_conf)
                 return {"detected": False, "low_confidence": True}
 
-            keywords = self.detect_keywords(text)
-            patterns = self.detect_patterns(text)
+            keywords, patterns = self.matcher.scan(text)
 
             if keywords or patterns:
                 confidence = self.calculate_detection_confidence(keywords, patterns, ocr_conf)
@@ -183,51 +517,85 @@ class StegoDetector:
         entropy_threshold: float | None = None,
         lsb_min: float | None = None,
         lsb_max: float | None = None,
+        chi2_p_threshold: float | None = None,
+        spa_rate_threshold: float | None = None,
+        prescreen_factor: int | None = None,
+        prescreen_entropy: float | None = None,
     ) -> None:
         self.entropy_threshold = float(entropy_threshold) if entropy_threshold is not None else STEGO_ENTROPY_THRESH
         self.lsb_min = float(lsb_min) if lsb_min is not None else STEGO_LSB_MIN
         self.lsb_max = float(lsb_max) if lsb_max is not None else STEGO_LSB_MAX
+        self.chi2_p_threshold = float(chi2_p_threshold) if chi2_p_threshold is not None else STEGO_CHI2_P
+        self.spa_rate_threshold = float(spa_rate_threshold) if spa_rate_threshold is not None else STEGO_SPA_RATE
+        self.prescreen_factor = int(prescreen_factor) if prescreen_factor is not None else STEGO_PRESCREEN_FACTOR
+        self.prescreen_entropy = float(prescreen_entropy) if prescreen_entropy is not None else STEGO_PRESCREEN_ENTROPY
         self.logger = logging.getLogger("visual_stego")
 
     def calculate_entropy(self, image: np.ndarray) -> float:
-        pixels = image.flatten()
-        counter = Counter(pixels)
-        total_pixels = float(len(pixels)) or 1.0
-        entropy = 0.0
-        for count in counter.values():
-            probability = count / total_pixels
-            if probability > 0.0:
-                entropy -= probability * math.log2(probability)
-        return entropy
-
-    def extract_lsb_plane(self, image: np.ndarray) -> np.ndarray:
-        return image & 1
-
-    def analyze_lsb_distribution(self, lsb_plane: np.ndarray) -> Tuple[float, bool]:
-        total_bits = float(lsb_plane.size) or 1.0
-        ones = float(np.sum(lsb_plane))
-        ratio_ones = ones / total_bits
-        is_suspicious = ratio_ones < self.lsb_min or ratio_ones > self.lsb_max
-        return ratio_ones, is_suspicious
-
-    def detect_stego(self, image_path: str) -> Dict[str, object]:
+        hist = np.bincount(image.ravel(), minlength=256)
+        return float(steganalysis.entropy_from_hist(hist))
+
+    def detect_stego(self, image: ImageInput) -> Dict[str, object]:
         try:
-            img = cv2.imread(image_path, cv2.IMREAD_GRAYSCALE)
-            if img is None:
+            try:
+                opened = decoded_input(image)
+            except (OSError, ValueError):
                 return {"suspicious": False, "error": "Failed to load image"}
 
-            entropy = self.calculate_entropy(img)
+            with opened as decoded:
+                # Structural first stage: walks the encoded container for appended
+                # or hidden bytes in microseconds, and works even when the pixel
+                # data does not decode.
+                container = scan_container(decoded.raw)
+                container_suspicious = bool(container["suspicious"])
+                try:
+                    if self.prescreen_factor > 1 and not container_suspicious:
+                        reduced = decoded.reduced_gray(self.prescreen_factor)
+                        approx_entropy = self.calculate_entropy(reduced)
+                        if approx_entropy < self.prescreen_entropy:
+                            # Flat, low-entropy frame at reduced size: skip the
+                            # full-resolution pixel statistics.
+                            return {
+                                "suspicious": False,
+                                "prescreened": True,
+                                "prescreen_entropy": approx_entropy,
+                                "container": container,
+                                "container_suspicious": False,
+                                "confidence": 0.0,
+                            }
+                    img = decoded.gray if decoded.is_grayscale else decoded.bgr
+                except (OSError, ValueError):
+                    if container_suspicious:
+                        return {
+                            "suspicious": True,
+                            "container": container,
+                            "container_suspicious": True,
+                            "confidence": container_confidence(container),
+                            "error": "Failed to load image",
+                        }
+                    return {"suspicious": False, "error": "Failed to load image"}
+
+            stats = steganalysis.analyze(img)
+
+            entropy = stats["entropy"]
             entropy_suspicious = entropy > self.entropy_threshold
-
-            lsb_plane = self.extract_lsb_plane(img)
-            lsb_ratio, lsb_suspicious = self.analyze_lsb_distribution(lsb_plane)
-
-            is_suspicious = bool(entropy_suspicious or lsb_suspicious)
-            confidence = 0.0
+            lsb_ratio = stats["lsb_ratio"]
+            lsb_suspicious = lsb_ratio < self.lsb_min or lsb_ratio > self.lsb_max
+            spa_suspicious = stats["spa_rate"] > self.spa_rate_threshold
+            # Smooth gradients also have balanced value pairs, so the
+            # chi-square test only corroborates an SPA estimate.
+            chi2_suspicious = spa_suspicious and stats["chi2_p"] > self.chi2_p_threshold
+
+            is_suspicious = bool(entropy_suspicious or lsb_suspicious or spa_suspicious or container_suspicious)
+            confidence = container_confidence(container) if container_suspicious else 0.0
             if entropy_suspicious:
                 confidence += 0.5
             if lsb_suspicious:
                 confidence += 0.3
+            if spa_suspicious:
+                confidence += 0.4
+            if chi2_suspicious:
+                confidence += 0.2
 
             return {
                 "suspicious": is_suspicious,
@@ -235,33 +603,43 @@ class StegoDetector:
                 "entropy_suspicious": entropy_suspicious,
                 "lsb_ratio": lsb_ratio,
                 "lsb_suspicious": lsb_suspicious,
+                "chi2_p": stats["chi2_p"],
+                "chi2_suspicious": chi2_suspicious,
+                "spa_rate": stats["spa_rate"],
+                "spa_suspicious": spa_suspicious,
+                "container": container,
+                "container_suspicious": container_suspicious,
+                "channels": stats["channels"],
+                "blocks": stats["blocks"],
                 "confidence": min(confidence, 1.0),
             }
         except Exception as exc:
             self.logger.error("Stego detection failed: %s", exc)
             return {"suspicious": False, "error": str(exc)}
 
-    def process(self, session_id: str, image_path: str) -> Dict[str, object]:
+    def process(self, session_id: str, image: ImageInput) -> Dict[str, object]:
         start_time = time.time()
-        if not image_path.lower().endswith((".png", ".jpg", ".jpeg", ".bmp", ".tiff")):
+        if not is_image_source(image):
             return {"suspicious": False, "skipped": True, "reason": "not_image"}
 
-        result = self.detect_stego(image_path)
+        result = self.detect_stego(image)
         duration = time.time() - start_time
 
         if result.get("suspicious"):
             self.logger.info(
-                "Stego detection: conf=%.2f entropy=%.2f lsb=%.2f time=%.3fs",
+                "Stego detection: conf=%.2f entropy=%.2f lsb=%.2f chi2_p=%.2f spa=%.2f time=%.3fs",
                 result.get("confidence", 0.0),
                 result.get("entropy", 0.0),
                 result.get("lsb_ratio", 0.0),
+                result.get("chi2_p", 0.0),
+                result.get("spa_rate", 0.0),
                 duration,
             )
         else:
             self.logger.debug("No stego detected, time=%.3fs", duration)
 
         result.update({
-            "image_path": image_path,
+            "image_path": image_source(image),
             "session_id": session_id,
             "processing_time": duration,
         })
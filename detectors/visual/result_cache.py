@@ -0,0 +1,208 @@
+"""Content-addressed cache of OCR/stego verdicts, in memory and on disk.
+
+Artifacts are keyed by the SHA-256 of their bytes (the same digest the
+forensics collector records), so a re-sent frame, a re-analysis after a
+restart or a forensics re-check of the same file costs one hash instead of
+a trip through the analysis pool.
+
+Two tiers:
+
+- an in-process LRU of the most recent ``max_entries`` verdicts;
+- a SQLite table that survives restarts (``VISUAL_RESULT_CACHE_DB``; set it
+  to an empty string to keep the cache in memory only).
+
+Every entry is stored under an *analysis fingerprint*: a hash of the
+``OCR_*`` / ``STEGO_*`` settings, the OCR pattern file and the source of the
+analysis modules. Changing a threshold such as ``OCR_MIN_CONF`` or editing
+the detectors yields a new fingerprint; rows written under any other
+fingerprint are dropped when the cache is opened.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+_project_root = Path(__file__).resolve().parents[2]
+if str(_project_root) not in sys.path:
+    sys.path.insert(0, str(_project_root))
+
+from forensics.utils.hashing import compute_sha256  # noqa: E402
+
+
+logger = logging.getLogger("visual_detector.result_cache")
+
+
+_DEFAULT_DB = Path(__file__).resolve().parent / "data" / "analysis_cache.sqlite3"
+RESULT_CACHE_DB = os.getenv("VISUAL_RESULT_CACHE_DB", str(_DEFAULT_DB))
+RESULT_CACHE_SIZE = int(os.getenv("VISUAL_RESULT_CACHE_SIZE", "2048"))
+RESULT_CACHE_DISK_MAX = int(os.getenv("VISUAL_RESULT_CACHE_DISK_MAX", "200000"))
+
+# Modules whose code determines a verdict; editing any of them invalidates
+# cached results.
+_ANALYSIS_MODULES = (
+    "ocr_stego.py",
+    "ocr_preprocess.py",
+    "ocr_engine.py",
+    "ocr_batch.py",
+    "decoded_image.py",
+    "frame_cache.py",
+    "steganalysis.py",
+    "container_scan.py",
+    "sensitive_matcher.py",
+    "text_prefilter.py",
+)
+_CONFIG_PREFIXES = ("OCR_", "STEGO_")
+_PRUNE_EVERY = 256
+
+
+def analysis_fingerprint() -> str:
+    h = hashlib.sha256()
+    config = {k: v for k, v in os.environ.items() if k.startswith(_CONFIG_PREFIXES)}
+    h.update(json.dumps(config, sort_keys=True).encode("utf-8"))
+    patterns_file = os.getenv("OCR_PATTERNS_FILE")
+    if patterns_file and os.path.exists(patterns_file):
+        h.update(compute_sha256(patterns_file).encode("ascii"))
+    here = Path(__file__).resolve().parent
+    for name in _ANALYSIS_MODULES:
+        path = here / name
+        if path.exists():
+            h.update(name.encode("utf-8"))
+            h.update(compute_sha256(path).encode("ascii"))
+    return h.hexdigest()[:32]
+
+
+class ResultCache:
+    """Two-tier (LRU + SQLite) verdict cache keyed by artifact SHA-256."""
+
+    def __init__(
+        self,
+        db_path: Optional[str] = RESULT_CACHE_DB,
+        max_entries: int = RESULT_CACHE_SIZE,
+        max_disk_entries: int = RESULT_CACHE_DISK_MAX,
+        fingerprint: Optional[str] = None,
+    ) -> None:
+        self.max_entries = max(1, max_entries)
+        self.max_disk_entries = max_disk_entries
+        self.fingerprint = fingerprint or analysis_fingerprint()
+        self._memory: "OrderedDict[str, Dict[str, object]]" = OrderedDict()
+        # Lookups run on executor threads; one lock covers both tiers.
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self._puts = 0
+        self.stats: Dict[str, int] = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stored": 0, "invalidated": 0}
+        if db_path:
+            self._open(db_path)
+
+    def _open(self, db_path: str) -> None:
+        try:
+            Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+            db = sqlite3.connect(db_path, check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                " digest TEXT NOT NULL,"
+                " fingerprint TEXT NOT NULL,"
+                " result TEXT NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " PRIMARY KEY (digest, fingerprint))"
+            )
+            db.execute("CREATE INDEX IF NOT EXISTS results_created ON results (created_at)")
+            cur = db.execute("DELETE FROM results WHERE fingerprint != ?", (self.fingerprint,))
+            self.stats["invalidated"] = cur.rowcount
+            db.commit()
+        except sqlite3.Error as exc:
+            logger.warning("Visual result cache at %s unavailable, memory only: %s", db_path, exc)
+            return
+        self._db = db
+        if self.stats["invalidated"]:
+            logger.info("Dropped %d cached verdicts from an older analysis config", self.stats["invalidated"])
+
+    def digest(self, image_path: str) -> str:
+        return compute_sha256(image_path)
+
+    def get(self, digest: str) -> Optional[Tuple[Dict[str, object], str]]:
+        """Return ``(verdict, tier)`` for ``digest``, or ``None``."""
+
+        with self._lock:
+            verdict = self._memory.get(digest)
+            if verdict is not None:
+                self._memory.move_to_end(digest)
+                self.stats["memory_hits"] += 1
+                return verdict, "memory"
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT result FROM results WHERE digest = ? AND fingerprint = ?",
+                    (digest, self.fingerprint),
+                ).fetchone()
+                if row is not None:
+                    verdict = json.loads(row[0])
+                    self._remember(digest, verdict)
+                    self.stats["disk_hits"] += 1
+                    return verdict, "disk"
+            self.stats["misses"] += 1
+            return None
+
+    def put(self, digest: str, verdict: Dict[str, object]) -> None:
+        with self._lock:
+            self._remember(digest, verdict)
+            self.stats["stored"] += 1
+            if self._db is None:
+                return
+            try:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO results (digest, fingerprint, result, created_at) VALUES (?, ?, ?, ?)",
+                    (digest, self.fingerprint, json.dumps(verdict, default=str), time.time()),
+                )
+                self._puts += 1
+                if self._puts % _PRUNE_EVERY == 0:
+                    self._prune()
+                self._db.commit()
+            except sqlite3.Error as exc:
+                logger.warning("Failed to persist visual verdict: %s", exc)
+
+    def lookup_file(self, image_path: str) -> Tuple[str, Optional[Tuple[Dict[str, object], str]]]:
+        """Hash ``image_path`` and look it up; blocking, run it off the event loop."""
+
+        digest = self.digest(image_path)
+        return digest, self.get(digest)
+
+    def _remember(self, digest: str, verdict: Dict[str, object]) -> None:
+        self._memory[digest] = verdict
+        self._memory.move_to_end(digest)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _prune(self) -> None:
+        self._db.execute(
+            "DELETE FROM results WHERE rowid IN ("
+            " SELECT rowid FROM results ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_disk_entries,),
+        )
+
+    def close(self) -> None:
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def status(self) -> Dict[str, object]:
+        lookups = self.stats["memory_hits"] + self.stats["disk_hits"] + self.stats["misses"]
+        hits = self.stats["memory_hits"] + self.stats["disk_hits"]
+        return {
+            "fingerprint": self.fingerprint,
+            "persistent": self._db is not None,
+            "memory_entries": len(self._memory),
+            **self.stats,
+            "hit_rate": hits / lookups if lookups else 0.0,
+        }
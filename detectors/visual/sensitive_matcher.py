@@ -0,0 +1,239 @@
+"""Single-pass matcher for sensitive keywords and PII in OCR text.
+
+Every keyword and every PII pattern is compiled into one zero-width
+regular expression::
+
+    (?=p0|p1|...|keywords)(?=(?P<p0>p0)?)(?=(?P<p1>p1)?)...(?=(?P<kw>keywords)?)
+
+The first lookahead finds the positions where *something* starts; at those
+positions the named groups capture every pattern that matches there, all
+inside the C regex engine, so one ``finditer`` over the text reports which
+patterns fired. Because the lookaheads consume nothing, overlapping hits
+such as ``access_token`` and the ``token`` inside it, or ``password`` and
+the e-mail address starting with it, are all seen. Patterns are embedded in
+that one expression, so they must not use numbered backreferences.
+
+The single pass only pays off for long keyword lists: with the default
+17 keywords a substring check per keyword plus one ``finditer`` per pattern
+is faster, so that per-pattern scan is used until the list reaches
+``OCR_SINGLE_PASS_KEYWORDS`` entries. Both report the same hits.
+
+Keywords are folded into a trie-shaped alternation (``pass(?:wd|word)``)
+rather than a flat ``a|b|c`` list, so adding keywords adds branches where
+they diverge instead of another full alternative tried at every position;
+scan time stays roughly flat as the keyword list grows.
+
+Candidates that merely look right are validated before being reported:
+card numbers must pass the Luhn checksum and IPv4 octets must be <= 255.
+
+Extra keywords and patterns can be loaded from a JSON file named by
+``OCR_PATTERNS_FILE``::
+
+    {"keywords": ["vault token"], "patterns": {"aws_key_id": "\\\\bAKIA[0-9A-Z]{16}\\\\b"}}
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import re
+from typing import Callable, Dict, Iterable, List, Mapping, NamedTuple, Tuple
+
+
+logger = logging.getLogger("visual_ocr.sensitive_matcher")
+
+OCR_SINGLE_PASS_KEYWORDS = int(os.getenv("OCR_SINGLE_PASS_KEYWORDS", "500"))
+
+
+DEFAULT_KEYWORDS: List[str] = [
+    "password",
+    "passwd",
+    "pwd",
+    "secret",
+    "api_key",
+    "apikey",
+    "api-key",
+    "private_key",
+    "private key",
+    "privatekey",
+    "access_token",
+    "auth_token",
+    "token",
+    "credentials",
+    "credential",
+    "confidential",
+    "sensitive",
+]
+
+DEFAULT_PATTERNS: Dict[str, str] = {
+    "credit_card": r"\b\d{4}[\s\-]?\d{4}[\s\-]?\d{4}[\s\-]?\d{4}\b",
+    "ssn": r"\b\d{3}-\d{2}-\d{4}\b",
+    "email": r"\b[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}\b",
+    "phone": r"\b\d{3}[-.\s]?\d{3}[-.\s]?\d{4}\b",
+    "ip_address": r"\b\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3}\b",
+}
+
+
+def luhn_valid(candidate: str) -> bool:
+    digits = [int(ch) for ch in candidate if ch.isdigit()]
+    if len(digits) < 13:
+        return False
+    total = 0
+    for i, digit in enumerate(reversed(digits)):
+        if i % 2:
+            digit *= 2
+            if digit > 9:
+                digit -= 9
+        total += digit
+    return total % 10 == 0
+
+
+def ipv4_valid(candidate: str) -> bool:
+    octets = candidate.split(".")
+    return len(octets) == 4 and all(o.isdigit() and int(o) <= 255 for o in octets)
+
+
+VALIDATORS: Dict[str, Callable[[str], bool]] = {
+    "credit_card": luhn_valid,
+    "ip_address": ipv4_valid,
+}
+
+
+def trie_regex(words: Iterable[str]) -> str:
+    """Regex source matching any of ``words``, longest alternative first."""
+
+    root: Dict[str, dict] = {}
+    for word in words:
+        node = root
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def emit(node: Dict[str, dict]) -> str:
+        branches = [re.escape(ch) + emit(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ""
+        if len(branches) == 1 and "" not in node:
+            return branches[0]
+        body = "(?:" + "|".join(branches) + ")"
+        # Greedy optional: a word that is a prefix of another ("credential"
+        # / "credentials") yields the longer one when both fit.
+        return body + "?" if "" in node else body
+
+    return emit(root)
+
+
+class ScanResult(NamedTuple):
+    keywords: List[str]
+    patterns: Dict[str, List[str]]
+
+
+class SensitiveMatcher:
+    """Compiled keyword + PII scanner; immutable and safe to share."""
+
+    def __init__(
+        self,
+        keywords: Iterable[str] = DEFAULT_KEYWORDS,
+        patterns: Mapping[str, str] = DEFAULT_PATTERNS,
+        validators: Mapping[str, Callable[[str], bool]] = VALIDATORS,
+        single_pass_keywords: int = OCR_SINGLE_PASS_KEYWORDS,
+    ) -> None:
+        self.keywords: List[str] = list(dict.fromkeys(kw.lower() for kw in keywords if kw))
+        self.patterns: Dict[str, str] = dict(patterns)
+        self.validators = dict(validators)
+        self._keyword_rank = {kw: i for i, kw in enumerate(self.keywords)}
+        # A keyword hit also reports every keyword it contains, matching the
+        # old ``kw in text`` semantics for nested keywords.
+        self._implied = {kw: [other for other in self.keywords if other in kw] for kw in self.keywords}
+
+        self.single_pass = len(self.keywords) >= single_pass_keywords
+        self._compiled = [(name, re.compile(source)) for name, source in self.patterns.items()]
+
+        keyword_source = trie_regex(self.keywords) if self.keywords else None
+        # Keywords are case-insensitive; PII patterns keep their own rules.
+        sources = [f"(?:{source})" for source in self.patterns.values()]
+        if keyword_source:
+            sources.append(f"(?i:{keyword_source})")
+        # Group names are generated: pattern names need not be identifiers.
+        self._groups: List[Tuple[str, str]] = [(f"p{i}", name) for i, name in enumerate(self.patterns)]
+        captures = [f"(?=(?P<{group}>{source})?)" for (group, _), source in zip(self._groups, sources)]
+        if keyword_source:
+            captures.append(f"(?=(?P<kw>{sources[-1]})?)")
+        self._group_names = [group for group, _ in self._groups] + (["kw"] if keyword_source else [])
+        self._regex = re.compile("(?=" + "|".join(sources) + ")" + "".join(captures)) if sources else None
+
+    @property
+    def pattern_count(self) -> int:
+        return len(self.keywords) + len(self.patterns)
+
+    def _add_keywords(self, found: set, matched: str) -> None:
+        found.update(self._implied.get(matched.lower(), ()))
+
+    def scan(self, text: str) -> ScanResult:
+        if not self.single_pass:
+            return self._scan_per_pattern(text)
+        found: set = set()
+        hits: Dict[str, List[str]] = {}
+        if self._regex is None or not text:
+            return ScanResult([], hits)
+
+        names = self._group_names
+        patterns = self._groups
+        with_keywords = names[-1:] == ["kw"]
+        # Per-pattern end of the last accepted hit, so each pattern reports
+        # non-overlapping matches like ``re.findall`` did.
+        last_end: Dict[str, int] = {}
+        for m in self._regex.finditer(text):
+            pos = m.start()
+            values = m.group(*names) if len(names) > 1 else (m.group(names[0]),)
+            for (_, name), value in zip(patterns, values):
+                if not value or pos < last_end.get(name, 0):
+                    continue
+                validator = self.validators.get(name)
+                if validator is None or validator(value):
+                    hits.setdefault(name, []).append(value)
+                    last_end[name] = pos + len(value)
+            if with_keywords and values[-1]:
+                self._add_keywords(found, values[-1])
+
+        keywords = sorted(found, key=self._keyword_rank.__getitem__)
+        return ScanResult(keywords, {name: hits[name] for name in self.patterns if name in hits})
+
+    def _scan_per_pattern(self, text: str) -> ScanResult:
+        lowered = text.lower()
+        keywords = [kw for kw in self.keywords if kw in lowered]
+        hits: Dict[str, List[str]] = {}
+        for name, regex in self._compiled:
+            validator = self.validators.get(name)
+            values = [m.group(0) for m in regex.finditer(text) if m.group(0)]
+            values = [v for v in values if validator(v)] if validator is not None else values
+            if values:
+                hits[name] = values
+        return ScanResult(keywords, hits)
+
+
+def _load_extra_patterns(path: str) -> Tuple[List[str], Dict[str, str]]:
+    """Load ``{"keywords": [...], "patterns": {"name": "regex"}}`` from JSON."""
+
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    keywords = [str(kw) for kw in data.get("keywords", [])]
+    patterns = {str(name): str(source) for name, source in data.get("patterns", {}).items()}
+    return keywords, patterns
+
+
+def build_default_matcher() -> SensitiveMatcher:
+    keywords = list(DEFAULT_KEYWORDS)
+    patterns = dict(DEFAULT_PATTERNS)
+    extra_path = os.getenv("OCR_PATTERNS_FILE")
+    if extra_path:
+        try:
+            extra_keywords, extra_patterns = _load_extra_patterns(extra_path)
+            candidate = SensitiveMatcher(keywords + extra_keywords, {**patterns, **extra_patterns})
+        except Exception as exc:
+            logger.warning("Failed to load OCR patterns from %s: %s", extra_path, exc)
+        else:
+            logger.info("Built sensitive matcher with %d patterns", candidate.pattern_count)
+            return candidate
+    return SensitiveMatcher(keywords, patterns)
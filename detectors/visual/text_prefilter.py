@@ -0,0 +1,102 @@
+"""Cheap text-presence estimate used to skip tesseract on text-free images.
+
+The frame (or OCR region) is area-downscaled so its longer side is at most
+``max_side`` pixels, then:
+
+1. horizontal neighbour differences above ``edge_threshold`` mark glyph
+   strokes;
+2. a short horizontal closing joins the edges of neighbouring glyphs into
+   word blobs;
+3. connected components are kept as *text-like* when their geometry fits a
+   word: a few pixels to a fifth of the image tall, at least twice as wide
+   as tall, and reasonably dense.
+
+The score is the number of text-like blobs. Flat backgrounds, gradients and
+photos produce few or none; even a single short line of text produces
+at least one. Full-resolution random noise fuses into one huge blob or
+breaks into specks, both of which fail the geometry test; heavily
+downscaled noise (4K) can still pass, which only costs an OCR run.
+
+Costs a few milliseconds at 1080p versus hundreds for denoise + OCR.
+"""
+
+from __future__ import annotations
+
+import os
+from typing import Dict
+
+import cv2
+import numpy as np
+
+
+PREFILTER_MAX_SIDE = int(os.getenv("OCR_PREFILTER_MAX_SIDE", "960"))
+PREFILTER_EDGE_THRESH = int(os.getenv("OCR_PREFILTER_EDGE_THRESH", "32"))
+PREFILTER_MIN_BLOBS = int(os.getenv("OCR_PREFILTER_MIN_BLOBS", "1"))
+
+_JOIN_KERNEL = cv2.getStructuringElement(cv2.MORPH_RECT, (7, 1))
+
+
+def downscale(gray: np.ndarray, max_side: int = PREFILTER_MAX_SIDE) -> np.ndarray:
+    h, w = gray.shape[:2]
+    longest = max(h, w)
+    if longest <= max_side:
+        return gray
+    factor = max_side / float(longest)
+    return cv2.resize(gray, (max(1, int(w * factor)), max(1, int(h * factor))), interpolation=cv2.INTER_AREA)
+
+
+def text_features(
+    gray: np.ndarray,
+    max_side: int = PREFILTER_MAX_SIDE,
+    edge_threshold: int = PREFILTER_EDGE_THRESH,
+) -> Dict[str, float]:
+    """Edge density and the number of word-shaped edge blobs in ``gray``."""
+
+    small = downscale(gray, max_side)
+    h, w = small.shape[:2]
+    if h < 4 or w < 4:
+        return {"edge_density": 0.0, "text_blobs": 0}
+
+    # Horizontal neighbour differences only: unlike a 2-D gradient they do
+    # not grow glyphs vertically, so consecutive text lines stay separate.
+    diff = cv2.absdiff(small[:, 1:], small[:, :-1])
+    _, edges = cv2.threshold(diff, edge_threshold, 255, cv2.THRESH_BINARY)
+    joined = cv2.morphologyEx(edges, cv2.MORPH_CLOSE, _JOIN_KERNEL)
+
+    count, _, stats, _ = cv2.connectedComponentsWithStats(joined, connectivity=8)
+    comp_w = stats[1:, cv2.CC_STAT_WIDTH]
+    comp_h = stats[1:, cv2.CC_STAT_HEIGHT]
+    comp_area = stats[1:, cv2.CC_STAT_AREA]
+    fill = comp_area / np.maximum(comp_w * comp_h, 1)
+    text_like = (
+        (comp_h >= 5)
+        & (comp_h <= max(6, h // 5))
+        & (comp_w >= 2 * comp_h)
+        & (fill >= 0.25)
+    )
+    return {
+        "edge_density": float(np.count_nonzero(edges)) / float(h * w),
+        "text_blobs": int(np.count_nonzero(text_like)),
+    }
+
+
+class TextPrefilter:
+    """Decides whether an image is worth sending to tesseract."""
+
+    def __init__(
+        self,
+        min_blobs: int = PREFILTER_MIN_BLOBS,
+        max_side: int = PREFILTER_MAX_SIDE,
+        edge_threshold: int = PREFILTER_EDGE_THRESH,
+    ) -> None:
+        self.min_blobs = min_blobs
+        self.max_side = max_side
+        self.edge_threshold = edge_threshold
+
+    def features(self, gray: np.ndarray) -> Dict[str, float]:
+        return text_features(gray, self.max_side, self.edge_threshold)
+
+    def likely_text(self, gray: np.ndarray) -> bool:
+        if self.min_blobs <= 0:
+            return True
+        return self.features(gray)["text_blobs"] >= self.min_blobs
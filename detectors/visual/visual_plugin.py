@@ -0,0 +1,437 @@
+"""Visual detector: framebuffer reconstruction, screenshot bursts and queued OCR/stego analysis."""
+
+import asyncio
+import base64
+import binascii
+import json
+import logging
+import math
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Literal, Optional, Sequence, Tuple
+
+from fastapi import APIRouter, Request
+
+from detectors.plugin import DetectorPlugin, Emit, Result
+from shared import contracts
+from shared.segment_log import SegmentLog
+
+# OCR and steganography analysis runs in a process pool (see analysis_pool.py)
+# whose workers load OCRDetector/StegoDetector themselves.
+try:
+    from analysis_pool import AnalysisPool
+    from analysis_queue import AnalysisJob, AnalysisQueue
+    from burst_tracker import BurstTracker
+    from framebuffer import FramebufferSessions
+    from ocr_scheduler import SamplingScheduler
+    from result_cache import ResultCache
+except ImportError:
+    from .analysis_pool import AnalysisPool
+    from .analysis_queue import AnalysisJob, AnalysisQueue
+    from .burst_tracker import BurstTracker
+    from .framebuffer import FramebufferSessions
+    from .ocr_scheduler import SamplingScheduler
+    from .result_cache import ResultCache
+
+logger = logging.getLogger("visual_detector")
+
+
+IMAGE_SUFFIXES = {".png", ".jpg", ".jpeg", ".bmp", ".tiff"}
+
+# Sessions whose latest risk score is remembered (see VisualPlugin.risk_result).
+MAX_TRACKED_SESSIONS = 20000
+
+# Open per-session chunk logs; the least recently used are closed beyond this.
+MAX_OPEN_CHUNK_LOGS = int(os.getenv("VISUAL_MAX_OPEN_CHUNK_LOGS", "256"))
+
+# (record bytes, timestamp) as SegmentLog.append_many takes them.
+LogRecord = Tuple[bytes, Optional[float]]
+
+
+class ProxyEvent(contracts.ProxyEvent):
+    stream: Literal["visual_stream"]
+
+
+class DetectorEvent(contracts.DetectorEvent):
+    detector: Literal["visual"]
+
+
+def _ensure_screenshot_dir(session_id: str) -> Path:
+    """Ensure local directory for screenshots for this session exists.
+
+    Holds the framebuffer snapshots reconstructed from the RFB stream.
+    """
+
+    base_dir = Path(__file__).resolve().parent
+    screenshots_dir = base_dir / "data" / session_id / "screenshots"
+    screenshots_dir.mkdir(parents=True, exist_ok=True)
+    return screenshots_dir
+
+
+def _event_epoch(ts: str) -> Optional[float]:
+    try:
+        return datetime.fromisoformat(ts).timestamp()
+    except ValueError:
+        return None
+
+
+def _persist_snapshot(session_id: str, ts: str, frame) -> Path:
+    """Write a reconstructed framebuffer snapshot as PNG for analysis and forensics."""
+
+    import cv2
+
+    screenshots_dir = _ensure_screenshot_dir(session_id)
+    ts_safe = ts.replace(":", "-").replace(".", "-")
+    dest = screenshots_dir / f"frame_{ts_safe}.png"
+    # Fast compression: snapshots are written on the hot path.
+    cv2.imwrite(str(dest), frame, [cv2.IMWRITE_PNG_COMPRESSION, 1])
+    return dest
+
+
+def build_detector_event(event: ProxyEvent, burst: Optional[Dict[str, object]] = None) -> DetectorEvent:
+    details: Dict[str, object] = {
+        "length": event.length,
+        "direction": event.direction,
+    }
+    if burst is not None:
+        # Large updates arriving well above the session's own baseline rate;
+        # the further above it, the more confident.
+        event_type = "screenshot_burst_candidate"
+        confidence = round(min(0.9, 0.5 + 0.1 * math.log2(max(1.0, float(burst["rate_multiple"])))), 3)
+        details.update(burst)
+    elif event.length > 0 and event.direction == "client_to_server":
+        event_type = "visual_activity"
+        confidence = 0.05
+    else:
+        event_type = "server_response_activity"
+        confidence = 0.05
+
+    return DetectorEvent.trusted(
+        session_id=event.session_id,
+        timestamp=event.ts,
+        detector="visual",
+        type=event_type,
+        confidence=confidence,
+        details=details,
+    )
+
+
+def apply_analysis_result(detector_event: DetectorEvent, result: Dict[str, object]) -> None:
+    """Merge OCR/stego results into the event, promoting strong signals.
+
+    When strong signals are present they become first-class event types so
+    the risk engine can weight them appropriately.
+    """
+
+    detector_event.details["analysis"] = "completed"
+    ocr_result = result.get("ocr") or {}
+    if ocr_result.get("detected"):
+        detector_event.type = "sensitive_text_detected"
+        ocr_conf = float(ocr_result.get("confidence") or 0.0)
+        # Boost confidence toward the OCR detection confidence
+        detector_event.confidence = max(detector_event.confidence, ocr_conf)
+        detector_event.details["ocr_detected"] = True
+        detector_event.details["ocr_confidence"] = ocr_conf
+        detector_event.details["ocr_keywords"] = ocr_result.get("keywords")
+        detector_event.details["ocr_patterns"] = ocr_result.get("patterns")
+        detector_event.details["ocr_text_preview"] = ocr_result.get("text_preview")
+
+    stego_result = result.get("stego") or {}
+    if stego_result.get("suspicious"):
+        # If we already detected sensitive text, keep that as the
+        # primary type but still surface stego details. Otherwise
+        # promote to a dedicated steganography_detected event.
+        if detector_event.type != "sensitive_text_detected":
+            detector_event.type = "steganography_detected"
+        stego_conf = float(stego_result.get("confidence") or 0.0)
+        detector_event.confidence = max(detector_event.confidence, stego_conf)
+        detector_event.details["stego_suspected"] = True
+        detector_event.details["stego_confidence"] = stego_conf
+        detector_event.details["stego_entropy"] = stego_result.get("entropy")
+        detector_event.details["stego_entropy_suspicious"] = stego_result.get("entropy_suspicious")
+        detector_event.details["stego_lsb_ratio"] = stego_result.get("lsb_ratio")
+        detector_event.details["stego_lsb_suspicious"] = stego_result.get("lsb_suspicious")
+        detector_event.details["stego_chi2_p"] = stego_result.get("chi2_p")
+        detector_event.details["stego_spa_rate"] = stego_result.get("spa_rate")
+        container = stego_result.get("container") or {}
+        if container.get("findings"):
+            detector_event.details["stego_container_format"] = container.get("format")
+            detector_event.details["stego_container_findings"] = container.get("findings")
+            detector_event.details["stego_trailing_bytes"] = container.get("trailing_bytes")
+
+
+class VisualPlugin(DetectorPlugin):
+    """Per-session framebuffers, burst trackers and chunk logs, plus the analysis pool."""
+
+    name = "visual"
+    streams = ("visual_stream",)
+
+    def __init__(self) -> None:
+        super().__init__()
+        # Latest risk score the risk engine reported per session; used to
+        # analyse artifacts from already-elevated sessions first.
+        self.session_risk: Dict[str, int] = {}
+        self.chunk_logs: "OrderedDict[str, SegmentLog]" = OrderedDict()
+        # Set while a batch is in flight. Its chunk logs and framebuffers are
+        # used from a worker thread, so session ends and chunk-log closes
+        # that arrive on the loop meanwhile wait until the batch is done.
+        self._in_batch = False
+        self._deferred_ends: List[str] = []
+        self._deferred_closes: List[SegmentLog] = []
+        # Best-effort OCR and steganography analysis of framebuffer snapshots.
+        # Snapshot sampling shares one CPU budget across sessions, weighted by
+        # risk and by how much of each screen changed.
+        self.sampling_scheduler = SamplingScheduler(risk_of=lambda session_id: self.session_risk.get(session_id, 0))
+        self.framebuffers = FramebufferSessions(sampler=self.sampling_scheduler)
+        self.burst_tracker = BurstTracker()
+        self.result_cache = ResultCache()
+        self.analysis_pool = AnalysisPool(result_cache=self.result_cache)
+        self.analysis_queue = AnalysisQueue(
+            self.analysis_pool, self.send_analysis_follow_up, scheduler=self.sampling_scheduler
+        )
+        self.router = self._build_router()
+
+    async def start(self, emit: Emit) -> None:
+        await super().start(emit)
+        self.analysis_pool.start()
+        self.analysis_queue.start()
+
+    async def stop(self) -> None:
+        await self.analysis_queue.stop()
+        self.analysis_pool.shutdown()
+        self.result_cache.close()
+        while self.chunk_logs:
+            self.chunk_logs.popitem()[1].close()
+
+    # ---- chunks ----------------------------------------------------------
+
+    async def detect_batch(self, events: Sequence[contracts.ProxyEvent]) -> List[Result]:
+        # RRE/Hextile loops, zlib inflation and chunk-log writes are blocking:
+        # the whole batch goes to one worker thread, in chunk order, off the
+        # event loop. Both already isolate failures per chunk.
+        self._in_batch = True
+        try:
+            chunk_records = self._chunk_records(events)
+            frames = await asyncio.to_thread(self._apply_chunks, events, chunk_records)
+            results: List[Result] = []
+            for event, frame in zip(events, frames):
+                try:
+                    results.append(await self.detect(event, frame))
+                except Exception as exc:
+                    results.append(exc)
+        finally:
+            self._in_batch = False
+            self._settle()
+        return results
+
+    def _settle(self) -> None:
+        """Apply the session ends and chunk-log closes deferred by the last batch."""
+
+        while self._deferred_closes:
+            self._deferred_closes.pop().close()
+        ended, self._deferred_ends = self._deferred_ends, []
+        for session_id in ended:
+            self.session_ended(session_id)
+
+    def _close_log(self, log: SegmentLog) -> None:
+        if self._in_batch:
+            self._deferred_closes.append(log)
+        else:
+            log.close()
+
+    def _apply_chunks(
+        self, events: Sequence[ProxyEvent], chunk_records: List[Tuple[SegmentLog, List[LogRecord]]]
+    ) -> List[Optional[object]]:
+        for log, records in chunk_records:
+            try:
+                log.append_many(records)
+            except Exception as exc:
+                logger.warning("Failed to persist visual chunks in %s: %s", log.directory, exc)
+        return self.feed_framebuffers(events)
+
+    def feed_framebuffers(self, events: Sequence[ProxyEvent]) -> List[Optional[object]]:
+        """``feed_framebuffer`` for each chunk, in order; blocking, run it off the event loop."""
+
+        frames = []
+        for event in events:
+            try:
+                frames.append(self.feed_framebuffer(event))
+            except Exception as exc:
+                frames.append(None)
+                logger.warning("Failed to apply framebuffer update for session %s: %s", event.session_id, exc)
+        return frames
+
+    async def detect(self, event: ProxyEvent, frame=None) -> DetectorEvent:
+        """Report one chunk; ``frame`` is the snapshot its framebuffer update cut, if any."""
+
+        artifact_path = None
+        if frame is not None:
+            try:
+                artifact_path = await asyncio.to_thread(_persist_snapshot, event.session_id, event.ts, frame)
+            except Exception as exc:
+                logger.warning("Failed to persist framebuffer snapshot for session %s: %s", event.session_id, exc)
+
+        detector_event = build_detector_event(event, self.observe_burst(event))
+
+        # Best-effort visual analysis: framebuffer snapshots are queued for OCR
+        # and steganography checks. The chunk event is reported right away;
+        # findings arrive later as a follow-up event linked through
+        # details.parent_event_id.
+        if artifact_path is not None and artifact_path.suffix.lower() in IMAGE_SUFFIXES:
+            queued = self._enqueue_artifact(event.session_id, artifact_path, detector_event.event_id)
+            detector_event.details["analysis"] = "queued" if queued else "skipped"
+            detector_event.artifact_refs.append(artifact_path.name)
+        return detector_event
+
+    def feed_framebuffer(self, event: ProxyEvent):
+        """Apply the chunk to the session's reconstructed framebuffer.
+
+        Returns a snapshot (BGR array) when the session's cadence says one is
+        due, otherwise ``None``.
+        """
+
+        if not event.payload_b64:
+            return None
+        try:
+            data = base64.b64decode(event.payload_b64, validate=True)
+        except (binascii.Error, ValueError):
+            return None
+        return self.framebuffers.feed(event.session_id, event.direction, data, event.seq)
+
+    def observe_burst(self, event: ProxyEvent) -> Optional[Dict[str, object]]:
+        """Feed the chunk to the session's large-update rate tracker.
+
+        Both directions are rated, each against its own baseline: screenshots
+        reach a viewer as server-to-client framebuffer updates, while pushed
+        images travel client to server. Returns the burst details when this
+        chunk starts a screenshot burst.
+        """
+
+        return self.burst_tracker.observe(event.session_id, event.length, _event_epoch(event.ts), event.direction)
+
+    def _chunk_log(self, session_id: str) -> SegmentLog:
+        log = self.chunk_logs.get(session_id)
+        if log is None:
+            log = self.chunk_logs[session_id] = SegmentLog(Path(__file__).resolve().parent / "data" / session_id / "chunks")
+            while len(self.chunk_logs) > MAX_OPEN_CHUNK_LOGS:
+                self._close_log(self.chunk_logs.popitem(last=False)[1])
+        else:
+            self.chunk_logs.move_to_end(session_id)
+        return log
+
+    def _chunk_records(self, events: Sequence[ProxyEvent]) -> List[Tuple[SegmentLog, List[LogRecord]]]:
+        """Each session's chunk-log records for a batch, grouped per log.
+
+        Records land in rolling segment files (``shared/segment_log.py``)
+        rather than one file per chunk, one ``append_many`` per session and
+        batch; the forensics collector reads the tail by offset.
+        """
+
+        grouped: Dict[str, List[LogRecord]] = {}
+        for event in events:
+            if event.length <= 0:
+                continue
+            record = {
+                "session_id": event.session_id,
+                "timestamp": event.ts,
+                "direction": event.direction,
+                "length": event.length,
+            }
+            data = json.dumps(record).encode("utf-8")
+            grouped.setdefault(event.session_id, []).append((data, _event_epoch(event.ts)))
+        return [(self._chunk_log(session_id), records) for session_id, records in grouped.items()]
+
+    # ---- analysis --------------------------------------------------------
+
+    def _enqueue_artifact(self, session_id: str, artifact_path: Path, parent_event_id: Optional[str]) -> bool:
+        job = AnalysisJob(session_id, str(artifact_path), parent_event_id, risk=self.session_risk.get(session_id, 0))
+        return self.analysis_queue.enqueue(job)
+
+    async def send_analysis_follow_up(self, job: AnalysisJob, result: Optional[Dict[str, object]]) -> None:
+        """Report OCR/stego findings for a queued artifact as a follow-up event."""
+
+        if result is None:
+            return
+        follow_up = DetectorEvent.trusted(
+            session_id=job.session_id,
+            timestamp=datetime.now(timezone.utc).isoformat(),
+            detector="visual",
+            type="visual_analysis",
+            confidence=0.0,
+            details={"parent_event_id": job.parent_event_id},
+            artifact_refs=[Path(job.image_path).name],
+        )
+        apply_analysis_result(follow_up, result)
+        if follow_up.type == "visual_analysis":
+            # Nothing sensitive found; the original event already stands.
+            return
+        follow_up.details["analysis_latency_ms"] = (time.perf_counter() - job.enqueued_at) * 1000.0
+        logger.info(
+            "visual follow-up %s for session %s",
+            follow_up.type,
+            follow_up.session_id,
+            extra={"fields": {"detector_event": follow_up.model_dump()}},
+        )
+        self.emit(follow_up)
+
+    # ---- sessions and risk -----------------------------------------------
+
+    def session_ended(self, session_id: str) -> None:
+        if self._in_batch:
+            # The batch's worker thread may still feed this session's
+            # framebuffer and write its chunk log.
+            self._deferred_ends.append(session_id)
+            return
+        self.framebuffers.drop(session_id)
+        self.burst_tracker.forget(session_id)
+        self.sampling_scheduler.forget(session_id)
+        self.session_risk.pop(session_id, None)
+        log = self.chunk_logs.pop(session_id, None)
+        if log is not None:
+            log.close()
+
+    def risk_result(self, event: Dict[str, object], response: Dict[str, object]) -> None:
+        """Remember the risk score the risk engine reported for the event's session."""
+
+        session_id = str(event["session_id"])
+        incident = response.get("incident") if isinstance(response, dict) else None
+        if isinstance(incident, dict) and "risk_score" in incident:
+            self.session_risk.pop(session_id, None)
+            self.session_risk[session_id] = int(incident["risk_score"])
+            if len(self.session_risk) > MAX_TRACKED_SESSIONS:
+                self.session_risk.pop(next(iter(self.session_risk)))
+
+    def status(self) -> Dict[str, object]:
+        return {"open_chunk_logs": len(self.chunk_logs), "risk_tracked_sessions": len(self.session_risk)}
+
+    def _build_router(self) -> APIRouter:
+        router = APIRouter()
+
+        @router.get("/analysis/status")
+        async def analysis_status(request: Request):
+            """Report analysis queue depth, per-job latency and pool saturation."""
+            return {
+                **self.analysis_queue.status(),
+                "pool": self.analysis_pool.status(),
+                "framebuffers": self.framebuffers.status(),
+                "sampling": self.sampling_scheduler.status(),
+                "bursts": self.burst_tracker.status(),
+                "risk_sender": request.app.state.host.risk_sender.status(),
+            }
+
+        @router.post("/framebuffer/{session_id}/snapshot")
+        async def framebuffer_snapshot(session_id: str):
+            """Cut a snapshot of the session's reconstructed screen now and queue it for analysis."""
+
+            frame = self.framebuffers.snapshot(session_id)
+            if frame is None:
+                return {"status": "unavailable", "session_id": session_id}
+            ts = datetime.now(timezone.utc).isoformat()
+            artifact_path = await asyncio.to_thread(_persist_snapshot, session_id, ts, frame)
+            queued = self._enqueue_artifact(session_id, artifact_path, None)
+            return {"status": "ok", "artifact": artifact_path.name, "analysis": "queued" if queued else "skipped"}
+
+        return router
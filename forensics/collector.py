@@ -6,6 +6,8 @@ import re
 from pathlib import Path
 from typing import Iterable, List, Tuple
 
+from shared.segment_log import SegmentLog
+
 from .utils.hashing import compute_sha256, compute_sha256_bytes
 from .utils.merkle import compute_merkle_root
 from .utils.schema import ArtifactInfo, ArtifactRef, ArtifactType
@@ -15,6 +17,7 @@ from .utils.storage import (
     get_incident_manifest_dir,
     get_incident_raw_dir,
     get_network_meta_dir,
+    get_visual_chunk_log_dir,
     get_visual_screenshots_dir,
 )
 
@@ -70,7 +73,12 @@ class ForensicsCollector:
         src_dir = get_visual_screenshots_dir(session_id)
         n = self._parse_last_n(ref.ref, default=5)
 
-        if not src_dir.exists() or not any(src_dir.iterdir()):
+        files = sorted([p for p in src_dir.iterdir() if p.is_file()])[-n:] if src_dir.exists() else []
+        # Per-chunk records live in an append-only segment log; the tail is
+        # read through its offset index instead of listing a file per chunk.
+        chunk_records = SegmentLog(get_visual_chunk_log_dir(session_id)).tail(n)
+
+        if not files and not chunk_records:
             logger.warning("Screenshot source missing for session %s at %s", session_id, src_dir)
             return [self._create_placeholder_bytes(
                 raw_dir,
@@ -81,7 +89,6 @@ class ForensicsCollector:
                 source_missing=True,
             )]
 
-        files = sorted([p for p in src_dir.iterdir() if p.is_file()])[-n:]
         artifacts: List[ArtifactInfo] = []
         for idx, src in enumerate(files, start=1):
             dest_name = _safe_name(f"screenshot_{idx}{src.suffix}")
@@ -98,6 +105,20 @@ class ForensicsCollector:
                     source_missing=False,
                 )
             )
+        if chunk_records:
+            dest_name = _safe_name("visual_chunks_tail.jsonl")
+            dest = raw_dir / dest_name
+            dest.write_bytes(b"".join(record.data + b"\n" for record in chunk_records))
+            artifacts.append(
+                ArtifactInfo(
+                    filename=dest_name,
+                    sha256=compute_sha256(dest),
+                    size_bytes=dest.stat().st_size,
+                    type=ArtifactType.screenshot,
+                    source=ref.source,
+                    source_missing=False,
+                )
+            )
         return artifacts
 
     def _collect_clipboard(
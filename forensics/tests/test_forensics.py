@@ -86,3 +86,24 @@ def test_anchor_stub(monkeypatch, tmp_path: Path) -> None:
     data = r.json()
     assert data["status"] == "anchored_stub"
     assert data["incident_id"] == incident_id
+
+
+def test_collector_bundles_chunk_log_tail(tmp_path: Path, monkeypatch) -> None:
+    from forensics import collector as collector_module
+    from forensics.utils.schema import ArtifactRef, ArtifactType
+    from shared.segment_log import SegmentLog
+
+    with SegmentLog(tmp_path / "chunks") as log:
+        for i in range(10):
+            log.append(json.dumps({"length": i}).encode())
+    monkeypatch.setattr(collector_module, "get_visual_screenshots_dir", lambda sid: tmp_path / "missing")
+    monkeypatch.setattr(collector_module, "get_visual_chunk_log_dir", lambda sid: tmp_path / "chunks")
+
+    raw_dir = tmp_path / "raw"
+    raw_dir.mkdir()
+    ref = ArtifactRef(type=ArtifactType.screenshot, source="visual_detector", ref="last_3")
+    artifacts = collector_module.ForensicsCollector()._collect_screenshots("INC-1", "SID-1", ref, raw_dir)
+
+    assert [a.filename for a in artifacts] == ["visual_chunks_tail.jsonl"]
+    lines = (raw_dir / "visual_chunks_tail.jsonl").read_text().splitlines()
+    assert [json.loads(line)["length"] for line in lines] == [7, 8, 9]
@@ -24,6 +24,10 @@ def get_visual_screenshots_dir(session_id: str) -> Path:
     return PROJECT_ROOT / "detectors" / "visual" / "data" / session_id / "screenshots"
 
 
+def get_visual_chunk_log_dir(session_id: str) -> Path:
+    return PROJECT_ROOT / "detectors" / "visual" / "data" / session_id / "chunks"
+
+
 def get_app_clipboard_path(session_id: str) -> Path:
     return PROJECT_ROOT / "detectors" / "app" / "data" / session_id / "clipboard.log"
 
@@ -30,8 +30,18 @@ const config = {
   adminPort: Number(process.env.PROXY_ADMIN_PORT || "8000"),
   honeypotHost: process.env.HONEYPOT_HOST || process.env.UPSTREAM_HOST || "127.0.0.1",
   honeypotPort: Number(process.env.HONEYPOT_PORT || process.env.UPSTREAM_PORT || "5902"),
+  // Streams whose events carry the chunk bytes (base64) so detectors can
+  // parse RFB messages instead of relying on chunk length alone.
+  payloadStreams: (process.env.PROXY_PAYLOAD_STREAMS ?? "app_stream,visual_stream")
+    .split(",")
+    .map((s) => s.trim())
+    .filter(Boolean),
 };
 
+// Streams whose detector only parses one direction: the other direction's
+// chunks are sent without payload_b64.
+const PAYLOAD_DIRECTIONS = { app_stream: "client_to_server" };
+
 function log(...args) {
   console.log("[proxy]", ...args);
 }
@@ -73,9 +83,25 @@ function sendEvent(event) {
     });
 }
 
-function emitToStreams(sessionId, direction, chunkLength) {
+// sessionId -> { client_to_server, server_to_client }: the next chunk number
+// per direction. Events travel over independent HTTP requests, so detectors
+// that parse the byte stream use seq to restore order and spot lost chunks.
+const chunkSeqs = new Map();
+
+function nextSeq(sessionId, direction) {
+  let seqs = chunkSeqs.get(sessionId);
+  if (!seqs) {
+    seqs = { client_to_server: 0, server_to_client: 0 };
+    chunkSeqs.set(sessionId, seqs);
+  }
+  return seqs[direction]++;
+}
+
+function emitToStreams(sessionId, direction, chunk) {
   const ts = new Date().toISOString();
   const streams = ["network_stream", "app_stream", "visual_stream"];
+  const seq = nextSeq(sessionId, direction);
+  let payloadB64 = null;
 
   streams.forEach((stream) => {
     const event = {
@@ -84,8 +110,14 @@ function emitToStreams(sessionId, direction, chunkLength) {
       stream,
       direction,
       type: "raw_chunk",
-      length: chunkLength,
+      length: chunk.length,
+      seq,
     };
+    const payloadDirection = PAYLOAD_DIRECTIONS[stream];
+    if (config.payloadStreams.includes(stream) && (!payloadDirection || payloadDirection === direction)) {
+      payloadB64 = payloadB64 ?? chunk.toString("base64");
+      event.payload_b64 = payloadB64;
+    }
     sendEvent(event);
   });
 }
@@ -98,7 +130,7 @@ function attachUpstreamHandlers(sessionId, clientSocket, upstreamSocket) {
   upstreamSocket.on("data", (chunk) => {
     // Persist network meta for server_to_client traffic.
     persistNetworkChunk(sessionId, "server_to_client", chunk);
-    emitToStreams(sessionId, "server_to_client", chunk.length);
+    emitToStreams(sessionId, "server_to_client", chunk);
     const ok = clientSocket.write(chunk);
     if (!ok) {
       log(`Session ${sessionId}: backpressure on client write`);
@@ -148,7 +180,7 @@ const server = net.createServer((clientSocket) => {
   clientSocket.on("data", (chunk) => {
     // Persist network meta for client_to_server traffic.
     persistNetworkChunk(sessionId, "client_to_server", chunk);
-    emitToStreams(sessionId, "client_to_server", chunk.length);
+    emitToStreams(sessionId, "client_to_server", chunk);
     const entry = sessions.get(sessionId);
     if (!entry) {
       return;
@@ -174,6 +206,7 @@ const server = net.createServer((clientSocket) => {
   clientSocket.on("close", () => {
     log(`Session ${sessionId}: client closed`);
     upstreamSocket.end();
+    chunkSeqs.delete(sessionId);
   });
 });
 
@@ -1,39 +1,30 @@
 import logging
 import os
-from typing import List, Literal, Dict, Optional
+import sys
+from pathlib import Path
+from typing import List, Optional
 
 import httpx
 from fastapi import FastAPI, Header, HTTPException
 from pydantic import BaseModel, Field
 
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("response_engine")
 
-app = FastAPI(title="SentinelVNC Response Engine")
+_project_root = Path(__file__).resolve().parents[1]
+if str(_project_root) not in sys.path:
+    sys.path.insert(0, str(_project_root))
 
+from shared.contracts import Incident, json_body  # noqa: E402
+from shared.service_logging import EventLogSampler, configure_logging  # noqa: E402
 
-# --- Data contracts ---------------------------------------------------------
+configure_logging("response_engine")
 
+app = FastAPI(title="SentinelVNC Response Engine")
 
-class DetectorEvent(BaseModel):
-    event_id: str
-    session_id: str
-    timestamp: str
-    detector: Literal["network", "app", "visual"]
-    type: str
-    confidence: float
-    details: Dict[str, object] = Field(default_factory=dict)
-    artifact_refs: List[str] = Field(default_factory=list)
 
+# --- Data contracts ---------------------------------------------------------
 
-class Incident(BaseModel):
-    incident_id: str
-    session_id: str
-    risk_score: int
-    risk_level: Literal["LOW", "MEDIUM", "HIGH"]
-    events: List[DetectorEvent]
-    recommended_action: Literal["allow", "deceive", "kill_session", "deception_mode"]
-    artifact_refs: List[str] = Field(default_factory=list)
+# DetectorEvent and Incident live in shared/contracts.py.
 
 
 class ForensicsStartRequest(BaseModel):
@@ -57,6 +48,10 @@ RESPONSE_ENGINE_API_KEY = os.getenv("RESPONSE_ENGINE_API_KEY")
 PROXY_ADMIN_API_KEY = os.getenv("PROXY_ADMIN_API_KEY")
 FORENSICS_API_KEY = os.getenv("FORENSICS_API_KEY")
 
+# The risk engine sends an incident per detector event; routine ones are
+# logged at a sample rate, with counts per action logged periodically.
+event_log = EventLogSampler(logger)
+
 
 # --- Action implementations -------------------------------------------------
 
@@ -129,7 +124,7 @@ async def activate_deception(session_id: str) -> dict:
 
 
 async def allow_session(session_id: str) -> None:
-    logger.info("[response] allow_session for session_id=%s", session_id)
+    logger.debug("[response] allow_session for session_id=%s", session_id)
 
 
 async def call_forensics_engine(incident: Incident) -> None:
@@ -146,13 +141,14 @@ async def call_forensics_engine(incident: Incident) -> None:
             if FORENSICS_API_KEY:
                 headers["X-API-Key"] = FORENSICS_API_KEY
             resp = await client.post(FORENSICS_START_URL, json=payload.model_dump(), headers=headers)
-            logger.info(
-                "[response] forensics/start response status=%s body=%s incident_id=%s session_id=%s",
-                resp.status_code,
-                resp.text,
-                incident.incident_id,
-                incident.session_id,
-            )
+            if event_log.sampled("forensics_start", tag=str(resp.status_code)) or resp.status_code != 200:
+                logger.info(
+                    "[response] forensics/start response status=%s body=%s incident_id=%s session_id=%s",
+                    resp.status_code,
+                    resp.text,
+                    incident.incident_id,
+                    incident.session_id,
+                )
         except Exception as exc:
             logger.error(
                 "[response] failed to call forensics/start for incident_id=%s session_id=%s: %s",
@@ -172,18 +168,21 @@ async def health():
 
 
 @app.post("/incoming-incident")
-async def incoming_incident(incident: Incident, x_api_key: Optional[str] = Header(default=None)):
+async def incoming_incident(
+    incident: Incident = json_body(Incident), x_api_key: Optional[str] = Header(default=None)
+):
     # If an API key is configured, require it for incoming incident traffic
     # from the Risk Engine.
     if RESPONSE_ENGINE_API_KEY and x_api_key != RESPONSE_ENGINE_API_KEY:
         raise HTTPException(status_code=401, detail="Unauthorized: invalid API key")
-    logger.info(
-        "[response] received incident=%s session_id=%s risk_score=%d action=%s",
-        incident.incident_id,
-        incident.session_id,
-        incident.risk_score,
-        incident.recommended_action,
-    )
+    if event_log.sampled("incident", tag=incident.recommended_action) or incident.recommended_action == "kill_session":
+        logger.info(
+            "[response] received incident=%s session_id=%s risk_score=%d action=%s",
+            incident.incident_id,
+            incident.session_id,
+            incident.risk_score,
+            incident.recommended_action,
+        )
 
     action = incident.recommended_action
 
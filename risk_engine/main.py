@@ -1,17 +1,36 @@
+import asyncio
 import logging
+import sys
 import uuid
+from collections import OrderedDict
 from datetime import datetime, timedelta, timezone
-from typing import Dict, List, Literal, Optional
+from pathlib import Path
+from typing import Dict, List, Optional, Set
 
 import httpx
 import yaml
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, Field
+from pydantic import BaseModel
 
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("risk_engine")
 
+_project_root = Path(__file__).resolve().parents[1]
+if str(_project_root) not in sys.path:
+    sys.path.insert(0, str(_project_root))
+
+from shared.contracts import (  # noqa: E402
+    JSON_HEADERS,
+    ContractResponse,
+    DetectorEvent,
+    DetectorEventBatch,
+    Incident,
+    json_body,
+)
+from shared.service_logging import EventLogSampler, configure_logging  # noqa: E402
+
+configure_logging("risk_engine")
+
 app = FastAPI(title="SentinelVNC Correlator & Risk Engine")
 
 # Add CORS middleware to allow dashboard access
@@ -26,26 +45,7 @@ app.add_middleware(
 
 # --- Data contracts ---------------------------------------------------------
 
-
-class DetectorEvent(BaseModel):
-    event_id: str
-    session_id: str
-    timestamp: str
-    detector: Literal["network", "app", "visual"]
-    type: str
-    confidence: float = Field(..., ge=0.0, le=1.0)
-    details: Dict[str, object] = Field(default_factory=dict)
-    artifact_refs: List[str] = Field(default_factory=list)
-
-
-class Incident(BaseModel):
-    incident_id: str
-    session_id: str
-    risk_score: int
-    risk_level: Literal["LOW", "MEDIUM", "HIGH"]
-    events: List[DetectorEvent]
-    recommended_action: Literal["allow", "deceive", "kill_session"]
-    artifact_refs: List[str] = Field(default_factory=list)
+# DetectorEvent, DetectorEventBatch and Incident live in shared/contracts.py.
 
 
 class IncidentAcknowledgeRequest(BaseModel):
@@ -63,6 +63,13 @@ WINDOW_SECONDS = 30
 # executed. For the MVP we call the Response Engine directly over HTTP.
 RESPONSE_ENGINE_URL = "http://localhost:9200/incoming-incident"
 
+# Incident posts in flight at once; past this, new incidents are not
+# published (the Response Engine is down or far behind).
+PUBLISH_MAX_PENDING = 256
+
+# How many recently ingested event_ids are remembered to drop replays.
+SEEN_EVENT_IDS_MAX = 100_000
+
 
 def load_risk_weights() -> Dict[str, int]:
     try:
@@ -76,6 +83,9 @@ def load_risk_weights() -> Dict[str, int]:
 
 RISK_WEIGHTS = load_risk_weights()
 
+# Per-incident logs are sampled; counts per risk level are logged periodically.
+event_log = EventLogSampler(logger)
+
 
 # --- In-memory stores -------------------------------------------------------
 
@@ -86,6 +96,14 @@ SESSION_EVENTS: Dict[str, List[DetectorEvent]] = {}
 # incident_id -> Incident
 INCIDENTS: Dict[str, Incident] = {}
 
+# event_id -> None, least recently seen first. Detectors deliver at least
+# once (the risk sender retries a batch after a timeout that may have
+# reached us), so a replayed event must not be scored twice.
+SEEN_EVENT_IDS: "OrderedDict[str, None]" = OrderedDict()
+
+# Incident posts to the Response Engine that have not finished yet.
+_PUBLISH_TASKS: Set[asyncio.Task] = set()
+
 
 # --- Risk scoring & correlation --------------------------------------------
 
@@ -163,20 +181,23 @@ def correlate_and_create_incident(session_id: str) -> Optional[Incident]:
     artifact_refs = []
 
     incident_id = str(uuid.uuid4())
-    incident = Incident(
+    # Built from events validated on ingest and values computed above.
+    incident = Incident.trusted(
         incident_id=incident_id,
         session_id=session_id,
         risk_score=risk_score,
         risk_level=risk_level,
-        events=windowed_events,
+        events=list(windowed_events),
         recommended_action=action,
         artifact_refs=artifact_refs,
     )
 
     INCIDENTS[incident_id] = incident
     publish_incident(incident)
-    logger.info("Created incident %s for session %s (score=%d, level=%s)",
-                incident_id, session_id, risk_score, risk_level)
+    # An incident is re-evaluated on every event; HIGH ones are always logged.
+    if event_log.sampled("incident", tag=risk_level) or risk_level == "HIGH":
+        logger.info("Created incident %s for session %s (score=%d, level=%s)",
+                    incident_id, session_id, risk_score, risk_level)
     return incident
 
 
@@ -185,17 +206,38 @@ def publish_incident(incident: Incident) -> None:
 
     This is a best-effort fire-and-forget HTTP call so that response actions
     (allow/deceive/kill) and forensics collection can be triggered
-    automatically when an incident is created.
+    automatically when an incident is created. Ingest runs on the event
+    loop, so the post runs as a background task and never holds it up.
     """
 
     try:
-        with httpx.Client(timeout=5.0) as client:
-            resp = client.post(RESPONSE_ENGINE_URL, json=incident.model_dump())
-        logger.info(
-            "Published incident %s to Response Engine status=%s",
-            incident.incident_id,
-            resp.status_code,
-        )
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        asyncio.run(_post_incident(incident))
+        return
+    if len(_PUBLISH_TASKS) >= PUBLISH_MAX_PENDING:
+        if event_log.sampled("publish_dropped"):
+            logger.warning(
+                "Not publishing incident %s: %d posts to the Response Engine still pending",
+                incident.incident_id,
+                len(_PUBLISH_TASKS),
+            )
+        return
+    task = loop.create_task(_post_incident(incident))
+    _PUBLISH_TASKS.add(task)
+    task.add_done_callback(_PUBLISH_TASKS.discard)
+
+
+async def _post_incident(incident: Incident) -> None:
+    try:
+        async with httpx.AsyncClient(timeout=5.0) as client:
+            resp = await client.post(RESPONSE_ENGINE_URL, content=incident.encode(), headers=JSON_HEADERS)
+        if event_log.sampled("published", tag=str(resp.status_code)):
+            logger.info(
+                "Published incident %s to Response Engine status=%s",
+                incident.incident_id,
+                resp.status_code,
+            )
     except Exception as exc:
         logger.error(
             "Failed to publish incident %s to Response Engine: %s",
@@ -213,9 +255,50 @@ async def health():
     return {"status": "ok", "service": "risk_engine"}
 
 
-@app.post("/detector-events")
-async def ingest_detector_event(event: DetectorEvent):
+def collapse_repeat(event: DetectorEvent) -> Optional[DetectorEvent]:
+    """Fold a detector-flagged repeat into the original event, if still held.
+
+    Detectors mark re-sent content (e.g. the same clipboard blob pasted again)
+    with ``details.duplicate_of``. Rather than scoring it as a fresh signal,
+    the original event's ``repeat_count`` is bumped in place.
+    """
+
+    original_id = event.details.get("duplicate_of")
+    if not original_id:
+        return None
+    for original in SESSION_EVENTS.get(event.session_id, []):
+        if original.event_id == original_id:
+            repeat_count = event.details.get("repeat_count")
+            if not isinstance(repeat_count, int):
+                repeat_count = int(original.details.get("repeat_count", 0)) + 1
+            original.details["repeat_count"] = repeat_count
+            original.details["last_repeat_at"] = event.timestamp
+            return original
+    return None
+
+
+def seen_before(event_id: str) -> bool:
+    """Whether ``event_id`` was already ingested; remembers it if not."""
+
+    if event_id in SEEN_EVENT_IDS:
+        SEEN_EVENT_IDS.move_to_end(event_id)
+        return True
+    SEEN_EVENT_IDS[event_id] = None
+    while len(SEEN_EVENT_IDS) > SEEN_EVENT_IDS_MAX:
+        SEEN_EVENT_IDS.popitem(last=False)
+    return False
+
+
+def ingest(event: DetectorEvent) -> Dict[str, object]:
     session_id = event.session_id
+    if seen_before(event.event_id):
+        return {"status": "ok", "incident_created": False, "incident": None,
+                "replayed": True}
+    original = collapse_repeat(event)
+    if original is not None:
+        return {"status": "ok", "incident_created": False, "incident": None,
+                "collapsed_into": original.event_id}
+
     SESSION_EVENTS.setdefault(session_id, []).append(event)
 
     incident = correlate_and_create_incident(session_id)
@@ -223,17 +306,29 @@ async def ingest_detector_event(event: DetectorEvent):
             "incident": incident}
 
 
-@app.get("/incidents")
-async def list_incidents() -> List[Incident]:
-    return list(INCIDENTS.values())
+@app.post("/detector-events")
+async def ingest_detector_event(event: DetectorEvent = json_body(DetectorEvent)):
+    return ContractResponse(ingest(event))
+
+
+@app.post("/detector-events/batch")
+async def ingest_detector_event_batch(batch: DetectorEventBatch = json_body(DetectorEventBatch)):
+    """Ingest events in order; ``results[i]`` is what ``/detector-events`` would return for ``events[i]``."""
+
+    return ContractResponse({"status": "ok", "results": [ingest(event) for event in batch.events]})
 
 
-@app.get("/incidents/{incident_id}")
-async def get_incident(incident_id: str) -> Incident:
+@app.get("/incidents", response_model=List[Incident])
+async def list_incidents():
+    return ContractResponse(list(INCIDENTS.values()))
+
+
+@app.get("/incidents/{incident_id}", response_model=Incident)
+async def get_incident(incident_id: str):
     incident = INCIDENTS.get(incident_id)
     if not incident:
         raise HTTPException(status_code=404, detail="Incident not found")
-    return incident
+    return ContractResponse(incident)
 
 
 @app.get("/incidents/{incident_id}/explanation")
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""Latency of the structural container scan versus pixel steganalysis.
+
+Usage:
+    python scripts/benchmarks/bench_container_scan.py [--repeat 200] [--sizes 1080p 4k]
+
+For PNG and JPEG encodings of a synthetic UI frame, clean and with 4 KiB
+appended after the end-of-image marker, reports the median
+``scan_container`` time in microseconds next to decode + ``steganalysis``
+time in milliseconds, and whether the appended payload was flagged.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import sys
+import time
+
+import cv2
+
+from synthetic import RESOLUTIONS, add_visual_path, ui_frame
+
+add_visual_path()
+
+import steganalysis  # noqa: E402
+from container_scan import scan_container  # noqa: E402
+from decoded_image import DecodedImage  # noqa: E402
+
+
+def median_time(fn, repeat: int) -> float:
+    fn()
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--sizes", nargs="+", default=["1080p", "4k"], choices=sorted(RESOLUTIONS))
+    args = parser.parse_args()
+
+    payload = b"\x00" * 4096
+    results = []
+    for size in args.sizes:
+        frame = ui_frame(RESOLUTIONS[size])
+        for ext in (".png", ".jpg"):
+            encoded = cv2.imencode(ext, frame)[1].tobytes()
+            for label, data in (("clean", encoded), ("appended", encoded + payload)):
+                report = scan_container(data)
+                scan_s = median_time(lambda: scan_container(data), args.repeat)
+                pixel_s = median_time(lambda: steganalysis.analyze(DecodedImage.from_bytes(data).bgr), 3)
+                results.append({
+                    "size": size,
+                    "format": report["format"],
+                    "variant": label,
+                    "bytes": len(data),
+                    "chunks": report["chunks"],
+                    "scan_us": round(scan_s * 1e6, 1),
+                    "decode_and_pixel_stats_ms": round(pixel_s * 1000.0, 1),
+                    "flagged": report["suspicious"],
+                })
+    json.dump(results, sys.stdout, indent=2)
+    sys.stdout.write("\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""Per-event encode/validate cost at each hop, stock FastAPI/httpx path versus shared.contracts.
+
+Usage:
+    python scripts/benchmarks/bench_contracts.py [--payload-bytes 1024] [--batch 64]
+        [--incident-events 10] [--number 2000]
+
+Each hop does the JSON work a request pays for on the way in and out of a
+service, without the network:
+
+- ``proxy_to_dispatcher``: decode a ``ProxyEvent`` body (base64 chunk of
+  ``--payload-bytes``); stock is FastAPI's ``json.loads`` then validation;
+- ``dispatcher_to_detector``: stock re-serializes the model for httpx
+  (``json.dumps(model_dump())``) and the detector decodes it again; the
+  dispatcher now forwards the body it received;
+- ``detector_verdict``: build the ``DetectorEvent`` and encode the
+  ``/events`` reply (stock: validated constructor and ``jsonable_encoder``);
+- ``detector_to_risk_engine``: one event's share of a ``--batch``-event
+  ``RiskSender`` batch, encoded by the sender and decoded by the risk engine;
+- ``risk_engine_reply``: one ``/detector-events`` reply carrying an incident
+  of ``--incident-events`` events;
+- ``risk_to_response_engine``: build that incident, encode it for the
+  response engine and decode it there.
+
+Times are microseconds per event, best of five runs of ``--number`` calls.
+"""
+
+from __future__ import annotations
+
+import argparse
+import base64
+import json
+import sys
+import timeit
+from typing import Literal
+
+from synthetic import ROOT
+
+sys.path.insert(0, ROOT)
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+
+from shared import contracts  # noqa: E402
+from shared.contracts import DetectorEvent, DetectorEventBatch, Incident, ProxyEvent, dumps  # noqa: E402
+
+
+class VisualProxyEvent(ProxyEvent):
+    stream: Literal["visual_stream"]
+
+
+def detector_fields(i: int = 0) -> dict:
+    return {
+        "event_id": f"4f6c1e9a-0000-4000-8000-{i:012d}",
+        "session_id": "6d1f8a52-3c1b-4c4e-9d0e-2b7f1a9e5c31",
+        "timestamp": "2025-11-23T10:15:30.123456+00:00",
+        "detector": "visual",
+        "type": "screenshot_burst_candidate",
+        "confidence": 0.7,
+        "details": {
+            "length": 48213, "direction": "client_to_server", "frame_count": 12, "duration_s": 1.8,
+            "rate_hz": 6.7, "baseline_rate_hz": 0.4, "rate_multiple": 16.7, "analysis": "queued",
+        },
+        "artifact_refs": ["20251123T101530_000001.png"],
+    }
+
+
+def per_event_us(fn, number: int, events: int = 1) -> float:
+    return min(timeit.repeat(fn, number=number, repeat=5)) / number / events * 1e6
+
+
+def hops(args):
+    chunk = base64.b64encode(bytes(range(256)) * (args.payload_bytes // 256 + 1))[: args.payload_bytes * 4 // 3]
+    proxy_body = json.dumps({
+        "session_id": "6d1f8a52-3c1b-4c4e-9d0e-2b7f1a9e5c31", "ts": "2025-11-23T10:15:30.123456Z",
+        "stream": "visual_stream", "direction": "client_to_server", "type": "raw_chunk",
+        "length": args.payload_bytes, "payload_b64": chunk.decode(),
+    }).encode()
+    proxy_event = ProxyEvent.decode(proxy_body)
+
+    fields = detector_fields()
+    batch_dicts = [DetectorEvent(**detector_fields(i)).model_dump() for i in range(args.batch)]
+    incident_events = [DetectorEvent(**detector_fields(i)) for i in range(args.incident_events)]
+    incident_fields = {
+        "incident_id": "9b2e4c1d-7a3f-4e58-b6d0-1c2a3b4c5d6e", "session_id": fields["session_id"],
+        "risk_score": 64, "risk_level": "MEDIUM", "recommended_action": "deceive", "artifact_refs": [],
+    }
+    incident = Incident(events=incident_events, **incident_fields)
+    reply = {"status": "ok", "incident_created": True, "incident": incident}
+    incident_body = incident.encode()
+
+    yield "proxy_to_dispatcher", 1, (
+        lambda: ProxyEvent.model_validate(json.loads(proxy_body)),
+        lambda: ProxyEvent.decode(proxy_body),
+    )
+    yield "dispatcher_to_detector", 1, (
+        lambda: VisualProxyEvent.model_validate(json.loads(json.dumps(proxy_event.model_dump()).encode())),
+        lambda: VisualProxyEvent.decode(proxy_body),
+    )
+    yield "detector_verdict", 1, (
+        lambda: json.dumps(jsonable_encoder({"status": "ok", "detector_event": DetectorEvent(**fields)})).encode(),
+        lambda: dumps({"status": "ok", "detector_event": DetectorEvent.trusted(**fields)}),
+    )
+    yield "detector_to_risk_engine", args.batch, (
+        lambda: DetectorEventBatch.model_validate(json.loads(json.dumps({"events": batch_dicts}).encode())),
+        lambda: DetectorEventBatch.decode(dumps({"events": batch_dicts})),
+    )
+    yield "risk_engine_reply", 1, (
+        lambda: json.dumps(jsonable_encoder(reply)).encode(),
+        lambda: dumps(reply),
+    )
+    yield "risk_to_response_engine", 1, (
+        lambda: Incident.model_validate(json.loads(json.dumps(
+            Incident(events=list(incident_events), **incident_fields).model_dump()
+        ).encode())),
+        lambda: Incident.decode(Incident.trusted(events=list(incident_events), **incident_fields).encode()),
+    )
+    # The incident's share alone, to separate construction from the JSON work.
+    yield "incident_construction", 1, (
+        lambda: Incident(events=list(incident_events), **incident_fields),
+        lambda: Incident.trusted(events=list(incident_events), **incident_fields),
+    )
+    yield "incident_decode", 1, (
+        lambda: Incident.model_validate(json.loads(incident_body)),
+        lambda: Incident.decode(incident_body),
+    )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--payload-bytes", type=int, default=1024)
+    parser.add_argument("--batch", type=int, default=64)
+    parser.add_argument("--incident-events", type=int, default=10)
+    parser.add_argument("--number", type=int, default=2000)
+    args = parser.parse_args()
+
+    results = {}
+    for name, events, (stock, fast) in hops(args):
+        number = max(1, args.number // events)
+        stock_us = per_event_us(stock, number, events)
+        fast_us = per_event_us(fast, number, events)
+        results[name] = {
+            "stock_us": round(stock_us, 2),
+            "contracts_us": round(fast_us, 2),
+            "speedup": round(stock_us / fast_us, 2),
+        }
+
+    report = {
+        "orjson": contracts.orjson is not None,
+        "payload_bytes": args.payload_bytes,
+        "batch": args.batch,
+        "incident_events": args.incident_events,
+        "results": results,
+    }
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""Rectangles per second applied by the RFB framebuffer reconstruction.
+
+Usage:
+    python scripts/benchmarks/bench_framebuffer.py [--size 1080p] [--tile 64] [--updates 20]
+
+Builds a synthetic server-to-client RFB stream (handshake, ``ServerInit``
+at ``--size``, then ``--updates`` FramebufferUpdates of ``--tile``-sized
+rectangles covering the screen) per encoding, feeds it to
+``FramebufferSessions`` in 64 KiB chunks the way the proxy forwards it, and
+reports rectangles and megapixels applied per second.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import struct
+import sys
+import time
+import zlib
+
+import numpy as np
+
+from synthetic import RESOLUTIONS, add_visual_path, ui_frame
+
+add_visual_path()
+
+from framebuffer import FramebufferSessions  # noqa: E402
+
+CHUNK = 64 * 1024
+PIXEL_FORMAT = struct.pack(">BBBBHHHBBB3x", 32, 24, 0, 1, 255, 255, 255, 16, 8, 0)
+
+
+def handshake(width: int, height: int) -> bytes:
+    return (
+        b"RFB 003.008\n" + bytes([1, 1]) + b"\x00" * 4
+        + struct.pack(">HH", width, height) + PIXEL_FORMAT + struct.pack(">I", 5) + b"bench"
+    )
+
+
+def tiles(w: int, h: int, tile: int):
+    for y in range(0, h, tile):
+        for x in range(0, w, tile):
+            yield x, y, min(tile, w - x), min(tile, h - y)
+
+
+def build_update(bgrx: np.ndarray, tile: int, encoding: str, compressor) -> bytes:
+    h, w = bgrx.shape[:2]
+    rects = []
+    for x, y, tw, th in tiles(w, h, tile):
+        header = struct.pack(">HHHH", x, y, tw, th)
+        if encoding == "raw":
+            rects.append(header + struct.pack(">i", 0) + bgrx[y:y + th, x:x + tw].tobytes())
+        elif encoding == "copyrect":
+            rects.append(header + struct.pack(">iHH", 1, (x + tile) % max(1, w - tw), y))
+        elif encoding == "rre":
+            body = struct.pack(">I", 4) + bgrx[y, x].tobytes()
+            for i in range(4):
+                body += bgrx[y + i % th, x].tobytes() + struct.pack(">HHHH", i % tw, i % th, tw - i % tw, 1)
+            rects.append(header + struct.pack(">i", 2) + body)
+        else:
+            # Zlib rectangles continue one compression stream per connection.
+            data = compressor.compress(bgrx[y:y + th, x:x + tw].tobytes()) + compressor.flush(zlib.Z_SYNC_FLUSH)
+            rects.append(header + struct.pack(">iI", 6, len(data)) + data)
+    return bytes([0, 0]) + struct.pack(">H", len(rects)) + b"".join(rects)
+
+
+def run(size: str, tile: int, count: int, encoding: str) -> dict:
+    w, h = RESOLUTIONS[size]
+    frame = ui_frame((w, h))
+    bgrx = np.concatenate([frame, np.zeros((h, w, 1), dtype=np.uint8)], axis=2)
+    compressor = zlib.compressobj(1)
+    stream = handshake(w, h) + b"".join(build_update(bgrx, tile, encoding, compressor) for _ in range(count))
+    total_rects = count * sum(1 for _ in tiles(w, h, tile))
+
+    sessions = FramebufferSessions(snapshot_interval=-1)
+    started = time.perf_counter()
+    for i in range(0, len(stream), CHUNK):
+        sessions.feed("bench", "server_to_client", stream[i:i + CHUNK])
+    elapsed = time.perf_counter() - started
+    status = sessions.status()
+    assert status["rects"] == total_rects and not status["desynced"], status
+    return {
+        "encoding": encoding,
+        "size": size,
+        "tile": tile,
+        "rects": total_rects,
+        "stream_mb": round(len(stream) / 1e6, 1),
+        "rects_per_s": round(total_rects / elapsed),
+        "mpixels_per_s": round(count * w * h / elapsed / 1e6, 1) if encoding != "copyrect" else None,
+        "canvas_mb": round(status["canvas_bytes"] / 1e6, 1),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", choices=sorted(RESOLUTIONS), default="1080p")
+    parser.add_argument("--tile", type=int, default=64)
+    parser.add_argument("--updates", type=int, default=20)
+    parser.add_argument("--encodings", nargs="+", default=["raw", "copyrect", "rre", "zlib"])
+    args = parser.parse_args()
+    results = [run(args.size, args.tile, args.updates, enc) for enc in args.encodings]
+    json.dump(results, sys.stdout, indent=2)
+    sys.stdout.write("\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
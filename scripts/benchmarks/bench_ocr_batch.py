@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""Throughput of batched OCR (regions packed onto shared canvases) by batch size.
+
+Usage:
+    python scripts/benchmarks/bench_ocr_batch.py [--regions 64] [--batch-sizes 1 4 8 16 32]
+        [--engine auto|model] [--call-overhead-ms 80] [--mpixel-ms 250]
+
+Regions are small text crops (dirty-tile sized, 96-192 px tall) cut from
+synthetic document and terminal frames, as several sessions would queue
+them. Each batch goes through ``OCRDetector.recognize_batch``; batch size 1
+is the one-call-per-region path.
+
+``--engine auto`` uses the installed tesseract backend. Where none is
+installed (or with ``--engine model``), a cost-model engine sleeps
+``call_overhead + pixels * mpixel_ms`` per call instead, so the numbers show
+how the per-call overhead amortises for a given overhead/throughput ratio;
+the prefilter, preprocessing, packing and word mapping are always real.
+Modelled runs are not measurements of tesseract: the report says
+``"modelled": true`` and its throughput keys are ``modelled_*``.
+Reported: regions/s, engine calls, and the share of regions that got at
+least one word back.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import time
+
+import numpy as np
+
+from synthetic import RESOLUTIONS, add_visual_path, terminal_frame, text_frame
+
+add_visual_path()
+
+from ocr_engine import build_engine  # noqa: E402
+from ocr_stego import OCRDetector  # noqa: E402
+
+
+class CostModelEngine:
+    """Stand-in engine: fixed per-call overhead plus a per-pixel cost."""
+
+    name = "cost_model"
+
+    def __init__(self, call_overhead_ms: float, mpixel_ms: float) -> None:
+        self.call_overhead = call_overhead_ms / 1000.0
+        self.per_pixel = mpixel_ms / 1000.0 / 1e6
+        self.calls = 0
+
+    def image_to_data(self, image, psm=6):
+        import cv2
+
+        self.calls += 1
+        time.sleep(self.call_overhead + image.size * self.per_pixel)
+        # One "word" per dark blob, so mapping back is exercised.
+        blobs = cv2.dilate((image < 128).astype(np.uint8), np.ones((3, 15), np.uint8))
+        count, _, stats, _ = cv2.connectedComponentsWithStats(blobs)
+        data = {"text": [], "conf": [], "left": [], "top": [], "width": [], "height": []}
+        for label in range(1, count):
+            x, y, w, h = (int(v) for v in stats[label, :4])
+            for key, value in zip(data, (f"w{label}", 90, x, y, w, h)):
+                data[key].append(value)
+        return data
+
+    def close(self) -> None:
+        pass
+
+
+class CountingEngine:
+    def __init__(self, engine) -> None:
+        self.engine = engine
+        self.name = getattr(engine, "name", type(engine).__name__)
+        self.calls = 0
+
+    def image_to_data(self, image, psm=6):
+        self.calls += 1
+        return self.engine.image_to_data(image, psm)
+
+
+def text_regions(count: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    size = RESOLUTIONS["1080p"]
+    sources = [
+        text_frame(size, seed=seed)[..., 0],
+        terminal_frame(size, seed=seed)[..., 0],
+    ]
+    regions = []
+    for i in range(count):
+        frame = sources[i % len(sources)]
+        h = int(rng.integers(96, 193))
+        w = int(rng.integers(256, 641))
+        y = int(rng.integers(40, 480))
+        x = int(rng.integers(0, 200))
+        regions.append((f"SID-{i % 8}", np.ascontiguousarray(frame[y:y + h, x:x + w]), (x, y)))
+    return regions
+
+
+def pick_engine(args):
+    if args.engine == "auto":
+        engine = build_engine()
+        try:
+            engine.image_to_data(np.full((32, 32), 255, dtype=np.uint8), 6)
+            return CountingEngine(engine), False
+        except Exception:
+            pass
+    return CostModelEngine(args.call_overhead_ms, args.mpixel_ms), True
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--regions", type=int, default=64)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 4, 8, 16, 32])
+    parser.add_argument("--engine", choices=["auto", "model"], default="auto")
+    parser.add_argument("--call-overhead-ms", type=float, default=80.0)
+    parser.add_argument("--mpixel-ms", type=float, default=250.0)
+    args = parser.parse_args()
+
+    regions = text_regions(args.regions)
+    engine, modelled = pick_engine(args)
+    report = {
+        "engine": engine.name,
+        "modelled": modelled,
+        "regions": len(regions),
+        "results": [],
+    }
+    if modelled:
+        report["model"] = {"call_overhead_ms": args.call_overhead_ms, "mpixel_ms": args.mpixel_ms}
+
+    baseline = None
+    for batch_size in args.batch_sizes:
+        detector = OCRDetector(engine=engine)
+        engine.calls = 0
+        with_words = 0
+        started = time.perf_counter()
+        for i in range(0, len(regions), batch_size):
+            results = detector.recognize_batch(regions[i:i + batch_size])
+            with_words += sum(1 for words in results if words)
+        elapsed = time.perf_counter() - started
+        throughput = len(regions) / elapsed
+        baseline = baseline or throughput
+        report["results"].append({
+            "batch_size": batch_size,
+            ("modelled_regions_per_s" if modelled else "regions_per_s"): round(throughput, 2),
+            ("modelled_speedup" if modelled else "speedup"): round(throughput / baseline, 2),
+            "engine_calls": engine.calls,
+            "regions_with_words": round(with_words / len(regions), 3),
+        })
+
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""Accuracy versus latency of the OCR preprocessing pipelines.
+
+Usage:
+    python scripts/benchmarks/bench_preprocess.py [--resolution 1080p] [--noise 0 3 10 20] [--repeat 3]
+
+For every noise level a synthetic document frame is corrupted with Gaussian
+noise and binarised by each fixed pipeline (``none``, ``median``, ``nlm``)
+and by ``auto`` (the plan ``plan_preprocessing`` picks). Reported per run:
+
+- ``ms``: median preprocessing time (planning included for ``auto``);
+- ``ink_iou``: overlap of the binarised ink with the binarisation of the
+  noise-free frame, a tesseract-independent accuracy proxy;
+- ``word_recall``: share of the rendered words tesseract reads back, when a
+  tesseract binary is available.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import sys
+import time
+
+import cv2
+import numpy as np
+
+from synthetic import RESOLUTIONS, add_visual_path
+
+add_visual_path()
+
+from ocr_preprocess import DENOISE_METHODS, apply_plan, plan_preprocessing  # noqa: E402
+
+
+def ink_iou(binary: np.ndarray, reference: np.ndarray) -> float:
+    ink, ref = binary == 0, reference == 0
+    union = np.count_nonzero(ink | ref)
+    return float(np.count_nonzero(ink & ref)) / union if union else 1.0
+
+
+def tesseract_words(binary: np.ndarray, psm: int):
+    try:
+        import pytesseract
+
+        text = pytesseract.image_to_string(binary, config=f"--oem 3 --psm {psm}")
+    except Exception:
+        return None
+    return set(text.split())
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--resolution", default="1080p", choices=sorted(RESOLUTIONS))
+    parser.add_argument("--noise", type=float, nargs="+", default=[0.0, 3.0, 10.0, 20.0])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    lines = [f"account {1000 + i} password hunter{i} token {i * 7919}" for i in range(10)]
+    clean = np.full((RESOLUTIONS[args.resolution][1], RESOLUTIONS[args.resolution][0], 3), 245, np.uint8)
+    scale = max(0.6, clean.shape[0] / 1080.0)
+    for i, line in enumerate(lines):
+        cv2.putText(clean, line, (40, int(40 * scale) * (i + 2)), cv2.FONT_HERSHEY_SIMPLEX, scale, (20, 20, 20), 2)
+    clean = cv2.cvtColor(clean, cv2.COLOR_BGR2GRAY)
+    _, reference = cv2.threshold(clean, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    expected = {word for line in lines for word in line.split()}
+
+    rng = np.random.default_rng(0)
+    report = {"resolution": args.resolution, "runs": []}
+    for sigma in args.noise:
+        noisy = np.clip(clean + rng.normal(0.0, sigma, clean.shape), 0, 255).astype(np.uint8)
+        auto_plan = plan_preprocessing(noisy)
+        for pipeline in DENOISE_METHODS + ("auto",):
+            def run():
+                plan = plan_preprocessing(noisy) if pipeline == "auto" else auto_plan._replace(denoise=pipeline)
+                return apply_plan(noisy, plan)[0], plan
+
+            samples = []
+            for _ in range(max(1, args.repeat)):
+                started = time.perf_counter()
+                binary, plan = run()
+                samples.append((time.perf_counter() - started) * 1000.0)
+            words = tesseract_words(binary, plan.psm)
+            report["runs"].append({
+                "noise_sigma": sigma,
+                "pipeline": pipeline if pipeline != "auto" else f"auto:{plan.denoise}",
+                "estimated_sigma": round(plan.noise_sigma, 2),
+                "ms": round(statistics.median(samples), 2),
+                "ink_iou": round(ink_iou(binary, reference), 3),
+                "word_recall": round(len(words & expected) / len(expected), 3) if words is not None else None,
+            })
+
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""Latency and recall trade-off of the reduced-resolution pre-screens.
+
+Usage:
+    python scripts/benchmarks/bench_prescreen.py [--size 1080p] [--factors 2 4 8] [--entropy 0.5 1.0 2.0]
+
+Stego: PNG-encoded covers (natural, UI, document, terminal), each clean and
+with LSB embedding at 100% and 10% of samples. For every pre-screen factor
+and entropy threshold, ``StegoDetector.process`` on the encoded bytes is
+compared with the full-resolution detector (pre-screen disabled):
+
+- ``stego_recall``: share of embedded frames the full detector flags that
+  are still flagged with the pre-screen;
+- ``skip_rate``: share of all frames answered by the pre-screen alone;
+- ``mean_ms`` against ``full_mean_ms``: end-to-end latency from bytes.
+
+OCR: the text-presence decision on the reduced decode versus the labels of
+``synthetic.labeled_frames`` (PNG and JPEG), and its latency against a
+full-resolution grayscale decode. Tesseract itself is not run.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import sys
+import time
+
+import cv2
+
+from synthetic import RESOLUTIONS, add_visual_path, embed_lsb, labeled_frames, natural_frame, terminal_frame, text_frame, ui_frame
+
+add_visual_path()
+
+from decoded_image import DecodedImage  # noqa: E402
+from ocr_stego import StegoDetector  # noqa: E402
+from text_prefilter import TextPrefilter  # noqa: E402
+
+
+def stego_set(size):
+    covers = {
+        "natural": natural_frame(size),
+        "ui": ui_frame(size),
+        "document": text_frame(size),
+        "terminal": terminal_frame(size),
+    }
+    for name, cover in covers.items():
+        yield False, f"{name}/clean", cv2.imencode(".png", cover)[1].tobytes()
+        for rate in (1.0, 0.1):
+            yield True, f"{name}/lsb{int(rate * 100)}", cv2.imencode(".png", embed_lsb(cover, rate, seed=7))[1].tobytes()
+
+
+def run_stego(frames, detector):
+    flagged, skipped, times = {}, 0, []
+    for _, name, data in frames:
+        started = time.perf_counter()
+        result = detector.process("bench", DecodedImage.from_bytes(data))
+        times.append((time.perf_counter() - started) * 1000.0)
+        flagged[name] = bool(result.get("suspicious"))
+        skipped += bool(result.get("prescreened"))
+    return flagged, skipped, statistics.mean(times)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", choices=sorted(RESOLUTIONS), default="1080p")
+    parser.add_argument("--factors", type=int, nargs="+", default=[2, 4, 8])
+    parser.add_argument("--entropy", type=float, nargs="+", default=[0.5, 1.0, 2.0])
+    args = parser.parse_args()
+    size = RESOLUTIONS[args.size]
+
+    frames = list(stego_set(size))
+    full_flagged, _, full_ms = run_stego(frames, StegoDetector(prescreen_factor=0))
+    positives = [name for label, name, _ in frames if label and full_flagged[name]]
+    stego = []
+    for factor in args.factors:
+        for threshold in args.entropy:
+            detector = StegoDetector(prescreen_factor=factor, prescreen_entropy=threshold)
+            flagged, skipped, mean_ms = run_stego(frames, detector)
+            stego.append({
+                "factor": factor,
+                "entropy_threshold": threshold,
+                "stego_recall": round(sum(flagged[n] for n in positives) / max(1, len(positives)), 3),
+                "missed": [n for n in positives if not flagged[n]],
+                "flagged_clean": [n for label, n, _ in frames if not label and flagged[n]],
+                "skip_rate": round(skipped / len(frames), 3),
+                "mean_ms": round(mean_ms, 1),
+                "full_mean_ms": round(full_ms, 1),
+            })
+
+    prefilter = TextPrefilter()
+    labeled = [(label, name, img) for label, name, img in labeled_frames(sizes=(args.size,))]
+    ocr = []
+    for ext in (".png", ".jpg"):
+        encoded = [(label, name, cv2.imencode(ext, img)[1].tobytes()) for label, name, img in labeled]
+        full_times = []
+        for _, _, data in encoded:
+            started = time.perf_counter()
+            prefilter.likely_text(DecodedImage.from_bytes(data).gray)
+            full_times.append((time.perf_counter() - started) * 1000.0)
+        for factor in args.factors:
+            passed, times = {}, []
+            for _, name, data in encoded:
+                started = time.perf_counter()
+                passed[name] = prefilter.likely_text(DecodedImage.from_bytes(data).reduced_gray(factor))
+                times.append((time.perf_counter() - started) * 1000.0)
+            with_text = [n for label, n, _ in encoded if label]
+            without_text = [n for label, n, _ in encoded if not label]
+            ocr.append({
+                "format": ext[1:],
+                "factor": factor,
+                "text_recall": round(sum(passed[n] for n in with_text) / len(with_text), 3),
+                "missed": [n for n in with_text if not passed[n]],
+                "skip_rate_text_free": round(sum(not passed[n] for n in without_text) / len(without_text), 3),
+                "prescreen_ms": round(statistics.mean(times), 1),
+                "full_decode_prefilter_ms": round(statistics.mean(full_times), 1),
+            })
+
+    json.dump({"size": args.size, "stego": stego, "ocr": ocr}, sys.stdout, indent=2)
+    sys.stdout.write("\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
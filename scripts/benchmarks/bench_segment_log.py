@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""Visual chunk persistence: one file per chunk versus the segment log.
+
+Usage:
+    python scripts/benchmarks/bench_segment_log.py [--records 20000 100000] [--tail 5]
+
+For each record count, writes that many chunk metadata records the old way
+(one small text file per chunk, as ``_persist_visual_chunk`` used to) and
+through ``shared.segment_log.SegmentLog``, then times what the forensics
+collector does: fetch the last ``--tail`` records (``iterdir`` + sort + read
+for the file layout, an index tail read for the log). Runs in a temporary
+directory on the same filesystem as ``$TMPDIR``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from synthetic import ROOT
+
+sys.path.insert(0, ROOT)
+
+from shared.segment_log import SegmentLog  # noqa: E402
+
+
+def record(i: int) -> dict:
+    return {
+        "session_id": "bench",
+        "timestamp": f"2025-11-23T00:{i // 60000 % 60:02d}:{i // 1000 % 60:02d}.{i % 1000:03d}000Z",
+        "direction": "client_to_server",
+        "length": 1000 + i % 5000,
+    }
+
+
+def write_files(directory: Path, count: int) -> float:
+    directory.mkdir(parents=True)
+    started = time.perf_counter()
+    for i in range(count):
+        r = record(i)
+        ts_safe = r["timestamp"].replace(":", "-").replace(".", "-")
+        dest = directory / f"visual_{ts_safe}_{r['length']}.txt"
+        if not dest.exists():
+            dest.write_text(
+                f"session_id={r['session_id']}\ntimestamp={r['timestamp']}\n"
+                f"direction={r['direction']}\nlength={r['length']}\n",
+                encoding="utf-8",
+            )
+    return time.perf_counter() - started
+
+
+def write_log(directory: Path, count: int) -> float:
+    started = time.perf_counter()
+    with SegmentLog(directory) as log:
+        for i in range(count):
+            log.append(json.dumps(record(i)).encode("utf-8"), ts=1_700_000_000.0 + i / 1000.0)
+    return time.perf_counter() - started
+
+
+def collect_files(directory: Path, n: int) -> float:
+    started = time.perf_counter()
+    files = sorted([p for p in directory.iterdir() if p.is_file()])[-n:]
+    for p in files:
+        p.read_bytes()
+    return time.perf_counter() - started
+
+
+def collect_log(directory: Path, n: int) -> float:
+    started = time.perf_counter()
+    SegmentLog(directory).tail(n)
+    return time.perf_counter() - started
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--records", type=int, nargs="+", default=[20000, 100000])
+    parser.add_argument("--tail", type=int, default=5)
+    args = parser.parse_args()
+
+    results = []
+    for count in args.records:
+        base = Path(tempfile.mkdtemp(prefix="bench_segment_log_"))
+        try:
+            files_write = write_files(base / "files", count)
+            log_write = write_log(base / "log", count)
+            files_collect = min(collect_files(base / "files", args.tail) for _ in range(3))
+            log_collect = min(collect_log(base / "log", args.tail) for _ in range(3))
+            results.append({
+                "records": count,
+                "files_writes_per_s": round(count / files_write),
+                "log_writes_per_s": round(count / log_write),
+                "files_collect_ms": round(files_collect * 1000.0, 2),
+                "log_collect_ms": round(log_collect * 1000.0, 3),
+                "files_on_disk": count,
+                "log_files_on_disk": len(list((base / "log").iterdir())),
+            })
+        finally:
+            shutil.rmtree(base, ignore_errors=True)
+    json.dump(results, sys.stdout, indent=2)
+    sys.stdout.write("\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""Per-image latency of the vectorised steganalysis engine.
+
+Usage:
+    python scripts/benchmarks/bench_steganalysis.py [--repeat 5] [--target-1080p-ms 100] [--target-4k-ms 400]
+
+Exits non-zero when the median latency misses a target, so it can gate CI.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import sys
+import time
+
+from synthetic import RESOLUTIONS, add_visual_path, natural_frame, stego_frame
+
+add_visual_path()
+
+import steganalysis  # noqa: E402
+
+
+def time_analyze(image, repeat: int) -> float:
+    steganalysis.analyze(image)  # warm-up
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        steganalysis.analyze(image)
+        samples.append((time.perf_counter() - started) * 1000.0)
+    return statistics.median(samples)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--target-1080p-ms", type=float, default=100.0)
+    parser.add_argument("--target-4k-ms", type=float, default=400.0)
+    args = parser.parse_args()
+
+    targets = {"1080p": args.target_1080p_ms, "4k": args.target_4k_ms}
+    report = {}
+    ok = True
+    for name, target in targets.items():
+        size = RESOLUTIONS[name]
+        clean = natural_frame(size)
+        stego = stego_frame(size, rate=1.0)
+        median_ms = time_analyze(clean, args.repeat)
+        clean_stats = steganalysis.analyze(clean)
+        stego_stats = steganalysis.analyze(stego)
+        report[name] = {
+            "median_ms": round(median_ms, 1),
+            "target_ms": target,
+            "clean": {"chi2_p": clean_stats["chi2_p"], "spa_rate": clean_stats["spa_rate"]},
+            "stego": {"chi2_p": stego_stats["chi2_p"], "spa_rate": stego_stats["spa_rate"]},
+        }
+        ok = ok and median_ms <= target
+
+    print(json.dumps(report, indent=2))
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
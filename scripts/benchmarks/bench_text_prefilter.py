@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""Skip rate and missed-detection rate of the OCR text-presence prefilter.
+
+Usage:
+    python scripts/benchmarks/bench_text_prefilter.py [--min-blobs 1 2 4] [--edge-thresh 32]
+
+Runs the prefilter over a labeled synthetic set (frames with and without
+text, see ``synthetic.labeled_frames``) for each ``min_blobs`` threshold:
+
+- ``skip_rate``: share of all frames that would bypass tesseract;
+- ``missed_rate``: share of frames *with* text that would be skipped;
+- ``false_pass``: text-free frames that would still be OCRed.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import sys
+import time
+
+import cv2
+
+from synthetic import add_visual_path, labeled_frames
+
+add_visual_path()
+
+from text_prefilter import TextPrefilter  # noqa: E402
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--min-blobs", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--edge-thresh", type=int, default=32)
+    args = parser.parse_args()
+
+    frames = [(label, name, cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)) for label, name, img in labeled_frames()]
+    scorer = TextPrefilter(edge_threshold=args.edge_thresh)
+    timings, blobs = [], {}
+    for _, name, gray in frames:
+        started = time.perf_counter()
+        blobs[name] = scorer.features(gray)["text_blobs"]
+        timings.append((time.perf_counter() - started) * 1000.0)
+
+    with_text = [name for label, name, _ in frames if label]
+    without_text = [name for label, name, _ in frames if not label]
+    report = {
+        "frames": len(frames),
+        "prefilter_ms_p50": round(statistics.median(timings), 2),
+        "prefilter_ms_max": round(max(timings), 2),
+        "thresholds": [],
+    }
+    for min_blobs in args.min_blobs:
+        skipped = {name for name, count in blobs.items() if count < min_blobs}
+        missed = [name for name in with_text if name in skipped]
+        report["thresholds"].append({
+            "min_blobs": min_blobs,
+            "skip_rate": round(len(skipped) / len(frames), 3),
+            "missed_rate": round(len(missed) / len(with_text), 3),
+            "missed": missed,
+            "false_pass": [name for name in without_text if name not in skipped],
+        })
+
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""Per-stage latency and peak memory of OCRDetector and StegoDetector.
+
+Usage:
+    python scripts/benchmarks/bench_visual.py [--sizes 720p 1080p 4k] [--repeat 20] [--output results.json]
+
+Synthetic screenshots at each resolution, PNG-encoded like the snapshots the
+detector writes:
+
+- ``text``: document window full of credential-like lines;
+- ``blank``: flat background;
+- ``noisy``: uniform random pixels;
+- ``stego_lsb``: natural frame with LSB embedding in every sample;
+- ``stego_appended``: natural frame with 5000 random bytes appended after
+  ``IEND`` (the payload shape of
+  ``scripts/test_bed/attack_scripts/steganography_exfil.py``).
+
+Stages, timed separately on each frame ``--repeat`` times:
+
+- ``decode``: encoded bytes to grayscale (``DecodedImage``);
+- ``preprocess``: text prefilter, noise estimate and the chosen
+  scale/denoise/binarise plan;
+- ``ocr``: one engine call on the preprocessed image (reported as
+  unavailable when no tesseract backend is installed);
+- ``match``: keyword/pattern scan of the OCR text (of the rendered text when
+  OCR is unavailable);
+- ``stego``: ``StegoDetector.detect_stego`` on the shared decode, container
+  scan and pre-screen included.
+
+Latencies are p50/p95/p99 in milliseconds. Peak memory per frame is measured
+with ``tracemalloc`` in a separate untimed pass (tracing slows allocation),
+and covers Python and NumPy allocations. The JSON carries the commit and
+library versions so runs can be diffed across commits.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import cv2
+import numpy as np
+
+from synthetic import ROOT, RESOLUTIONS, add_visual_path, blank_frame, natural_frame, noisy_frame, stego_frame, text_frame
+
+add_visual_path()
+
+from decoded_image import DecodedImage  # noqa: E402
+from ocr_stego import OCRDetector, StegoDetector  # noqa: E402
+from text_prefilter import TextPrefilter  # noqa: E402
+
+STAGES = ("decode", "preprocess", "ocr", "match", "stego")
+
+
+def rendered_text(lines: int = 12) -> str:
+    """Text of the kind ``text_frame`` draws, for the match stage without OCR."""
+
+    return "\n".join(f"Line {i} account {48213377 + i} password: hunter{i}" for i in range(lines))
+
+
+def frame_set(size):
+    rng = np.random.default_rng(5000)
+    appended = cv2.imencode(".png", natural_frame(size))[1].tobytes() + rng.integers(0, 256, 5000, dtype=np.uint8).tobytes()
+    return {
+        "text": (cv2.imencode(".png", text_frame(size))[1].tobytes(), rendered_text()),
+        "blank": (cv2.imencode(".png", blank_frame(size))[1].tobytes(), ""),
+        "noisy": (cv2.imencode(".png", noisy_frame(size))[1].tobytes(), ""),
+        "stego_lsb": (cv2.imencode(".png", stego_frame(size))[1].tobytes(), ""),
+        "stego_appended": (appended, ""),
+    }
+
+
+def ocr_available(ocr: OCRDetector):
+    try:
+        ocr.engine.image_to_data(np.full((32, 32), 255, dtype=np.uint8), 6)
+    except Exception as exc:
+        return False, f"{type(exc).__name__}: {exc}"[:200]
+    return True, None
+
+
+def run_pipeline(data: bytes, fallback_text: str, ocr: OCRDetector, stego: StegoDetector, use_ocr: bool, timings=None):
+    """One frame through every stage; appends per-stage milliseconds to ``timings``."""
+
+    def timed(stage, fn, *args):
+        started = time.perf_counter()
+        out = fn(*args)
+        if timings is not None:
+            timings[stage].append((time.perf_counter() - started) * 1000.0)
+        return out
+
+    started_all = time.perf_counter()
+    image = DecodedImage.from_bytes(data, source="bench.png")
+    gray = timed("decode", lambda: image.gray)
+
+    def preprocess():
+        if not ocr.prefilter.likely_text(gray):
+            return None
+        return ocr.preprocess_gray(gray)
+
+    prepared = timed("preprocess", preprocess)
+    text = fallback_text
+    if use_ocr and prepared is not None:
+        processed, scale = prepared
+        words = timed("ocr", ocr.extract_words, processed, scale)
+        text = ocr._summarise(words)[0]
+    timed("match", ocr.matcher.scan, text)
+    timed("stego", stego.detect_stego, image)
+    if timings is not None:
+        timings["total"].append((time.perf_counter() - started_all) * 1000.0)
+
+
+def percentiles(samples):
+    if not samples:
+        return None
+    p50, p95, p99 = np.percentile(samples, [50, 95, 99])
+    return {"p50": round(float(p50), 3), "p95": round(float(p95), 3), "p99": round(float(p99), 3), "n": len(samples)}
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", nargs="+", default=["720p", "1080p", "4k"], choices=sorted(RESOLUTIONS))
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--output", help="write the JSON report here as well as to stdout")
+    args = parser.parse_args()
+
+    # OCR stages are called directly, so the reduced-resolution pre-screen
+    # and per-session frame diffing are bypassed and every frame reaches the
+    # text prefilter. Steganalysis runs as deployed, pre-screen included.
+    ocr = OCRDetector(prefilter=TextPrefilter(), prescreen_factor=0)
+    stego = StegoDetector()
+    use_ocr, ocr_error = ocr_available(ocr)
+
+    results = {}
+    for res in args.sizes:
+        for kind, (data, fallback_text) in frame_set(RESOLUTIONS[res]).items():
+            run_pipeline(data, fallback_text, ocr, stego, use_ocr)  # warm-up
+            timings = {stage: [] for stage in (*STAGES, "total")}
+            for _ in range(args.repeat):
+                run_pipeline(data, fallback_text, ocr, stego, use_ocr, timings)
+
+            tracemalloc.start()
+            run_pipeline(data, fallback_text, ocr, stego, use_ocr)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            results[f"{res}/{kind}"] = {
+                "encoded_bytes": len(data),
+                "stages_ms": {stage: percentiles(timings[stage]) for stage in STAGES},
+                "total_ms": percentiles(timings["total"]),
+                "peak_mem_mib": round(peak / 2**20, 2),
+            }
+
+    report = {
+        "benchmark": "visual_detector",
+        "commit": git_commit(),
+        "created": datetime.now(timezone.utc).isoformat(),
+        "repeat": args.repeat,
+        "environment": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "opencv": cv2.__version__,
+            "cpus": os.cpu_count(),
+            "ocr_engine": type(ocr.engine).__name__,
+            "ocr_available": use_ocr,
+            "ocr_error": ocr_error,
+        },
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,140 @@
+"""Synthetic screen frames for the visual detector benchmarks.
+
+All generators are deterministic for a given seed so runs are comparable.
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+from typing import Tuple
+
+import cv2
+import numpy as np
+
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+VISUAL_DIR = os.path.join(ROOT, "detectors", "visual")
+
+RESOLUTIONS = {
+    "720p": (1280, 720),
+    "1080p": (1920, 1080),
+    "1440p": (2560, 1440),
+    "4k": (3840, 2160),
+}
+
+
+def add_visual_path() -> None:
+    """Make ``detectors/visual`` importable the way uvicorn runs it."""
+
+    if VISUAL_DIR not in sys.path:
+        sys.path.insert(0, VISUAL_DIR)
+
+
+def natural_frame(size: Tuple[int, int], seed: int = 0) -> np.ndarray:
+    """Smooth gradients plus mild noise: photo/wallpaper-like BGR content."""
+
+    width, height = size
+    rng = np.random.default_rng(seed)
+    yy, xx = np.mgrid[0:height, 0:width].astype(np.float32)
+    base = np.stack(
+        [
+            96 + 64 * np.sin(xx / 97.0 + seed),
+            128 + 48 * np.cos(yy / 71.0),
+            112 + 40 * np.sin((xx + yy) / 131.0),
+        ],
+        axis=-1,
+    )
+    base += rng.normal(0.0, 6.0, size=base.shape).astype(np.float32)
+    return np.clip(base, 0, 255).astype(np.uint8)
+
+
+def text_frame(size: Tuple[int, int], lines: int = 12, seed: int = 0, text: str | None = None) -> np.ndarray:
+    """White document window with dark text rows."""
+
+    width, height = size
+    rng = np.random.default_rng(seed)
+    frame = np.full((height, width, 3), 245, dtype=np.uint8)
+    scale = max(0.6, height / 1080.0)
+    step = int(40 * scale)
+    for i in range(lines):
+        line = text if text is not None else f"Line {i} account {rng.integers(10**7, 10**8)} password: hunter{i}"
+        cv2.putText(frame, line, (int(40 * scale), step * (i + 2)), cv2.FONT_HERSHEY_SIMPLEX, scale, (20, 20, 20), 2)
+    return frame
+
+
+def blank_frame(size: Tuple[int, int], value: int = 32) -> np.ndarray:
+    width, height = size
+    return np.full((height, width, 3), value, dtype=np.uint8)
+
+
+def noisy_frame(size: Tuple[int, int], seed: int = 0) -> np.ndarray:
+    width, height = size
+    rng = np.random.default_rng(seed)
+    return rng.integers(0, 256, size=(height, width, 3), dtype=np.uint8)
+
+
+def embed_lsb(image: np.ndarray, rate: float, seed: int = 0) -> np.ndarray:
+    """LSB replacement of a random message in ``rate`` of the samples."""
+
+    rng = np.random.default_rng(seed)
+    out = image.copy()
+    flat = out.reshape(-1)
+    count = int(flat.size * rate)
+    idx = rng.choice(flat.size, size=count, replace=False) if count < flat.size else np.arange(flat.size)
+    bits = rng.integers(0, 2, size=idx.size, dtype=np.uint8)
+    flat[idx] = (flat[idx] & 0xFE) | bits
+    return out
+
+
+def stego_frame(size: Tuple[int, int], rate: float = 1.0, seed: int = 0) -> np.ndarray:
+    return embed_lsb(natural_frame(size, seed), rate, seed + 1)
+
+
+def terminal_frame(size: Tuple[int, int], lines: int = 20, seed: int = 0) -> np.ndarray:
+    """Light monospace text on a dark background."""
+
+    width, height = size
+    rng = np.random.default_rng(seed)
+    frame = np.full((height, width, 3), 30, dtype=np.uint8)
+    scale = max(0.5, height / 1440.0)
+    step = max(12, int(30 * scale))
+    for i in range(min(lines, height // step - 1)):
+        line = f"$ export AWS_SECRET_ACCESS_KEY={rng.integers(10**9, 10**10)}"
+        cv2.putText(frame, line, (10, step * (i + 1)), cv2.FONT_HERSHEY_PLAIN, 2 * scale, (200, 200, 200), 1)
+    return frame
+
+
+def ui_frame(size: Tuple[int, int], seed: int = 0) -> np.ndarray:
+    """Window chrome without text: panels, buttons and icons."""
+
+    width, height = size
+    rng = np.random.default_rng(seed)
+    frame = np.full((height, width, 3), 225, dtype=np.uint8)
+    cv2.rectangle(frame, (0, 0), (width, height // 20), (60, 60, 70), -1)
+    for _ in range(12):
+        x, y = int(rng.integers(0, width - 200)), int(rng.integers(height // 10, height - 120))
+        w, h = int(rng.integers(80, 200)), int(rng.integers(40, 120))
+        color = tuple(int(c) for c in rng.integers(40, 200, size=3))
+        cv2.rectangle(frame, (x, y), (x + w, y + h), color, -1)
+        cv2.circle(frame, (x + w // 2, y + h // 2), min(w, h) // 4, (250, 250, 250), -1)
+    return frame
+
+
+def labeled_frames(sizes=("720p", "1080p", "4k"), seed: int = 0):
+    """Yield ``(has_text, name, bgr_frame)`` for the OCR prefilter benchmark."""
+
+    for res in sizes:
+        size = RESOLUTIONS[res]
+        yield True, f"{res}/document", text_frame(size, seed=seed)
+        yield True, f"{res}/single_word", text_frame(size, lines=1, text="pwd: x")
+        yield True, f"{res}/terminal", terminal_frame(size, seed=seed)
+        overlay = natural_frame(size, seed)
+        cv2.putText(overlay, "token=8f3e21", (size[0] // 4, size[1] // 2), cv2.FONT_HERSHEY_SIMPLEX,
+                    max(0.8, size[1] / 900.0), (255, 255, 255), 2)
+        yield True, f"{res}/text_on_photo", overlay
+        yield False, f"{res}/blank", blank_frame(size)
+        yield False, f"{res}/photo", natural_frame(size, seed)
+        yield False, f"{res}/ui_chrome", ui_frame(size, seed)
+        yield False, f"{res}/noise", noisy_frame(size, seed)
+        yield False, f"{res}/stego", stego_frame(size, seed=seed)
@@ -0,0 +1,172 @@
+"""Event contracts shared by the dispatcher, detectors, risk and response engines.
+
+One definition of each model travels every hop:
+
+```text
+proxy --ProxyEvent--> dispatcher --ProxyEvent--> detector
+detector --DetectorEvent (batched)--> risk engine --Incident--> response engine
+```
+
+Services narrow a field where they accept less (a detector's ``ProxyEvent``
+subclass pins ``stream`` to its own stream) but never redefine a model.
+
+Validation itself is cheap: pydantic compiles each model's validator and
+serializer once, when the class is created. What each hop paid for was
+JSON handling in Python around it. FastAPI parses request bodies with
+``json.loads`` before validating the dicts, and runs responses through
+``jsonable_encoder``, a recursive Python walk that costs hundreds of
+microseconds for an incident carrying its events. httpx's ``json=`` goes
+through ``json.dumps(model_dump())``. The helpers here keep both directions
+in compiled code:
+
+- ``Contract.decode`` validates straight from request bytes
+  (``model_validate_json``), and ``json_body(Model)`` wires that into a
+  FastAPI endpoint with the usual 422 on invalid input;
+- ``Contract.encode`` serializes with the model's compiled serializer;
+  ``dumps`` handles any response (plain data through ``orjson`` when it is
+  installed, models through pydantic), and ``ContractResponse`` returns
+  pre-encoded bytes so FastAPI skips ``jsonable_encoder``;
+- ``Contract.trusted`` builds a model without validating it, for values the
+  process computed itself (a detector's own verdict, an incident built from
+  events that were validated on the way in). Anything read off the wire goes
+  through ``decode``.
+
+``scripts/benchmarks/bench_contracts.py`` measures the per-event cost of each
+hop both ways.
+"""
+
+from __future__ import annotations
+
+import json
+import uuid
+from typing import Any, Dict, List, Literal, Optional, Type, TypeVar, Union
+
+import pydantic_core
+from fastapi import Depends, Request
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import Response
+from pydantic import BaseModel, Field, ValidationError
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speed-up
+    orjson = None
+
+
+C = TypeVar("C", bound="Contract")
+
+
+class Contract(BaseModel):
+    """Base for wire models: bytes in, bytes out, and a trusted constructor."""
+
+    @classmethod
+    def decode(cls: Type[C], data: Union[bytes, str]) -> C:
+        """Validate a JSON document without building Python dicts first."""
+
+        return cls.model_validate_json(data)
+
+    @classmethod
+    def trusted(cls: Type[C], **fields: Any) -> C:
+        """Build without validation (``model_construct``); defaults are filled in as usual.
+
+        Only for values produced in this process: nothing is checked, so a
+        wrong type here surfaces at the next hop's ``decode`` instead.
+        """
+
+        return cls.model_construct(**fields)
+
+    def encode(self) -> bytes:
+        return self.__pydantic_serializer__.to_json(self)
+
+
+class ProxyEvent(Contract):
+    session_id: str = Field(..., description="Session identifier from proxy")
+    ts: str = Field(..., description="ISO-8601 timestamp from proxy")
+    stream: Literal["network_stream", "app_stream", "visual_stream"]
+    direction: Literal["client_to_server", "server_to_client"]
+    type: Literal["raw_chunk"]
+    length: int = Field(..., ge=0)
+    payload_b64: Optional[str] = Field(None, description="Base64 chunk bytes, when the proxy forwards them")
+    seq: Optional[int] = Field(None, ge=0, description="Chunk number within the session and direction")
+
+
+class ProxyEventBatch(Contract):
+    events: List[ProxyEvent]
+
+
+class DetectorEvent(Contract):
+    event_id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    session_id: str
+    timestamp: str
+    detector: Literal["network", "app", "visual"]
+    type: str
+    confidence: float = Field(..., ge=0.0, le=1.0)
+    details: Dict[str, object] = Field(default_factory=dict)
+    artifact_refs: List[str] = Field(default_factory=list)
+
+
+class DetectorEventBatch(Contract):
+    events: List[DetectorEvent]
+
+
+class Incident(Contract):
+    incident_id: str
+    session_id: str
+    risk_score: int
+    risk_level: Literal["LOW", "MEDIUM", "HIGH"]
+    events: List[DetectorEvent]
+    # The risk engine recommends allow/deceive/kill_session; "deception_mode"
+    # is the response engine's alias for deceive.
+    recommended_action: Literal["allow", "deceive", "kill_session", "deception_mode"]
+    artifact_refs: List[str] = Field(default_factory=list)
+
+
+# --- JSON helpers -----------------------------------------------------------
+
+
+def dumps(obj: Any) -> bytes:
+    """Serialize a model, or plain data that may contain models, to JSON bytes."""
+
+    if isinstance(obj, BaseModel):
+        return obj.__pydantic_serializer__.to_json(obj)
+    if orjson is not None:
+        return orjson.dumps(obj, default=pydantic_core.to_jsonable_python)
+    return pydantic_core.to_json(obj)
+
+
+def loads(data: Union[bytes, str]) -> Any:
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+
+class ContractResponse(Response):
+    """JSON response rendered by ``dumps`` instead of ``jsonable_encoder``.
+
+    Return it from the endpoint (FastAPI only skips its own encoding for
+    ``Response`` instances, not for ``response_class``).
+    """
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def json_body(model: Type[C]) -> Any:
+    """Endpoint parameter default that decodes the request body as ``model``.
+
+    ``event: ProxyEvent = json_body(ProxyEvent)`` behaves like a plain body
+    parameter (422 with pydantic's error list on bad input) but validates the
+    raw bytes in one pass.
+    """
+
+    async def decode_body(request: Request) -> C:
+        try:
+            return model.decode(await request.body())
+        except ValidationError as exc:
+            errors = [{**error, "loc": ("body", *error["loc"])} for error in exc.errors(include_url=False)]
+            raise RequestValidationError(errors) from None
+
+    return Depends(decode_body)
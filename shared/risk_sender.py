@@ -0,0 +1,306 @@
+"""Background, batched delivery of detector events to the risk engine.
+
+Posting each event from inside the detector's request handler costs a new
+connection per event and puts every retry backoff on the proxy's
+``/events`` call whenever the risk engine is slow. ``RiskSender`` keeps
+delivery off the request path:
+
+- ``submit`` queues the event and returns immediately; once
+  ``RISK_SENDER_QUEUE_SIZE`` events are waiting, further events are dropped
+  and counted, never waited for;
+- ``RISK_SENDER_WORKERS`` background tasks each drain their own queue,
+  collecting up to ``RISK_SENDER_BATCH_SIZE`` events (waiting
+  ``RISK_SENDER_BATCH_WAIT`` seconds for more) into one
+  ``POST <RISK_ENGINE_URL>/batch`` over a single pooled client. Events are
+  assigned to a worker by ``session_id``;
+- failed batches (connection errors, timeouts, 5xx) are retried up to
+  ``RISK_SENDER_MAX_ATTEMPTS`` times with full-jitter exponential backoff,
+  in the worker, so retries cost the handler nothing;
+- a risk engine without the batch endpoint (404/405) is detected once and
+  events are then posted one by one to ``RISK_ENGINE_URL``; a retry resumes
+  after the last event that got a reply;
+- a batch rejected with another 4xx (e.g. a 422 for one malformed event) is
+  re-sent one event at a time, so only the events the risk engine rejects
+  on their own are lost.
+
+Within a session, events reach the risk engine in the order they were
+submitted: all of a session's events go through one worker, which delivers
+one batch at a time (retries and one-by-one fallbacks included) before
+taking the next. The risk engine relies on this order, e.g. to collapse a
+``duplicate_of`` repeat into an event it has already seen. Events of
+different sessions may overtake each other.
+
+Delivery is at least once: a timed-out request may still have been
+ingested, so a retry can resend events. The risk engine drops events whose
+``event_id`` it has already ingested.
+
+Request bodies are encoded and replies decoded with ``shared.contracts``'
+``dumps``/``loads`` rather than httpx's stdlib ``json``.
+
+``on_result(event, response)`` is called with the risk engine's per-event
+response (e.g. to track session risk). ``start``/``stop`` belong in the
+service's lifespan; ``stop`` flushes what is queued within ``drain_timeout``.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import random
+import zlib
+from typing import Callable, Dict, List, Optional
+
+import httpx
+
+from shared.contracts import JSON_HEADERS, dumps, loads
+
+
+RISK_ENGINE_URL = os.getenv("RISK_ENGINE_URL", "http://localhost:9000/detector-events")
+RISK_SENDER_QUEUE_SIZE = int(os.getenv("RISK_SENDER_QUEUE_SIZE", "10000"))
+RISK_SENDER_WORKERS = int(os.getenv("RISK_SENDER_WORKERS", "2"))
+RISK_SENDER_BATCH_SIZE = int(os.getenv("RISK_SENDER_BATCH_SIZE", "64"))
+RISK_SENDER_BATCH_WAIT = float(os.getenv("RISK_SENDER_BATCH_WAIT", "0.02"))
+RISK_SENDER_MAX_ATTEMPTS = int(os.getenv("RISK_SENDER_MAX_ATTEMPTS", "4"))
+RISK_SENDER_BACKOFF = float(os.getenv("RISK_SENDER_BACKOFF", "0.25"))
+RISK_SENDER_BACKOFF_MAX = float(os.getenv("RISK_SENDER_BACKOFF_MAX", "5.0"))
+RISK_SENDER_TIMEOUT = float(os.getenv("RISK_SENDER_TIMEOUT", "10.0"))
+
+Event = Dict[str, object]
+ResultCallback = Callable[[Event, Dict[str, object]], None]
+
+
+class _Retryable(Exception):
+    pass
+
+
+class RiskSender:
+    """Bounded per-worker queues of detector events, drained in batches by background workers."""
+
+    def __init__(
+        self,
+        url: str = RISK_ENGINE_URL,
+        queue_size: int = RISK_SENDER_QUEUE_SIZE,
+        workers: int = RISK_SENDER_WORKERS,
+        batch_size: int = RISK_SENDER_BATCH_SIZE,
+        batch_wait: float = RISK_SENDER_BATCH_WAIT,
+        max_attempts: int = RISK_SENDER_MAX_ATTEMPTS,
+        backoff: float = RISK_SENDER_BACKOFF,
+        backoff_max: float = RISK_SENDER_BACKOFF_MAX,
+        timeout: float = RISK_SENDER_TIMEOUT,
+        on_result: Optional[ResultCallback] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        logger: Optional[logging.Logger] = None,
+    ) -> None:
+        self.url = url.rstrip("/")
+        self.batch_url = f"{self.url}/batch"
+        self.queue_size = max(1, queue_size)
+        self.workers = max(1, workers)
+        self.batch_size = max(1, batch_size)
+        self.batch_wait = max(0.0, batch_wait)
+        self.max_attempts = max(1, max_attempts)
+        self.backoff = max(0.0, backoff)
+        self.backoff_max = max(self.backoff, backoff_max)
+        self.timeout = timeout
+        self.on_result = on_result
+        self._transport = transport
+        self.logger = logger or logging.getLogger("risk_sender")
+        # One queue per worker; a session always maps to the same one.
+        self._queues: List[asyncio.Queue] = []
+        self._client: Optional[httpx.AsyncClient] = None
+        self._tasks: List[asyncio.Task] = []
+        self._batch_supported = True
+        self.stats: Dict[str, int] = {
+            "submitted": 0,
+            "sent": 0,
+            "rejected": 0,
+            "dropped": 0,
+            "failed": 0,
+            "batches": 0,
+            "retries": 0,
+        }
+
+    # ---- lifecycle -------------------------------------------------------
+
+    async def start(self) -> None:
+        if self._tasks:
+            return
+        # ``queue_size`` bounds all queues together (see ``submit``).
+        self._queues = [asyncio.Queue() for _ in range(self.workers)]
+        self._client = httpx.AsyncClient(
+            timeout=self.timeout,
+            limits=httpx.Limits(max_connections=self.workers, max_keepalive_connections=self.workers),
+            transport=self._transport,
+        )
+        self._tasks = [
+            asyncio.create_task(self._worker(queue), name=f"risk-sender-{i}") for i, queue in enumerate(self._queues)
+        ]
+
+    async def stop(self, drain_timeout: float = 5.0) -> None:
+        """Deliver what is queued (for at most ``drain_timeout`` s), then close the client."""
+
+        if not self._tasks:
+            return
+        try:
+            await asyncio.wait_for(asyncio.gather(*(queue.join() for queue in self._queues)), timeout=drain_timeout)
+        except asyncio.TimeoutError:
+            self.logger.warning("Risk sender stopped with %d events undelivered", self._queued())
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        await self._client.aclose()
+        self._client = None
+
+    def _queued(self) -> int:
+        return sum(queue.qsize() for queue in self._queues)
+
+    # ---- submitting ------------------------------------------------------
+
+    def submit(self, event) -> bool:
+        """Queue ``event`` (a pydantic model or dict) for delivery; never blocks.
+
+        Returns ``False`` when the event was dropped because ``queue_size``
+        events are already waiting or the sender is not running.
+        """
+
+        payload = event.model_dump() if hasattr(event, "model_dump") else dict(event)
+        if not self._queues:
+            self.stats["dropped"] += 1
+            return False
+        if self._queued() >= self.queue_size:
+            self.stats["dropped"] += 1
+            if self.stats["dropped"] % 1000 == 1:
+                self.logger.warning(
+                    "Risk sender queue full (%d); dropped %d events so far", self.queue_size, self.stats["dropped"]
+                )
+            return False
+        shard = zlib.crc32(str(payload.get("session_id", "")).encode("utf-8")) % len(self._queues)
+        self._queues[shard].put_nowait(payload)
+        self.stats["submitted"] += 1
+        return True
+
+    # ---- delivery --------------------------------------------------------
+
+    async def _next_batch(self, queue: asyncio.Queue) -> List[Event]:
+        batch = [await queue.get()]
+        self._drain_into(queue, batch)
+        if len(batch) < self.batch_size and self.batch_wait > 0:
+            # Give a burst a moment to fill the batch.
+            await asyncio.sleep(self.batch_wait)
+            self._drain_into(queue, batch)
+        return batch
+
+    def _drain_into(self, queue: asyncio.Queue, batch: List[Event]) -> None:
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(queue.get_nowait())
+            except asyncio.QueueEmpty:
+                return
+
+    async def _worker(self, queue: asyncio.Queue) -> None:
+        while True:
+            batch = await self._next_batch(queue)
+            try:
+                await self._deliver(batch)
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                self.stats["failed"] += len(batch)
+                self.logger.error("Risk sender dropped a batch of %d events: %s", len(batch), exc)
+            finally:
+                for _ in batch:
+                    queue.task_done()
+
+    async def _deliver(self, batch: List[Event]) -> None:
+        # Replies for batch[:len(done)] when posting one by one, kept across
+        # attempts so a retry does not resend what was already answered.
+        done: List[Optional[Dict[str, object]]] = []
+        for attempt in range(self.max_attempts):
+            try:
+                if self._batch_supported and not done:
+                    results = await self._post_batch(batch, done)
+                else:
+                    results = await self._post_each(batch, done)
+            except _Retryable as exc:
+                if attempt + 1 == self.max_attempts:
+                    self.stats["failed"] += len(batch) - len(done)
+                    self.logger.error(
+                        "Failed to deliver %d detector events after %d attempts: %s",
+                        len(batch) - len(done), self.max_attempts, exc,
+                    )
+                    self._account(batch[:len(done)], done)
+                    return
+                self.stats["retries"] += 1
+                # Full jitter: spreads the retries of concurrent workers.
+                await asyncio.sleep(random.uniform(0, min(self.backoff_max, self.backoff * 2 ** attempt)))
+                continue
+            self.stats["batches"] += 1
+            self._account(batch, results)
+            return
+
+    def _account(self, events: List[Event], results: List[Optional[Dict[str, object]]]) -> None:
+        accepted = sum(1 for result in results if result is not None)
+        self.stats["sent"] += accepted
+        self.stats["rejected"] += len(events) - accepted
+        if self.on_result is not None:
+            for event, result in zip(events, results):
+                if isinstance(result, dict):
+                    try:
+                        self.on_result(event, result)
+                    except Exception as exc:
+                        self.logger.warning("Risk sender result callback failed: %s", exc)
+
+    async def _post(self, url: str, payload) -> httpx.Response:
+        try:
+            resp = await self._client.post(url, content=dumps(payload), headers=JSON_HEADERS)
+        except (httpx.TransportError, httpx.TimeoutException) as exc:
+            raise _Retryable(f"{type(exc).__name__}: {exc}") from exc
+        if resp.status_code >= 500 or resp.status_code == 429:
+            raise _Retryable(f"risk engine returned {resp.status_code}")
+        return resp
+
+    async def _post_batch(
+        self, batch: List[Event], done: List[Optional[Dict[str, object]]]
+    ) -> List[Optional[Dict[str, object]]]:
+        resp = await self._post(self.batch_url, {"events": batch})
+        if resp.status_code in (404, 405):
+            self.logger.info("Risk engine has no batch endpoint; sending events one by one")
+            self._batch_supported = False
+            return await self._post_each(batch, done)
+        if 400 <= resp.status_code < 500:
+            # One bad event fails the whole batch; find it by posting singly.
+            self.logger.warning(
+                "Risk engine rejected a batch of %d events (%d %s); sending them one by one",
+                len(batch), resp.status_code, resp.text[:200],
+            )
+            return await self._post_each(batch, done)
+        if resp.status_code != 200:
+            self.logger.warning("Risk engine rejected a batch: %d %s", resp.status_code, resp.text[:200])
+            return [None] * len(batch)
+        results = loads(resp.content).get("results") or []
+        return list(results) + [None] * (len(batch) - len(results))
+
+    async def _post_each(
+        self, batch: List[Event], done: List[Optional[Dict[str, object]]]
+    ) -> List[Optional[Dict[str, object]]]:
+        """Post the events of ``batch`` after ``done`` one by one, appending each reply to ``done``."""
+
+        for event in batch[len(done):]:
+            done.append(await self._post_one(event))
+        return done
+
+    async def _post_one(self, event: Event) -> Optional[Dict[str, object]]:
+        resp = await self._post(self.url, event)
+        if resp.status_code != 200:
+            self.logger.warning("Risk engine rejected an event: %d %s", resp.status_code, resp.text[:200])
+            return None
+        return loads(resp.content)
+
+    def status(self) -> Dict[str, object]:
+        return {
+            "queued": self._queued(),
+            "queue_size": self.queue_size,
+            "batch_endpoint": self._batch_supported,
+            **self.stats,
+        }
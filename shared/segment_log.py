@@ -0,0 +1,325 @@
+"""Append-only record log split into rolling segment files with an offset index.
+
+Writing one small file per event costs an inode, a directory entry and an
+``open``/``close`` each time, and every reader has to list and sort the
+directory. ``SegmentLog`` appends records to a few large files instead:
+
+```text
+<directory>/
+  00000000000000000000.log   # records 0 .. k-1, back to back
+  00000000000000000000.idx   # one fixed-size entry per record
+  000000000000000000k0.log   # next segment, named after its first sequence number
+  ...
+```
+
+Each index entry is ``(offset, length, timestamp)`` packed into 20 bytes, so
+the position of record *i* in a segment is ``i * 20`` in its index. Reading
+the last N records touches only the tail of the newest index files, and a
+time range is a binary search over index entries; no per-record files are
+listed or opened.
+
+Records are written data first, index second, and both are flushed before
+``append`` returns, so readers in other processes only ever see indexed
+records that are fully on disk. ``append_many`` writes a batch with one
+flush per file instead of one per record. On open, a torn tail (a partial
+index entry or data past the last indexed record) is truncated away.
+
+With ``max_segments`` set the writer deletes the oldest segments while
+readers may be walking them; a reader treats a segment that disappeared
+under it as empty.
+
+Timestamps are clamped to be non-decreasing within a log so range lookups can
+binary-search; the caller's original timestamp belongs in the payload.
+"""
+
+from __future__ import annotations
+
+import bisect
+import os
+import struct
+import threading
+import time
+from pathlib import Path
+from typing import BinaryIO, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+
+SEGMENT_BYTES = int(os.getenv("SEGMENT_LOG_SEGMENT_BYTES", str(64 * 1024 * 1024)))
+SEGMENT_MAX_COUNT = int(os.getenv("SEGMENT_LOG_MAX_SEGMENTS", "0"))
+
+_INDEX_ENTRY = struct.Struct(">QId")
+_NAME_DIGITS = 20
+_DATA_SUFFIX = ".log"
+_INDEX_SUFFIX = ".idx"
+
+
+class Record(NamedTuple):
+    seq: int
+    ts: float
+    data: bytes
+
+
+class _Segment:
+    __slots__ = ("base", "data_path", "index_path")
+
+    def __init__(self, directory: Path, base: int) -> None:
+        self.base = base
+        name = f"{base:0{_NAME_DIGITS}d}"
+        self.data_path = directory / f"{name}{_DATA_SUFFIX}"
+        self.index_path = directory / f"{name}{_INDEX_SUFFIX}"
+
+    def count(self) -> int:
+        try:
+            return self.index_path.stat().st_size // _INDEX_ENTRY.size
+        except FileNotFoundError:
+            return 0
+
+    def entries(self, start: int, stop: int) -> List[tuple]:
+        """Index entries ``start`` .. ``stop - 1`` (segment-relative)."""
+
+        if stop <= start:
+            return []
+        try:
+            with self.index_path.open("rb") as f:
+                f.seek(start * _INDEX_ENTRY.size)
+                raw = f.read((stop - start) * _INDEX_ENTRY.size)
+        except FileNotFoundError:
+            return []  # rolled away by the writer
+        usable = len(raw) - len(raw) % _INDEX_ENTRY.size
+        return list(_INDEX_ENTRY.iter_unpack(raw[:usable]))
+
+    def timestamp(self, position: int) -> float:
+        entries = self.entries(position, position + 1)
+        if not entries:
+            raise FileNotFoundError(self.index_path)
+        return entries[0][2]
+
+    def read(self, start: int, stop: int) -> List[Record]:
+        entries = self.entries(start, stop)
+        if not entries:
+            return []
+        first_offset = entries[0][0]
+        last_offset, last_length, _ = entries[-1]
+        try:
+            with self.data_path.open("rb") as f:
+                f.seek(first_offset)
+                blob = f.read(last_offset + last_length - first_offset)
+        except FileNotFoundError:
+            return []
+        view = memoryview(blob)
+        return [
+            Record(self.base + start + i, ts, bytes(view[offset - first_offset:offset - first_offset + length]))
+            for i, (offset, length, ts) in enumerate(entries)
+        ]
+
+
+class SegmentLog:
+    """Append-only log of ``(timestamp, bytes)`` records in rolling segments.
+
+    One process should write a given directory; any number may read it.
+    """
+
+    def __init__(
+        self,
+        directory: Union[str, Path],
+        segment_bytes: int = SEGMENT_BYTES,
+        max_segments: int = SEGMENT_MAX_COUNT,
+    ) -> None:
+        self.directory = Path(directory)
+        self.segment_bytes = max(1, segment_bytes)
+        self.max_segments = max(0, max_segments)
+        self._lock = threading.Lock()
+        self._data: Optional[BinaryIO] = None
+        self._index: Optional[BinaryIO] = None
+        self._active: Optional[_Segment] = None
+        self._active_count = 0
+        self._active_size = 0
+        self._last_ts = float("-inf")
+
+    # ---- writing ---------------------------------------------------------
+
+    def append(self, data: bytes, ts: Optional[float] = None) -> int:
+        """Append one record; returns its sequence number."""
+
+        return self.append_many([(data, ts)])[0]
+
+    def append_many(self, records: Iterable[Tuple[bytes, Optional[float]]]) -> List[int]:
+        """Append ``(data, ts)`` records with one flush per file; returns their sequence numbers."""
+
+        seqs = []
+        with self._lock:
+            if self._active is None:
+                self._open_for_append()
+            for data, ts in records:
+                if self._active_size >= self.segment_bytes and self._active_count:
+                    self._flush()
+                    self._roll()
+                ts = time.time() if ts is None else ts
+                ts = self._last_ts = max(ts, self._last_ts)
+                self._data.write(data)
+                self._index.write(_INDEX_ENTRY.pack(self._active_size, len(data), ts))
+                self._active_size += len(data)
+                self._active_count += 1
+                seqs.append(self._active.base + self._active_count - 1)
+            self._flush()
+        return seqs
+
+    def _flush(self) -> None:
+        # Data before index: an indexed record is always complete on disk.
+        self._data.flush()
+        self._index.flush()
+
+    def _open_for_append(self) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        segments = self._segments()
+        segment = segments[-1] if segments else _Segment(self.directory, 0)
+        count, size = self._repair(segment)
+        if count:
+            self._last_ts = segment.timestamp(count - 1)
+        self._attach(segment, count, size)
+
+    def _repair(self, segment: _Segment) -> tuple:
+        """Drop a torn tail left by a crash; returns ``(records, data_size)``."""
+
+        count = segment.count()
+        if segment.index_path.exists():
+            with segment.index_path.open("r+b") as f:
+                f.truncate(count * _INDEX_ENTRY.size)
+        size = 0
+        if count:
+            offset, length, _ = segment.entries(count - 1, count)[0]
+            size = offset + length
+        if segment.data_path.exists() and segment.data_path.stat().st_size != size:
+            with segment.data_path.open("r+b") as f:
+                f.truncate(size)
+        return count, size
+
+    def _attach(self, segment: _Segment, count: int, size: int) -> None:
+        self._close_files()
+        self._active = segment
+        self._active_count = count
+        self._active_size = size
+        self._data = segment.data_path.open("ab")
+        self._index = segment.index_path.open("ab")
+
+    def _roll(self) -> None:
+        base = self._active.base + self._active_count
+        self._attach(_Segment(self.directory, base), 0, 0)
+        if self.max_segments:
+            for old in self._segments()[: -self.max_segments]:
+                for path in (old.data_path, old.index_path):
+                    try:
+                        path.unlink()
+                    except FileNotFoundError:
+                        pass
+
+    def _close_files(self) -> None:
+        for f in (self._data, self._index):
+            if f is not None:
+                f.close()
+        self._data = self._index = None
+
+    def close(self) -> None:
+        with self._lock:
+            self._close_files()
+            self._active = None
+
+    def __enter__(self) -> "SegmentLog":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    # ---- reading ---------------------------------------------------------
+
+    def _segments(self) -> List[_Segment]:
+        """Segments in sequence order (a handful of files, not one per record)."""
+
+        if not self.directory.exists():
+            return []
+        bases = []
+        for path in self.directory.glob(f"*{_INDEX_SUFFIX}"):
+            try:
+                bases.append(int(path.stem))
+            except ValueError:
+                continue
+        return [_Segment(self.directory, base) for base in sorted(bases)]
+
+    def __len__(self) -> int:
+        segments = self._segments()
+        if not segments:
+            return 0
+        return segments[-1].base + segments[-1].count() - segments[0].base
+
+    def tail(self, n: int) -> List[Record]:
+        """The last ``n`` records, oldest first."""
+
+        if n <= 0:
+            return []
+        chunks: List[List[Record]] = []
+        wanted = n
+        for segment in reversed(self._segments()):
+            count = segment.count()
+            take = min(wanted, count)
+            if take:
+                chunks.append(segment.read(count - take, count))
+                wanted -= take
+            if not wanted:
+                break
+        return [record for chunk in reversed(chunks) for record in chunk]
+
+    def range(self, start_ts: float, end_ts: float) -> Iterator[Record]:
+        """Records with ``start_ts <= ts < end_ts``, oldest first."""
+
+        segments = self._segments()
+        for i, segment in enumerate(segments):
+            count = segment.count()
+            if not count:
+                continue
+            timestamps = _IndexTimestamps(segment, count)
+            try:
+                if i + 1 < len(segments) and segments[i + 1].count() and segments[i + 1].timestamp(0) < start_ts:
+                    continue
+                if timestamps[0] >= end_ts:
+                    return
+                lo = bisect.bisect_left(timestamps, start_ts)
+                hi = bisect.bisect_left(timestamps, end_ts)
+            except FileNotFoundError:
+                continue  # rolled away by the writer
+            for block in range(lo, hi, 1024):
+                yield from segment.read(block, min(hi, block + 1024))
+
+    def read(self, seqs: Sequence[int]) -> List[Record]:
+        """Records by sequence number; unknown numbers are skipped."""
+
+        segments = self._segments()
+        bases = [segment.base for segment in segments]
+        records = []
+        for seq in seqs:
+            i = bisect.bisect_right(bases, seq) - 1
+            if i < 0:
+                continue
+            found = segments[i].read(seq - bases[i], seq - bases[i] + 1)
+            records.extend(found)
+        return records
+
+
+class _IndexTimestamps(Sequence):
+    """Lazy view of one segment's index timestamps for ``bisect``."""
+
+    def __init__(self, segment: _Segment, count: int) -> None:
+        self._segment = segment
+        self._count = count
+        self._file = None
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, position: int) -> float:
+        if self._file is None:
+            self._file = self._segment.index_path.open("rb")
+        self._file.seek(position * _INDEX_ENTRY.size)
+        return _INDEX_ENTRY.unpack(self._file.read(_INDEX_ENTRY.size))[2]
+
+    def __del__(self) -> None:
+        if self._file is not None:
+            self._file.close()
@@ -0,0 +1,37 @@
+"""In-order, exactly-once release of numbered proxy chunks.
+
+The proxy numbers the chunks of each session and direction (``ProxyEvent.seq``)
+but detectors receive them over independent HTTP requests, so they can arrive
+out of order or twice. ``SeqReorder`` holds early chunks until the missing ones
+arrive and drops repeats; once more than ``window`` chunks are held behind a
+gap, the gap is given up on and release resumes at the oldest chunk held.
+"""
+
+from typing import Dict, List, Tuple
+
+
+class SeqReorder:
+    """Releases one direction's numbered chunks in order, exactly once."""
+
+    __slots__ = ("expected", "pending")
+
+    def __init__(self) -> None:
+        self.expected = 0
+        self.pending: Dict[int, bytes] = {}
+
+    def push(self, seq: int, data: bytes, window: int) -> Tuple[List[bytes], bool]:
+        """Returns the chunks now due and whether a gap was given up on."""
+
+        if seq < self.expected or seq in self.pending:
+            return [], False
+        self.pending[seq] = data
+        lost = False
+        if self.expected not in self.pending and len(self.pending) > window:
+            # The missing chunk is not coming: resume at the oldest one held.
+            self.expected = min(self.pending)
+            lost = True
+        ready = []
+        while self.expected in self.pending:
+            ready.append(self.pending.pop(self.expected))
+            self.expected += 1
+        return ready, lost
@@ -0,0 +1,243 @@
+"""Non-blocking JSON logging for the services, with sampled per-event logs.
+
+``logging.basicConfig`` writes every record to stderr from the thread that
+logged it, so on the hot path of an asyncio service each line's formatting
+and ``write`` happen on the event loop. ``configure_logging`` instead gives
+the root logger a ``QueueHandler``:
+
+- the calling thread only renders the message (``%`` arguments may refer to
+  objects that change later) and puts the record on a bounded queue; when
+  ``LOG_QUEUE_SIZE`` records are already waiting the record is dropped and
+  counted rather than blocking;
+- a ``QueueListener`` thread formats each record as one JSON object per line
+  (``ts``, ``level``, ``logger``, ``service``, ``msg``, plus any ``fields``
+  passed through ``extra``) and writes it. ``LOG_FORMAT=text`` keeps the
+  plain format for local runs.
+
+uvicorn configures its own loggers before it imports the app, giving
+``uvicorn`` and ``uvicorn.access`` stream handlers of their own with
+``propagate=False``, so every access line would be written synchronously
+on the loop. ``configure_logging`` removes those handlers and lets the
+records propagate to the queue. A service started with ``uvicorn.run``
+from its own module should pass ``log_config=None``, or uvicorn installs
+them again after this has run. ``--no-access-log`` drops the per-request
+lines altogether.
+
+Logs written for every chunk go through an ``EventLogSampler``: each kind
+of event is counted, only a ``LOG_EVENT_SAMPLE_RATE`` share of them is
+logged (evenly spaced, so 0.01 logs every hundredth), and every
+``LOG_SUMMARY_INTERVAL`` seconds one summary line reports the counts since
+the last one.
+"""
+
+from __future__ import annotations
+
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Callable, Dict, Optional
+
+from shared.contracts import dumps
+
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+LOG_EVENT_SAMPLE_RATE = float(os.getenv("LOG_EVENT_SAMPLE_RATE", "0.01"))
+LOG_SUMMARY_INTERVAL = float(os.getenv("LOG_SUMMARY_INTERVAL", "60.0"))
+
+TEXT_FORMAT = "%(levelname)s:%(name)s:%(message)s"
+
+UVICORN_LOGGERS = ("uvicorn", "uvicorn.error", "uvicorn.access")
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record; ``extra={"fields": {...}}`` adds keys."""
+
+    def __init__(self, service: str) -> None:
+        super().__init__()
+        self.service = service
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "service": self.service,
+            "msg": record.getMessage(),
+        }
+        fields = getattr(record, "fields", None)
+        if fields:
+            entry.update(fields)
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return dumps(entry).decode("utf-8")
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """``QueueHandler`` that drops (and counts) records when the queue is full."""
+
+    def __init__(self, log_queue: queue.Queue) -> None:
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Render now, format later: the listener must not see arguments the
+        # caller mutates afterwards, and a traceback has to be captured here.
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_handler: Optional[DroppingQueueHandler] = None
+
+
+def configure_logging(
+    service: str,
+    level: str = LOG_LEVEL,
+    fmt: str = LOG_FORMAT,
+    queue_size: int = LOG_QUEUE_SIZE,
+    stream=None,
+    force: bool = False,
+) -> None:
+    """Route the root logger through a queue to a background JSON writer.
+
+    Like ``logging.basicConfig``, does nothing when the root logger already
+    has handlers (e.g. under a test runner) unless ``force`` is set.
+    """
+
+    global _listener, _handler
+    root = logging.getLogger()
+    if root.handlers and not force:
+        return
+    stop_logging()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+
+    output = logging.StreamHandler(stream or sys.stderr)
+    output.setFormatter(JsonFormatter(service) if fmt == "json" else logging.Formatter(TEXT_FORMAT))
+    log_queue: queue.Queue = queue.Queue(maxsize=max(1, queue_size))
+    _handler = DroppingQueueHandler(log_queue)
+    _listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=True)
+    root.addHandler(_handler)
+    root.setLevel(level)
+    for name in UVICORN_LOGGERS:
+        server_logger = logging.getLogger(name)
+        for handler in list(server_logger.handlers):
+            server_logger.removeHandler(handler)
+        server_logger.propagate = True
+    _listener.start()
+
+
+def stop_logging() -> None:
+    """Flush what is queued and stop the listener thread."""
+
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def dropped_records() -> int:
+    return _handler.dropped if _handler is not None else 0
+
+
+def _write_directly_after_fork() -> None:
+    # The listener thread does not survive fork; a forked child (e.g. a
+    # "fork" analysis pool worker) writes through the listener's handlers.
+    global _listener, _handler
+    if _listener is None or _handler is None:
+        return
+    root = logging.getLogger()
+    root.removeHandler(_handler)
+    for handler in _listener.handlers:
+        root.addHandler(handler)
+    _listener = _handler = None
+
+
+atexit.register(stop_logging)
+os.register_at_fork(after_in_child=_write_directly_after_fork)
+
+
+class EventLogSampler:
+    """Decides which per-event logs to write and logs counts in their place.
+
+    ``if sampler.sampled("chunk", tag=event_type): logger.info(...)`` keeps
+    the cost of building the log line (a ``model_dump`` for instance) to the
+    sampled events.
+    """
+
+    def __init__(
+        self,
+        logger: logging.Logger,
+        rate: float = LOG_EVENT_SAMPLE_RATE,
+        interval: float = LOG_SUMMARY_INTERVAL,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.logger = logger
+        self.rate = min(1.0, max(0.0, rate))
+        self.interval = max(0.0, interval)
+        self._clock = clock
+        self._since = clock()
+        self._seen: Dict[str, int] = {}  # per kind, ever; drives the sampling
+        self._counts: Counter = Counter()  # per kind, this interval
+        self._logged: Counter = Counter()
+        self._tags: Dict[str, Counter] = {}
+
+    def sampled(self, kind: str, tag: Optional[str] = None) -> bool:
+        """Count one ``kind`` event (under ``tag``, if given); True if it should be logged."""
+
+        seen = self._seen.get(kind, 0) + 1
+        self._seen[kind] = seen
+        self._counts[kind] += 1
+        if tag is not None:
+            self._tags.setdefault(kind, Counter())[tag] += 1
+        # Evenly spaced: the n-th event is sampled when n * rate crosses an integer.
+        sampled = int(seen * self.rate) != int((seen - 1) * self.rate)
+        if sampled:
+            self._logged[kind] += 1
+        if self.interval and self._clock() - self._since >= self.interval:
+            self.flush()
+        return sampled
+
+    def flush(self) -> None:
+        """Log the counts since the last summary (if any) and start over."""
+
+        now = self._clock()
+        if self._counts:
+            self.logger.info(
+                "event counts over the last %.0fs: %s",
+                now - self._since,
+                ", ".join(f"{kind}={count}" for kind, count in sorted(self._counts.items())),
+                extra={"fields": {
+                    "event_kind": "summary",
+                    "interval_s": round(now - self._since, 3),
+                    "sample_rate": self.rate,
+                    "counts": dict(self._counts),
+                    "logged": dict(self._logged),
+                    "tags": {kind: dict(tags) for kind, tags in self._tags.items()},
+                    "dropped_log_records": dropped_records(),
+                }},
+            )
+        self._since = now
+        self._counts.clear()
+        self._logged.clear()
+        self._tags.clear()
@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+from shared.segment_log import SegmentLog
+
+
+def test_segment_log_tail_range_and_torn_tail_recovery(tmp_path: Path) -> None:
+    log = SegmentLog(tmp_path / "chunks", segment_bytes=64)
+    for i in range(40):
+        assert log.append(f"record-{i:02d}".encode(), ts=1000.0 + i) == i
+    log.close()
+    assert len(list((tmp_path / "chunks").glob("*.log"))) > 1
+
+    reader = SegmentLog(tmp_path / "chunks")
+    assert len(reader) == 40
+    assert [r.data for r in reader.tail(3)] == [b"record-37", b"record-38", b"record-39"]
+    assert [r.seq for r in reader.range(1005.0, 1012.0)] == list(range(5, 12))
+
+    # A crash mid-append leaves a partial index entry and unindexed data.
+    newest = sorted((tmp_path / "chunks").glob("*.idx"))[-1]
+    with newest.open("ab") as f:
+        f.write(b"\x00" * 7)
+    with newest.with_suffix(".log").open("ab") as f:
+        f.write(b"garbage")
+    writer = SegmentLog(tmp_path / "chunks", segment_bytes=64)
+    assert writer.append(b"after-crash", ts=2000.0) == 40
+    writer.close()
+    assert [r.data for r in SegmentLog(tmp_path / "chunks").tail(2)] == [b"record-39", b"after-crash"]
+
+
+def test_segment_log_append_many_matches_single_appends(tmp_path: Path) -> None:
+    batched = SegmentLog(tmp_path / "batched", segment_bytes=64)
+    seqs = batched.append_many([(f"record-{i:02d}".encode(), 1000.0 + i) for i in range(20)])
+    seqs += batched.append_many([(b"last", None)])
+    batched.close()
+    assert seqs == list(range(21))
+
+    single = SegmentLog(tmp_path / "single", segment_bytes=64)
+    for i in range(20):
+        single.append(f"record-{i:02d}".encode(), ts=1000.0 + i)
+    single.close()
+    # Same segment boundaries as record-by-record appends.
+    assert sorted(p.name for p in (tmp_path / "batched").glob("*.log")) == sorted(
+        p.name for p in (tmp_path / "single").glob("*.log")
+    )
+    assert [r.data for r in SegmentLog(tmp_path / "batched").tail(2)] == [b"record-19", b"last"]
+
+
+def test_segment_log_reader_skips_segments_rolled_away_under_it(tmp_path: Path) -> None:
+    writer = SegmentLog(tmp_path / "chunks", segment_bytes=32, max_segments=2)
+    for i in range(10):
+        writer.append(f"record-{i:02d}".encode(), ts=1000.0 + i)
+
+    reader = SegmentLog(tmp_path / "chunks")
+    stale = reader._segments()
+    # The writer rolls and deletes the oldest segments the reader listed.
+    for i in range(10, 20):
+        writer.append(f"record-{i:02d}".encode(), ts=1000.0 + i)
+    writer.close()
+    assert not any(segment.index_path.exists() for segment in stale)
+    reader._segments = lambda: stale
+    assert list(reader.range(0.0, 2000.0)) == []
+    assert reader.tail(3) == [] and reader.read([4, 5]) == []